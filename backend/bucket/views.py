@@ -1,9 +1,9 @@
 # views.py
 import bucket.db  # ensures MongoEngine connects
 from datetime import datetime
-from django.http import JsonResponse
 import json
 from django.views.decorators.csrf import csrf_exempt
+from core.json import JsonResponse
 
 
 import traceback
@@ -5,6 +5,14 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The outbound-bound views (map.views.proxy_serpapi, reviews.views.*) are
+async and only release their worker while waiting on SerpApi/Gemini when
+served through ASGI. The same goes for the notification stream
+(social.views.notification_stream, Server-Sent Events): under WSGI each open
+stream would hold a worker thread for its whole lifetime. e.g.:
+
+    uvicorn core.asgi:application --workers 4
 """
 
 import os
@@ -0,0 +1,320 @@
+"""
+Caches applicatifs partagés par les apps.
+
+Deux backends interchangeables, choisis par nom de cache dans
+settings.APP_CACHES:
+- 'local': LRU en mémoire du processus, borné en taille, avec TTL
+- 'shared': un cache Django (CACHES[ALIAS]), par ex. Redis ou Memcached
+
+SingleFlight (threads) et AsyncSingleFlight (vues async) évitent que des
+requêtes identiques simultanées déclenchent chacune le même appel coûteux,
+dans tout le processus.
+
+VersionStore garde les numéros de version qui entrent dans les clés de
+cache (invalidation par changement de clé) hors de ces caches: dans
+MongoDB, communs aux processus et jamais évincés. Chaque processus en garde
+une copie quelques secondes (CACHE_VERSIONS_MAX_AGE): un incrément fait
+ailleurs est vu au plus tard à son expiration.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from core import http
+
+from django.conf import settings
+from django.core.cache import caches
+from mongoengine.connection import get_db
+from pymongo import ReturnDocument
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Cache LRU thread-safe, borné à maxsize entrées, avec expiration (TTL en secondes)"""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key, delta=1):
+        """Incrémente un compteur (créé à 0 s'il n'existe pas), sans expiration"""
+        with self._lock:
+            expires_at, value = self._data.get(key, (None, 0))
+            value += delta
+            self._data[key] = (None, value)
+            self._data.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Lecture traversante: appelle loader() en cas d'absence et mémorise le résultat"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "local", "size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class SharedCache:
+    """Adaptateur vers un cache Django (partagé entre processus), avec préfixe de clés.
+
+    Les clés portent aussi la génération de l'espace de noms: clear() en
+    change, ce qui rend obsolètes les seules clés de ce cache (les autres
+    utilisateurs du backend ne sont pas touchés; les anciennes entrées
+    expirent par leur TTL).
+    """
+
+    def __init__(self, alias="default", prefix="", ttl=None):
+        self.backend = caches[alias]
+        self.prefix = prefix
+        self.ttl = ttl
+        self._generation_key = f"{prefix}:generation"
+
+    def _generation(self):
+        generation = self.backend.get(self._generation_key)
+        if generation is None:
+            # Jamais créée ou évincée: une valeur datée ne retombe jamais sur une génération passée
+            self.backend.add(self._generation_key, time.time_ns(), timeout=None)
+            generation = self.backend.get(self._generation_key)
+        return generation
+
+    def _key(self, key):
+        return f"{self.prefix}:{self._generation()}:{key}"
+
+    def get(self, key, default=None):
+        return self.backend.get(self._key(key), default)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(self._key(key), value, self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.backend.delete(self._key(key))
+
+    def delete_many(self, keys):
+        prefix = self._key("")
+        self.backend.delete_many([prefix + str(key) for key in keys])
+
+    def incr(self, key, delta=1):
+        key = self._key(key)
+        # add() est atomique: seul le premier appel crée le compteur
+        self.backend.add(key, 0, timeout=None)
+        return self.backend.incr(key, delta)
+
+    def clear(self):
+        """Vide ce cache seulement (nouvelle génération de l'espace de noms)"""
+        self.backend.set(self._generation_key, time.time_ns(), timeout=None)
+
+    def get_or_set(self, key, loader, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self):
+        return {"backend": "shared", "alias": self.backend.__class__.__name__}
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant sur la même clé.
+
+    Le premier appelant exécute fn(); les appelants arrivés pendant
+    l'exécution attendent et reçoivent le même résultat (ou la même exception).
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AsyncSingleFlight:
+    """Équivalent de SingleFlight pour les vues async: les appelants attendent la même tâche.
+
+    Sous WSGI, Django crée une boucle d'événements par requête async: une
+    tâche créée sur la boucle d'un appelant ne pourrait pas être attendue
+    depuis les autres. La coroutine fn() s'exécute donc sur la boucle dédiée
+    du processus (core.http.get_loop), et les appelants de toutes les
+    boucles attendent le même concurrent.futures.Future.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> concurrent.futures.Future
+        self._lock = threading.Lock()
+
+    async def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = asyncio.run_coroutine_threadsafe(fn(), http.get_loop())
+                self._calls[key] = future
+        if leader:
+            future.add_done_callback(lambda _: self._forget(key, future))
+        # shield: l'annulation d'un appelant n'annule pas l'appel partagé
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+class VersionStore:
+    """Numéros de version persistés dans MongoDB (un document par nom).
+
+    Une clé de cache qui inclut un numéro de version est invalidée en
+    incrémentant ce numéro. Stocké dans le cache lui-même, le numéro
+    repartirait de 0 après une éviction ou dans un autre processus, et
+    d'anciennes entrées redeviendraient lisibles; ici il ne recule jamais.
+
+    Les valeurs lues sont gardées en mémoire max_age secondes (par défaut
+    settings.CACHE_VERSIONS_MAX_AGE): get() ne lit MongoDB que pour les noms
+    expirés. incr() met à jour la copie locale aussitôt.
+    """
+
+    def __init__(self, collection="cache_versions", max_age=None):
+        self.collection_name = collection
+        self.max_age = max_age
+        self._local = {}  # name -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _collection(self):
+        return get_db()[self.collection_name]
+
+    def _max_age(self):
+        if self.max_age is not None:
+            return self.max_age
+        return getattr(settings, "CACHE_VERSIONS_MAX_AGE", 5)
+
+    def _remember(self, name, value):
+        expires_at = time.monotonic() + self._max_age()
+        with self._lock:
+            current = self._local.get(name)
+            # Une lecture plus lente qu'un incrément concurrent ne fait pas reculer la copie
+            if current is not None and current[0] > time.monotonic() and current[1] > value:
+                return
+            self._local[name] = (expires_at, value)
+
+    def get(self, *names):
+        """Versions courantes des noms donnés (0 si jamais incrémentée), une requête au plus"""
+        now = time.monotonic()
+        with self._lock:
+            known = {name: entry[1] for name, entry in self._local.items() if entry[0] > now}
+        stale = [name for name in names if name not in known]
+        if stale:
+            rows = self._collection().find({"_id": {"$in": stale}})
+            fetched = {row["_id"]: row["value"] for row in rows}
+            for name in stale:
+                known[name] = fetched.get(name, 0)
+                self._remember(name, known[name])
+        return tuple(known[name] for name in names)
+
+    def incr(self, name):
+        """Incrémente la version de name; retourne la nouvelle valeur"""
+        doc = self._collection().find_one_and_update(
+            {"_id": name}, {"$inc": {"value": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        self._remember(name, doc["value"])
+        return doc["value"]
+
+    def forget(self):
+        """Oublie les copies locales (la prochaine lecture interroge MongoDB)"""
+        with self._lock:
+            self._local.clear()
+
+
+versions = VersionStore()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name):
+    """Retourne le cache applicatif `name` configuré dans settings.APP_CACHES"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            config = getattr(settings, "APP_CACHES", {}).get(name, {})
+            ttl = config.get("TTL")
+            if config.get("BACKEND", "local") == "shared":
+                cache = SharedCache(alias=config.get("ALIAS", "default"), prefix=name, ttl=ttl)
+            else:
+                cache = LocalLRUCache(maxsize=config.get("MAXSIZE", 1024), ttl=ttl)
+            _caches[name] = cache
+        return cache
@@ -0,0 +1,179 @@
+"""
+Client HTTP sortant partagé par les apps (appels SerpApi de map et reviews).
+
+Client asynchrone (httpx) pour les vues async servies par ASGI: un worker
+garde des centaines d'appels en vol sans bloquer de thread. Les connexions
+TCP+TLS vers un même hôte sont conservées (keep-alive) et réutilisées depuis
+un pool borné, avec timeouts et retry/backoff configurés dans
+settings.OUTBOUND_HTTP.
+
+Le client et son pool sont uniques dans le processus et vivent sur une
+boucle d'événements dédiée: les vues y soumettent leurs appels et en
+attendent le résultat depuis leur propre boucle (une par requête sous WSGI).
+Les appels regroupés par core.cache.AsyncSingleFlight s'exécutent aussi sur
+cette boucle (get_loop).
+"""
+import asyncio
+import atexit
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class OutboundStats:
+    """Compteurs de latence et de réutilisation des connexions, communs à tout le processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency, failed):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            calls = self.calls
+            attempts = calls + self.retries
+            return {
+                "calls": calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "latency_avg_ms": round(self.latency_total / calls * 1000, 1) if calls else 0,
+                "latency_max_ms": round(self.latency_max * 1000, 1),
+                # Chaque tentative qui n'a pas ouvert de connexion a économisé une poignée de main TCP+TLS
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(attempts - self.connections_opened, 0),
+            }
+
+
+stats = OutboundStats()
+
+
+class AsyncOutboundClient:
+    """httpx.AsyncClient poolé avec retry/backoff (erreurs réseau, timeouts, 429/5xx)"""
+
+    def __init__(self, pool_size=10, timeout=(5, 30), retries=2, backoff=0.5):
+        connect_timeout, read_timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+    async def _trace(self, event_name, info):
+        # Émis par httpcore à chaque nouvelle connexion TCP (jamais pour une connexion réutilisée)
+        if event_name == "connection.connect_tcp.complete":
+            stats.incr("connections_opened")
+
+    async def get(self, url, params=None, timeout=None):
+        """GET via le pool; retourne la réponse finale (raise_for_status à la charge de l'appelant)"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            for attempt in range(self.retries + 1):
+                last_attempt = attempt == self.retries
+                try:
+                    response = await self.client.get(
+                        url,
+                        params=params,
+                        timeout=timeout or httpx.USE_CLIENT_DEFAULT,
+                        extensions={"trace": self._trace},
+                    )
+                    if response.status_code not in RETRY_STATUSES or last_attempt:
+                        return response
+                except (httpx.TimeoutException, httpx.NetworkError):
+                    if last_attempt:
+                        raise
+                stats.incr("retries")
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+        except httpx.HTTPError:
+            failed = True
+            raise
+        finally:
+            stats.record(time.perf_counter() - start, failed)
+
+
+class _LoopClient:
+    """Façade awaitable d'un AsyncOutboundClient qui vit sur la boucle dédiée du processus"""
+
+    def __init__(self, client, loop):
+        self._client = client
+        self._loop = loop
+
+    async def get(self, url, params=None, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(self._client.get(url, params=params, timeout=timeout), self._loop)
+        # L'annulation de l'appelant (client déconnecté) annule aussi l'appel sur la boucle dédiée
+        return await asyncio.wrap_future(future)
+
+
+# Un seul client par processus, sur une boucle d'événements dédiée (thread
+# démon): sous WSGI, Django crée une boucle par requête async, et un client
+# par boucle ouvrirait (et abandonnerait) un pool de connexions par requête
+_client = None
+_loop = None
+_client_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, name="outbound-http", daemon=True).start()
+    return _loop
+
+
+def get_loop():
+    """Boucle d'événements dédiée du processus (celle du client sortant), démarrée à la première utilisation"""
+    with _client_lock:
+        return _get_loop()
+
+
+def get_client():
+    """Client sortant du processus, créé à la première utilisation"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            config = getattr(settings, "OUTBOUND_HTTP", {})
+            loop = _get_loop()
+            client = AsyncOutboundClient(
+                pool_size=config.get("POOL_SIZE", 10),
+                timeout=config.get("TIMEOUT", (5, 30)),
+                retries=config.get("RETRIES", 2),
+                backoff=config.get("BACKOFF", 0.5),
+            )
+            _client = _LoopClient(client, loop)
+        return _client
+
+
+@atexit.register
+def close_client(timeout=5):
+    """Ferme les connexions du pool puis arrête la boucle dédiée (à la sortie du processus)"""
+    global _client, _loop
+    with _client_lock:
+        client, _client = _client, None
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    try:
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client._client.client.aclose(), loop).result(timeout)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
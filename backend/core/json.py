@@ -0,0 +1,127 @@
+"""
+Encodage JSON rapide des réponses de l'API.
+
+orjson (extension native) encode les grands fils de dicts imbriqués
+plusieurs fois plus vite que json + DjangoJSONEncoder, et sérialise les
+datetime sans passer par Python. Les ObjectId sont convertis en chaîne.
+Si orjson n'est pas installé, l'encodage retombe sur la bibliothèque
+standard avec le même comportement (datetime au format ISO 8601).
+
+JsonResponse est un remplaçant direct de django.http.JsonResponse;
+stream_json() envoie un tableau JSON élément par élément (StreamingHttpResponse).
+"""
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+CONTENT_TYPE = "application/json"
+# Taille visée des morceaux envoyés par stream_json (octets)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class JSONEncoder(DjangoJSONEncoder):
+    """Encodeur de repli: ObjectId en chaîne, datetime au format isoformat() (comme orjson)"""
+
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types non gérés nativement par orjson (ObjectId, Decimal, UUID...)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    return _fallback_encoder.default(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(data):
+        """Encode data en JSON (bytes UTF-8)"""
+        return orjson.dumps(data, default=_default, option=_OPTIONS)
+else:
+    def dumps(data):
+        """Encode data en JSON (bytes UTF-8)"""
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JsonResponse(HttpResponse):
+    """django.http.JsonResponse encodé par dumps().
+
+    json_dumps_params (indentation...) force l'encodeur de la bibliothèque standard.
+    """
+
+    def __init__(self, data, encoder=JSONEncoder, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", CONTENT_TYPE)
+        if json_dumps_params or encoder is not JSONEncoder:
+            content = json.dumps(data, cls=encoder, **(json_dumps_params or {}))
+        else:
+            content = dumps(data)
+        super().__init__(content=content, **kwargs)
+
+
+def iter_array(items, chunk_size=STREAM_CHUNK_SIZE):
+    """Encode items en un tableau JSON, par morceaux d'environ chunk_size octets"""
+    buffer = bytearray(b"[")
+    first = True
+    for item in items:
+        if not first:
+            buffer += b","
+        first = False
+        buffer += dumps(item)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+async def _aiter_chunks(chunks):
+    """Consomme un générateur synchrone (requêtes Mongo) dans un thread, morceau par morceau"""
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Client déconnecté: libère le curseur sans attendre le ramasse-miettes
+        chunks.close()
+
+
+def stream_json(request, items, **kwargs):
+    """Réponse en flux d'un tableau JSON produit depuis items (itérable paresseux).
+
+    La mémoire et le délai avant le premier octet ne dépendent pas du nombre
+    d'éléments. Sous ASGI, Django accumulerait un itérateur synchrone en
+    mémoire avant de l'envoyer: il est donc servi par un itérateur asynchrone.
+    Une erreur en cours de route interrompt la réponse (tableau non terminé).
+    """
+    kwargs.setdefault("content_type", CONTENT_TYPE)
+    chunks = iter_array(items)
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter_chunks(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
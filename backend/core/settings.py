@@ -64,6 +64,8 @@ MIDDLEWARE = [
 # CORS Configuration from .env
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:4200,http://127.0.0.1:4200').split(',')
 CORS_ALLOW_CREDENTIALS = True
+# Curseur de pagination renvoyé par les listes paginées (voir social/pagination.py)
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor']
 
 ROOT_URLCONF = 'core.urls'
 
@@ -83,6 +85,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+# Déploiement recommandé: ASGI (uvicorn core.asgi:application), requis pour le flux SSE
+# des notifications et les vues asynchrones; en WSGI le flux répond 204 et le frontend
+# recharge les notifications toutes les 10 secondes.
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Database
@@ -96,6 +102,120 @@ DATABASES = {
 }
 
 
+# Caches applicatifs (voir core/cache.py)
+# BACKEND: 'local' (LRU en mémoire du processus) ou 'shared' (cache Django CACHES[ALIAS], ex. Redis)
+APP_CACHES = {
+    'publications': {
+        'BACKEND': os.getenv('PUBLICATIONS_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 2048,
+        'TTL': int(os.getenv('PUBLICATIONS_CACHE_TTL', '300')),
+    },
+    'serpapi': {
+        'BACKEND': os.getenv('SERPAPI_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 512,
+        'TTL': int(os.getenv('SERPAPI_CACHE_TTL', '900')),
+    },
+    'review_summaries': {
+        'BACKEND': os.getenv('REVIEW_SUMMARY_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 1024,
+        'TTL': int(os.getenv('REVIEW_SUMMARY_TTL', str(7 * 24 * 3600))),
+    },
+    'usernames': {
+        'BACKEND': os.getenv('USERNAMES_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 50000,
+        'TTL': int(os.getenv('USERNAMES_CACHE_TTL', '300')),
+    },
+    'suggestions': {
+        'BACKEND': os.getenv('SUGGESTIONS_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 4096,
+        'TTL': int(os.getenv('SUGGESTIONS_CACHE_TTL', '600')),
+    },
+    # Auteurs en mode pull, globaux et par abonné (voir social/timeline.py)
+    'timelines': {
+        'BACKEND': os.getenv('TIMELINES_CACHE_BACKEND', 'local'),
+        'ALIAS': 'default',
+        'MAXSIZE': 50000,
+        'TTL': int(os.getenv('TIMELINES_CACHE_TTL', '300')),
+    },
+}
+
+# Durée (secondes) pendant laquelle un processus réutilise les numéros de version
+# des caches (core.cache.versions) sans relire MongoDB
+CACHE_VERSIONS_MAX_AGE = int(os.getenv('CACHE_VERSIONS_MAX_AGE', '5'))
+
+# Durée de vie des résumés Gemini persistés (index TTL de reviews.models.ReviewSummary)
+REVIEW_SUMMARY_TTL = int(os.getenv('REVIEW_SUMMARY_TTL', str(7 * 24 * 3600)))
+
+# Précision (décimales) de l'arrondi de 'll' dans la clé de cache SerpApi (3 ≈ 100 m)
+SERPAPI_CACHE_LL_PRECISION = int(os.getenv('SERPAPI_CACHE_LL_PRECISION', '3'))
+
+
+# Expiration des notifications (index TTL sur Notification.expires_at)
+NOTIFICATION_UNREAD_TTL_DAYS = int(os.getenv('NOTIFICATION_UNREAD_TTL_DAYS', '90'))
+NOTIFICATION_READ_TTL_DAYS = int(os.getenv('NOTIFICATION_READ_TTL_DAYS', '30'))
+
+# Regroupement des notifications (même destinataire, action et cible) par fenêtre de temps
+NOTIFICATION_AGGREGATION = {
+    'WINDOW': int(os.getenv('NOTIFICATION_AGGREGATION_WINDOW', str(24 * 3600))),
+    'MAX_ACTORS': int(os.getenv('NOTIFICATION_AGGREGATION_MAX_ACTORS', '3')),
+}
+
+# Classement "tendances" des publications (voir social/trending.py)
+TRENDING = {
+    # Un événement compte moitié moins après HALF_LIFE_HOURS
+    'HALF_LIFE_HOURS': float(os.getenv('TRENDING_HALF_LIFE_HOURS', '6')),
+    # Poids de chaque événement dans le score
+    'WEIGHTS': {'publish': 1.0, 'like': 1.0, 'comment': 2.0, 'clone': 3.0},
+    # En dessous, le score est ramené à 0 par decay_trending
+    'MIN_SCORE': float(os.getenv('TRENDING_MIN_SCORE', '0.01')),
+}
+
+# Fil "abonnements" matérialisé (voir social/timeline.py)
+TIMELINE = {
+    # Entrées conservées par utilisateur
+    'MAX_LENGTH': int(os.getenv('TIMELINE_MAX_LENGTH', '800')),
+    # Au-delà, les publications de l'auteur sont lues à la demande (pull) au lieu d'être poussées
+    'FANOUT_MAX_FOLLOWERS': int(os.getenv('TIMELINE_FANOUT_MAX_FOLLOWERS', '5000')),
+    # Publications récentes ajoutées au fil lors d'un nouvel abonnement
+    'BACKFILL': int(os.getenv('TIMELINE_BACKFILL', '50')),
+    # Un fil est réduit à MAX_LENGTH en moyenne une fois toutes les TRIM_EVERY insertions
+    'TRIM_EVERY': int(os.getenv('TIMELINE_TRIM_EVERY', '50')),
+}
+
+# Suggestions d'utilisateurs (voir social/suggestions.py)
+SUGGESTIONS = {
+    # Suggestions précalculées gardées en base (recalculées au-delà, ou par refresh_suggestions)
+    'MAX_AGE': int(os.getenv('SUGGESTIONS_MAX_AGE', str(6 * 3600))),
+    'SIZE': int(os.getenv('SUGGESTIONS_SIZE', '50')),
+    # Bornes de l'agrégation "amis d'amis": abonnements explorés, puis abonnements de chacun
+    'SEED_LIMIT': int(os.getenv('SUGGESTIONS_SEED_LIMIT', '200')),
+    'FANOUT_LIMIT': int(os.getenv('SUGGESTIONS_FANOUT_LIMIT', '100')),
+}
+
+# Écriture des notifications par lots en arrière-plan (voir social/dispatcher.py)
+NOTIFICATION_QUEUE = {
+    'ENABLED': os.getenv('NOTIFICATION_QUEUE_ENABLED', 'True') == 'True',
+    'MAXSIZE': int(os.getenv('NOTIFICATION_QUEUE_MAXSIZE', '10000')),
+    'BATCH_SIZE': int(os.getenv('NOTIFICATION_BATCH_SIZE', '200')),
+    'FLUSH_INTERVAL': float(os.getenv('NOTIFICATION_FLUSH_INTERVAL', '0.5')),
+    # Fichier de secours si la file est pleine ou MongoDB indisponible
+    'SPOOL_PATH': os.getenv('NOTIFICATION_SPOOL_PATH', str(BASE_DIR / 'var' / 'notifications.spool')),
+}
+
+# Client HTTP sortant partagé (voir core/http.py)
+OUTBOUND_HTTP = {
+    'POOL_SIZE': int(os.getenv('OUTBOUND_POOL_SIZE', '20')),
+    'TIMEOUT': (float(os.getenv('OUTBOUND_CONNECT_TIMEOUT', '5')), float(os.getenv('OUTBOUND_READ_TIMEOUT', '30'))),
+    'RETRIES': int(os.getenv('OUTBOUND_RETRIES', '2')),
+    'BACKOFF': float(os.getenv('OUTBOUND_BACKOFF', '0.5')),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from bson import ObjectId
+from django.test import RequestFactory, SimpleTestCase
+from mongoengine import connect, disconnect
+
+from core.cache import AsyncSingleFlight, LocalLRUCache, SharedCache, SingleFlight, VersionStore
+from core.json import iter_array, stream_json
+
+
+class IterArrayTests(SimpleTestCase):
+    """Tableau JSON encodé par morceaux (core.json.iter_array)"""
+
+    def test_empty(self):
+        self.assertEqual(list(iter_array([])), [b"[]"])
+
+    def test_output_is_one_json_array(self):
+        obj_id = ObjectId()
+        items = [{"id": obj_id, "at": datetime(2026, 1, 2, 3, 4, 5)}, {"n": 1}, "é"]
+        self.assertEqual(
+            json.loads(b"".join(iter_array(items))),
+            [{"id": str(obj_id), "at": "2026-01-02T03:04:05"}, {"n": 1}, "é"],
+        )
+
+    def test_chunks_reach_chunk_size(self):
+        items = [{"n": n} for n in range(100)]
+        chunks = list(iter_array(items, chunk_size=64))
+        self.assertGreater(len(chunks), 1)
+        # Chaque morceau sauf le dernier atteint la taille visée
+        self.assertTrue(all(len(chunk) >= 64 for chunk in chunks[:-1]))
+        self.assertEqual(json.loads(b"".join(chunks)), items)
+
+    def test_items_are_consumed_lazily(self):
+        consumed = []
+
+        def items():
+            for n in range(3):
+                consumed.append(n)
+                yield n
+
+        chunks = iter_array(items(), chunk_size=1)
+        self.assertEqual(next(chunks), b"[0")
+        self.assertEqual(consumed, [0])
+
+    def test_stream_json_under_wsgi(self):
+        response = stream_json(RequestFactory().get("/"), iter([1, 2, 3]))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [1, 2, 3])
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    """Cache LRU du processus (core.cache.LocalLRUCache)"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LocalLRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_entries_expire_after_ttl(self):
+        cache = LocalLRUCache(ttl=10)
+        with mock.patch("core.cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+            cache.set("b", 2, ttl=30)
+        with mock.patch("core.cache.time.monotonic", return_value=115):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_get_or_set_loads_once(self):
+        cache = LocalLRUCache()
+        loader = mock.Mock(return_value=[])
+        self.assertEqual(cache.get_or_set("k", loader), [])
+        self.assertEqual(cache.get_or_set("k", loader), [])
+        loader.assert_called_once_with()
+
+
+class SharedCacheTests(SimpleTestCase):
+    """Adaptateur vers un cache Django (core.cache.SharedCache), ici le locmem par défaut"""
+
+    def test_caches_are_namespaced_by_prefix(self):
+        first, second = SharedCache(prefix="first"), SharedCache(prefix="second")
+        first.set("k", 1)
+        second.set("k", 2)
+        self.assertEqual((first.get("k"), second.get("k")), (1, 2))
+
+    def test_clear_only_empties_its_own_namespace(self):
+        first, second = SharedCache(prefix="first"), SharedCache(prefix="second")
+        first.set("k", 1)
+        second.set("k", 2)
+        first.clear()
+        self.assertEqual((first.get("k"), second.get("k")), (None, 2))
+        # Un autre processus (autre instance, même préfixe) voit aussi le cache vidé
+        self.assertIsNone(SharedCache(prefix="first").get("k"))
+
+    def test_incr_creates_the_counter(self):
+        cache = SharedCache(prefix="counters")
+        cache.clear()
+        self.assertEqual(cache.incr("n"), 1)
+        self.assertEqual(cache.incr("n", 2), 3)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Regroupement des appels concurrents (core.cache.SingleFlight)"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        # Laisse les suiveurs se mettre en attente de l'appel en cours
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        # Appel terminé: le suivant s'exécute à nouveau
+        self.assertEqual(flight.do("k", lambda: "again"), "again")
+
+    def test_error_is_raised_to_the_caller(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            flight.do("k", fail)
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+    """Regroupement des appels async (core.cache.AsyncSingleFlight)"""
+
+    def test_calls_from_different_event_loops_share_one_execution(self):
+        # Sous WSGI, chaque requête async a sa propre boucle: ici un asyncio.run par thread
+        flight = AsyncSingleFlight()
+        release = threading.Event()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            return "result"
+
+        results = []
+
+        def request():
+            results.append(asyncio.run(flight.do("k", slow)))
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        threads[0].start()
+        while not calls:
+            time.sleep(0.01)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_is_raised_to_the_caller(self):
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(flight.do("k", fail))
+
+        async def ok():
+            return 1
+
+        self.assertEqual(asyncio.run(flight.do("k", ok)), 1)
+
+
+class VersionStoreTests(SimpleTestCase):
+    """Numéros de version persistés (core.cache.VersionStore), sur TEST_MONGODB_URI"""
+
+    @classmethod
+    def setUpClass(cls):
+        uri = os.getenv("TEST_MONGODB_URI")
+        if not uri:
+            raise unittest.SkipTest("TEST_MONGODB_URI non défini")
+        super().setUpClass()
+        disconnect()
+        connect(db="plan_and_go_test", host=uri, serverSelectionTimeoutMS=5000)
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.store = VersionStore(collection="test_cache_versions", max_age=60)
+        self.store._collection().drop()
+
+    def test_versions_start_at_zero_and_increase(self):
+        self.assertEqual(self.store.get("a", "b"), (0, 0))
+        self.assertEqual(self.store.incr("a"), 1)
+        self.assertEqual(self.store.incr("a"), 2)
+        self.assertEqual(self.store.get("a", "b"), (2, 0))
+
+    def test_other_processes_see_increments_after_max_age(self):
+        other = VersionStore(collection="test_cache_versions", max_age=60)
+        self.assertEqual(other.get("a"), (0,))
+        self.store.incr("a")
+        # Copie locale encore valide
+        self.assertEqual(other.get("a"), (0,))
+        other.forget()
+        self.assertEqual(other.get("a"), (1,))
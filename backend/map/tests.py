@@ -1,3 +1,30 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, override_settings
 
-# Create your tests here.
+from .views import _round_ll, _search_cache_key
+
+
+@override_settings(SERPAPI_CACHE_LL_PRECISION=3)
+class SearchCacheKeyTests(SimpleTestCase):
+    """Normalisation des recherches SerpApi avant mise en cache"""
+
+    def test_round_ll(self):
+        self.assertEqual(_round_ll("48.85661,2.35222"), "48.857,2.352")
+        # Le zoom éventuel et les valeurs non numériques sont conservés
+        self.assertEqual(_round_ll("48.85661,2.35222,14z"), "48.857,2.352,14z")
+        self.assertEqual(_round_ll("nord,2.35222"), "nord,2.352")
+
+    def test_nearby_positions_share_a_key(self):
+        first = {"engine": "google_local", "q": "café", "ll": _round_ll("48.85661,2.35222")}
+        second = {"engine": "google_local", "q": "café", "ll": _round_ll("48.85671,2.35218")}
+        self.assertEqual(_search_cache_key(first), _search_cache_key(second))
+
+    def test_key_ignores_order_case_spaces_and_api_key(self):
+        first = {"q": "Pizza  Napoli ", "engine": "google_local", "api_key": "secret", "radius": 5000}
+        second = {"radius": "5000", "engine": "google_local", "q": "pizza napoli"}
+        self.assertEqual(_search_cache_key(first), _search_cache_key(second))
+        self.assertNotIn("secret", _search_cache_key(first))
+
+    def test_different_searches_have_different_keys(self):
+        base = {"engine": "google_local", "q": "pizza", "ll": "48.857,2.352"}
+        self.assertNotEqual(_search_cache_key(base), _search_cache_key(dict(base, q="sushi")))
+        self.assertNotEqual(_search_cache_key(base), _search_cache_key(dict(base, ll="48.858,2.352")))
@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('proxy/serpapi/', views.proxy_serpapi, name='proxy-serpapi'),
+    path('proxy/stats/', views.outbound_stats, name='proxy-stats'),
     
 ]
@@ -1,19 +1,159 @@
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-import requests
+from django.conf import settings
+import httpx
 import os
 import logging
 
+from core.cache import get_cache, AsyncSingleFlight
+from core import http as outbound
+from core.json import JsonResponse
+
 logger = logging.getLogger(__name__)
 
+# Regroupe les recherches SerpApi identiques en cours dans ce processus
+_serpapi_flight = AsyncSingleFlight()
+
+
+def serpapi_cache():
+    return get_cache('serpapi')
+
+
+def _round_ll(ll):
+    """Arrondit les coordonnées 'lat,lng[,...]' à SERPAPI_CACHE_LL_PRECISION décimales"""
+    parts = str(ll).split(',')
+    for i in range(min(2, len(parts))):
+        try:
+            parts[i] = f"{float(parts[i]):.{settings.SERPAPI_CACHE_LL_PRECISION}f}"
+        except ValueError:
+            pass
+    return ','.join(parts)
+
+
+def _search_cache_key(params):
+    """Clé normalisée d'une recherche: paramètres triés, sans la clé API, q en minuscules"""
+    normalized = {key: str(value).strip() for key, value in params.items() if key != 'api_key'}
+    if 'q' in normalized:
+        normalized['q'] = ' '.join(normalized['q'].lower().split())
+    return 'search:' + '&'.join(f"{key}={normalized[key]}" for key in sorted(normalized))
+
+
+async def _fetch_places(params):
+    """Appelle SerpApi via le client async poolé et normalise les places pour le frontend"""
+    # Connexion réutilisée depuis le pool; timeouts et retry/backoff dans settings.OUTBOUND_HTTP
+    serpapi_response = await outbound.get_client().get('https://serpapi.com/search', params=params)
+    serpapi_response.raise_for_status()
+    
+    # Transformer la réponse SerpApi en format attendu par le frontend
+    serpapi_data = serpapi_response.json()
+    
+    # Extraire les places selon le type de réponse
+    places = []
+    
+    # Format Google Local Search (engine=google_local)
+    if 'results' in serpapi_data:
+        places = serpapi_data.get('results', [])
+        logger.info(f"Using google_local results: {len(places)} items")
+    # Format Google Search (engine=google)
+    elif 'local_results' in serpapi_data:
+        places = serpapi_data.get('local_results', [])
+        logger.info(f"Using local_results: {len(places)} items")
+    # Format Organic Search
+    elif 'organic_results' in serpapi_data:
+        places = serpapi_data.get('organic_results', [])
+        logger.info(f"Using organic_results: {len(places)} items")
+    
+    logger.info(f"SerpApi returned {len(places)} results")
+    
+    # Normaliser les données pour le frontend
+    normalized_places = []
+    for place in places:
+        try:
+            # Extraire les coordonnées - différents formats selon la source
+            latitude = place.get('latitude') or place.get('lat')
+            longitude = place.get('longitude') or place.get('lng')
+            
+            # Convertir en float si nécessaire
+            if latitude is not None and longitude is not None:
+                try:
+                    latitude = float(latitude)
+                    longitude = float(longitude)
+                except (ValueError, TypeError):
+                    latitude = None
+                    longitude = None
+            
+            # Si les coordonnées ne sont pas présentes, essayer de les extraire de la géométrie
+            if not latitude or not longitude:
+                geo = place.get('gps_coordinates', {}) or place.get('coordinates', {})
+                if geo:
+                    try:
+                        latitude = float(geo.get('latitude', 0))
+                        longitude = float(geo.get('longitude', 0))
+                    except (ValueError, TypeError):
+                        latitude = None
+                        longitude = None
+            
+            # Convertir rating en float
+            try:
+                rating = float(place.get('rating', 0)) if place.get('rating') else 0
+            except (ValueError, TypeError):
+                rating = 0
+            
+            # Convertir review_count en int
+            try:
+                review_count = int(place.get('review_count', 0)) if place.get('review_count') else 0
+            except (ValueError, TypeError):
+                review_count = 0
+            
+            # Créer la place normalisée uniquement si elle a des coordonnées valides
+            if latitude and longitude:
+                # Extraire l'image - différents champs possibles
+                image = place.get('image') or place.get('thumbnail') or place.get('photo') or ''
+                
+                normalized_place = {
+                    'place_id': str(place.get('place_id', place.get('link', ''))),
+                    'title': str(place.get('title', place.get('name', ''))),
+                    'description': str(place.get('description', place.get('snippet', place.get('type', '')))),
+                    'address': str(place.get('address', '')),
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'rating': rating,
+                    'review_count': review_count,
+                    'image': str(image),
+                    'phone': str(place.get('phone', place.get('review_snippets', ''))),
+                    'website': str(place.get('website', place.get('link', '')))
+                }
+                normalized_places.append(normalized_place)
+        except Exception as place_error:
+            logger.warning(f"Error processing place: {place_error}")
+            continue
+    
+    # Créer la réponse avec le format attendu
+    result_data = {
+        'places': normalized_places,
+        'search_metadata': serpapi_data.get('search_metadata', {}),
+        'search_parameters': serpapi_data.get('search_parameters', {})
+    }
+    
+    return result_data
+
+
+async def _fetch_and_cache(cache_key, params):
+    """Interroge SerpApi et met en cache la réponse normalisée (uniquement en cas de succès)"""
+    result_data = await _fetch_places(params)
+    serpapi_cache().set(cache_key, result_data)
+    return result_data
+
+
 
 @csrf_exempt
 @require_http_methods(["GET", "OPTIONS"])
-def proxy_serpapi(request):
+async def proxy_serpapi(request):
     """
     Proxy endpoint pour SerpApi - contourne les blocages CORS
     
+    Vue async: sous ASGI, l'attente de SerpApi ne bloque aucun thread du worker.
+    
     Exemple d'utilisation:
     GET /map/proxy/serpapi/?type=search&q=restaurant&ll=40.7128,-74.0060&radius=5
     """
@@ -65,127 +205,31 @@ def proxy_serpapi(request):
                 except ValueError:
                     pass
         
+        # Arrondir 'll' pour que des positions voisines partagent la même réponse en cache
+        if 'll' in params:
+            params['ll'] = _round_ll(params['ll'])
+        
         logger.info(f"SerpApi request: engine={params.get('engine')}, q={params.get('q')}, ll={params.get('ll')}")
         
-        # Effectuer la requête à SerpApi avec retry et timeout augmenté
+        # Réponse en cache pour une recherche identique (q, ll arrondi, radius...)
+        cache_key = _search_cache_key(params)
+        cache_status = 'HIT'
         try:
-            max_retries = 2
-            serpapi_response = None
-            
-            for attempt in range(max_retries):
-                try:
-                    logger.info(f"SerpApi attempt {attempt + 1}/{max_retries}")
-                    serpapi_response = requests.get(
-                        'https://serpapi.com/search', 
-                        params=params, 
-                        timeout=30  # Augmenté de 10 à 30 secondes
-                    )
-                    serpapi_response.raise_for_status()
-                    break  # Succès, sortir de la boucle
-                except requests.exceptions.Timeout:
-                    logger.warning(f"Timeout on attempt {attempt + 1}, retrying...")
-                    if attempt == max_retries - 1:
-                        raise
-            
-            # Transformer la réponse SerpApi en format attendu par le frontend
-            serpapi_data = serpapi_response.json()
-            
-            # Extraire les places selon le type de réponse
-            places = []
-            
-            # Format Google Local Search (engine=google_local)
-            if 'results' in serpapi_data:
-                places = serpapi_data.get('results', [])
-                logger.info(f"Using google_local results: {len(places)} items")
-            # Format Google Search (engine=google)
-            elif 'local_results' in serpapi_data:
-                places = serpapi_data.get('local_results', [])
-                logger.info(f"Using local_results: {len(places)} items")
-            # Format Organic Search
-            elif 'organic_results' in serpapi_data:
-                places = serpapi_data.get('organic_results', [])
-                logger.info(f"Using organic_results: {len(places)} items")
-            
-            logger.info(f"SerpApi returned {len(places)} results")
-            
-            # Normaliser les données pour le frontend
-            normalized_places = []
-            for place in places:
-                try:
-                    # Extraire les coordonnées - différents formats selon la source
-                    latitude = place.get('latitude') or place.get('lat')
-                    longitude = place.get('longitude') or place.get('lng')
-                    
-                    # Convertir en float si nécessaire
-                    if latitude is not None and longitude is not None:
-                        try:
-                            latitude = float(latitude)
-                            longitude = float(longitude)
-                        except (ValueError, TypeError):
-                            latitude = None
-                            longitude = None
-                    
-                    # Si les coordonnées ne sont pas présentes, essayer de les extraire de la géométrie
-                    if not latitude or not longitude:
-                        geo = place.get('gps_coordinates', {}) or place.get('coordinates', {})
-                        if geo:
-                            try:
-                                latitude = float(geo.get('latitude', 0))
-                                longitude = float(geo.get('longitude', 0))
-                            except (ValueError, TypeError):
-                                latitude = None
-                                longitude = None
-                    
-                    # Convertir rating en float
-                    try:
-                        rating = float(place.get('rating', 0)) if place.get('rating') else 0
-                    except (ValueError, TypeError):
-                        rating = 0
-                    
-                    # Convertir review_count en int
-                    try:
-                        review_count = int(place.get('review_count', 0)) if place.get('review_count') else 0
-                    except (ValueError, TypeError):
-                        review_count = 0
-                    
-                    # Créer la place normalisée uniquement si elle a des coordonnées valides
-                    if latitude and longitude:
-                        # Extraire l'image - différents champs possibles
-                        image = place.get('image') or place.get('thumbnail') or place.get('photo') or ''
-                        
-                        normalized_place = {
-                            'place_id': str(place.get('place_id', place.get('link', ''))),
-                            'title': str(place.get('title', place.get('name', ''))),
-                            'description': str(place.get('description', place.get('snippet', place.get('type', '')))),
-                            'address': str(place.get('address', '')),
-                            'latitude': latitude,
-                            'longitude': longitude,
-                            'rating': rating,
-                            'review_count': review_count,
-                            'image': str(image),
-                            'phone': str(place.get('phone', place.get('review_snippets', ''))),
-                            'website': str(place.get('website', place.get('link', '')))
-                        }
-                        normalized_places.append(normalized_place)
-                except Exception as place_error:
-                    logger.warning(f"Error processing place: {place_error}")
-                    continue
-            
-            # Créer la réponse avec le format attendu
-            result_data = {
-                'places': normalized_places,
-                'search_metadata': serpapi_data.get('search_metadata', {}),
-                'search_parameters': serpapi_data.get('search_parameters', {})
-            }
+            result_data = serpapi_cache().get(cache_key)
+            if result_data is None:
+                # Une seule requête SerpApi pour toutes les recherches identiques simultanées
+                cache_status = 'MISS'
+                result_data = await _serpapi_flight.do(cache_key, lambda: _fetch_and_cache(cache_key, params))
             
             result = JsonResponse(result_data)
+            result['X-Cache'] = cache_status
             result['Access-Control-Allow-Origin'] = '*'
             result['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
             result['Access-Control-Allow-Headers'] = 'Content-Type'
             
             return result
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error('SerpApi request timed out after retries')
             response = JsonResponse({
                 'error': 'SerpApi request timed out',
@@ -194,7 +238,7 @@ def proxy_serpapi(request):
             response['Access-Control-Allow-Origin'] = '*'
             return response
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f'SerpApi request failed: {str(e)}')
             response = JsonResponse({
                 'error': f'SerpApi request failed: {str(e)}',
@@ -212,3 +256,12 @@ def proxy_serpapi(request):
         response['Access-Control-Allow-Origin'] = '*'
         return response
 
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def outbound_stats(request):
+    """Statistiques du client SerpApi: réutilisation des connexions, latence et cache"""
+    return JsonResponse({
+        'http': outbound.stats.as_dict(),
+        'cache': serpapi_cache().stats(),
+    })
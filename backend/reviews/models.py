@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from django.conf import settings
+from mongoengine import Document, StringField, IntField, DateTimeField
+
+
+class ReviewSummary(Document):
+    """Gemini summary of a set of reviews, keyed by the fingerprint of their texts"""
+    fingerprint = StringField(required=True, unique=True)
+    summary = StringField(required=True)
+    review_count = IntField(default=0)
+    text_count = IntField(default=0)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        "collection": "review_summaries",
+        "indexes": [
+            # MongoDB drops expired summaries on its own
+            {"fields": ["created_at"], "expireAfterSeconds": settings.REVIEW_SUMMARY_TTL},
+        ],
+    }
@@ -0,0 +1,102 @@
+"""Cached, deduplicated Gemini review summaries.
+
+Lookup order: in-process LRU -> review_summaries collection -> Gemini.
+Concurrent requests for the same review set share a single Gemini call.
+Everything here is async: MongoDB access runs in a worker thread and Gemini
+is awaited, so the event loop is never blocked.
+"""
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime, timedelta
+
+import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.cache import get_cache, AsyncSingleFlight
+from .models import ReviewSummary
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "models/gemini-2.5-pro"
+
+_summary_flight = AsyncSingleFlight()
+
+
+def summaries_cache():
+    return get_cache("review_summaries")
+
+
+def normalize_text(text):
+    """Unicode-normalize, lowercase and collapse whitespace so trivial variations hash alike"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.lower().split())
+
+
+def review_fingerprint(texts):
+    """Content hash of the review set (order- and duplicate-independent, model-specific)"""
+    normalized = sorted({normalize_text(text) for text in texts})
+    digest = hashlib.sha256()
+    digest.update(SUMMARY_MODEL.encode("utf-8"))
+    for text in normalized:
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_prompt(texts):
+    combined = "\n\n".join(texts)
+    return (
+        "Summarize these reviews in a few short sentences. "
+        "Focus only on the main opinions, strengths, weaknesses, and recurring themes. "
+        "Keep it concise and clear, no more than 40 words:\n\n" + combined
+    )
+
+
+@sync_to_async(thread_sensitive=False)
+def _load_summary(fingerprint):
+    """Persisted summary younger than REVIEW_SUMMARY_TTL, or None"""
+    oldest = datetime.utcnow() - timedelta(seconds=settings.REVIEW_SUMMARY_TTL)
+    stored = ReviewSummary.objects(fingerprint=fingerprint, created_at__gte=oldest).only("summary").first()
+    return stored.summary if stored else None
+
+
+@sync_to_async(thread_sensitive=False)
+def _store_summary(fingerprint, summary, texts, review_count):
+    """Persist a summary (upsert, safe under concurrent writers)"""
+    ReviewSummary.objects(fingerprint=fingerprint).update_one(
+        upsert=True,
+        set__summary=summary,
+        set__review_count=review_count,
+        set__text_count=len(texts),
+        set__created_at=datetime.utcnow(),
+    )
+
+
+async def _generate_summary(fingerprint, texts, review_count):
+    """Call Gemini and persist the result"""
+    model = genai.GenerativeModel(SUMMARY_MODEL)
+    ai_response = await model.generate_content_async(build_prompt(texts))
+    summary = ai_response.text
+    await _store_summary(fingerprint, summary, texts, review_count)
+    return summary
+
+
+async def _load_or_generate(fingerprint, texts, review_count):
+    summary = await _load_summary(fingerprint)
+    cached = summary is not None
+    if not cached:
+        logger.info(f"Generating review summary {fingerprint[:12]} ({len(texts)} texts)")
+        summary = await _generate_summary(fingerprint, texts, review_count)
+    summaries_cache().set(fingerprint, summary)
+    return summary, cached
+
+
+async def get_summary(texts, review_count):
+    """Return (summary, cached) for the given review texts"""
+    fingerprint = review_fingerprint(texts)
+    summary = summaries_cache().get(fingerprint)
+    if summary is not None:
+        return summary, True
+    return await _summary_flight.do(fingerprint, lambda: _load_or_generate(fingerprint, texts, review_count))
@@ -1,3 +1,61 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import summaries
+
+
+class ReviewFingerprintTests(SimpleTestCase):
+    """Content hash used as the summary cache key"""
+
+    def test_order_and_duplicates_do_not_change_the_key(self):
+        texts = ["Great pizza", "Slow service", "Nice view"]
+        self.assertEqual(
+            summaries.review_fingerprint(texts),
+            summaries.review_fingerprint(["Nice view", "Great pizza", "Slow service", "Great pizza"]),
+        )
+
+    def test_case_and_whitespace_do_not_change_the_key(self):
+        self.assertEqual(
+            summaries.review_fingerprint(["Great  pizza "]),
+            summaries.review_fingerprint(["great pizza"]),
+        )
+
+    def test_different_reviews_change_the_key(self):
+        self.assertNotEqual(
+            summaries.review_fingerprint(["Great pizza"]),
+            summaries.review_fingerprint(["Great pizza", "Slow service"]),
+        )
+
+
+class SummaryCacheTests(SimpleTestCase):
+    """Gemini is only called when no cached or stored summary exists"""
+
+    def setUp(self):
+        summaries.summaries_cache().clear()
+        model = mock.Mock()
+        model.generate_content_async = mock.AsyncMock(return_value=mock.Mock(text="Good food, slow service."))
+        patches = [
+            mock.patch.object(summaries.genai, "GenerativeModel", return_value=model),
+            mock.patch.object(summaries, "_load_summary", mock.AsyncMock(return_value=None)),
+            mock.patch.object(summaries, "_store_summary", mock.AsyncMock()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.model = model
+
+    def test_cache_hit_skips_gemini(self):
+        first = asyncio.run(summaries.get_summary(["Great pizza", "Slow service"], 2))
+        second = asyncio.run(summaries.get_summary(["slow service", "Great pizza"], 2))
+
+        self.assertEqual(first, ("Good food, slow service.", False))
+        self.assertEqual(second, ("Good food, slow service.", True))
+        self.model.generate_content_async.assert_awaited_once()
+
+    def test_stored_summary_skips_gemini(self):
+        summaries._load_summary.return_value = "Stored summary."
+
+        self.assertEqual(asyncio.run(summaries.get_summary(["Great pizza"], 1)), ("Stored summary.", True))
+        self.model.generate_content_async.assert_not_awaited()
@@ -1,10 +1,16 @@
+import json
 import os
 from dotenv import load_dotenv
-import requests
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
+import httpx
+from django.http import QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 import logging
 
+from core import http as outbound
+from core.json import JsonResponse
+from .summaries import get_summary
+
 # Gemini
 import google.generativeai as genai
 
@@ -18,14 +24,27 @@ logger = logging.getLogger(__name__)
 # Configure Gemini
 genai.configure(api_key=GEMINI_API_KEY)
 
-@api_view(['GET'])
-def get_place_reviews(request):
+# Both views are async: under ASGI, waiting on SerpApi or Gemini does not hold a worker thread.
+
+FORM_CONTENT_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+
+def _request_data(request):
+    """Parse the body like DRF's request.data did: JSON, or form/multipart fields"""
+    if request.content_type in FORM_CONTENT_TYPES:
+        return request.POST
+    return json.loads(request.body or b"[]")
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def get_place_reviews(request):
     """Fetch reviews from SerpApi using Google Maps query"""
     place_id = request.GET.get("place_id")
     query = request.GET.get("query")  # e.g., restaurant name + location
 
     if not place_id and not query:
-        return Response({"error": "place_id or query required"}, status=400)
+        return JsonResponse({"error": "place_id or query required"}, status=400)
 
     try:
         # Use Google Maps integration in SerpApi
@@ -43,7 +62,8 @@ def get_place_reviews(request):
         else:
             params["q"] = query
 
-        response = requests.get(url, params=params, timeout=10)
+        # Pooled keep-alive async client shared with the map proxy
+        response = await outbound.get_client().get(url, params=params, timeout=httpx.Timeout(10, connect=5))
         response.raise_for_status()
         
         serpapi_data = response.json()
@@ -57,38 +77,42 @@ def get_place_reviews(request):
         
         logger.info(f"Successfully fetched {len(reviews)} reviews for place_id: {place_id}")
         
-        return Response({
+        return JsonResponse({
             "reviews": reviews,
             "place_id": place_id,
             "review_count": len(reviews),
             "raw_response": serpapi_data  # For debugging
         })
     
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error(f"SerpApi request timed out for place_id: {place_id}")
-        return Response({"error": "Request timed out"}, status=504)
-    except requests.exceptions.RequestException as e:
+        return JsonResponse({"error": "Request timed out"}, status=504)
+    except httpx.HTTPError as e:
         logger.error(f"SerpApi request failed: {str(e)}")
-        return Response({"error": f"Failed to fetch reviews: {str(e)}"}, status=502)
+        return JsonResponse({"error": f"Failed to fetch reviews: {str(e)}"}, status=502)
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return Response({"error": "Internal server error"}, status=500)
+        return JsonResponse({"error": "Internal server error"}, status=500)
 
 
-@api_view(['POST'])
-def summarize_reviews(request):
+@csrf_exempt
+@require_http_methods(["POST"])
+async def summarize_reviews(request):
     """Summarize reviews using Gemini AI"""
     try:
-        reviews_data = request.data
+        reviews_data = _request_data(request)
         
         # Handle both direct reviews list and SerpApi response format
         if isinstance(reviews_data, list):
             reviews = reviews_data
+        elif isinstance(reviews_data, QueryDict):
+            # Form fields: one "reviews" entry per review text
+            reviews = reviews_data.getlist("reviews")
         else:
             reviews = reviews_data.get("reviews", [])
 
         if not reviews:
-            return Response({"error": "No reviews found"}, status=400)
+            return JsonResponse({"error": "No reviews found"}, status=400)
 
         # Extract review texts from SerpApi format
         texts = []
@@ -102,28 +126,18 @@ def summarize_reviews(request):
                 texts.append(review)
 
         if not texts:
-            return Response({"error": "No review text found"}, status=400)
-
-        combined = "\n\n".join(texts)
-
-        prompt = (
-            "Summarize these reviews in a few short sentences. "
-            "Focus only on the main opinions, strengths, weaknesses, and recurring themes. "
-            "Keep it concise and clear, no more than 40 words:\n\n" + combined
-        )
-
-        # Gemini AI call
-        model = genai.GenerativeModel("models/gemini-2.5-pro")
-        ai_response = model.generate_content(prompt)
+            return JsonResponse({"error": "No review text found"}, status=400)
 
-        summary = ai_response.text
+        # Reuse a summary of the same review set when one exists (Gemini is only called on a miss)
+        summary, cached = await get_summary(texts, len(reviews))
 
-        return Response({
+        return JsonResponse({
             "summary": summary,
             "review_count": len(reviews),
-            "text_count": len(texts)
+            "text_count": len(texts),
+            "cached": cached
         })
     
     except Exception as e:
         logger.error(f"Error in summarize_reviews: {str(e)}")
-        return Response({"error": f"Failed to summarize: {str(e)}"}, status=500)
+        return JsonResponse({"error": f"Failed to summarize: {str(e)}"}, status=500)
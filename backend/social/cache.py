@@ -0,0 +1,34 @@
+"""Cache de lecture des publications: détail par id et pages du fil par curseur
+
+Les noms affichés sont ceux du moment de la mise en cache: après un
+renommage (social.names), une page ou un détail déjà en cache garde
+l'ancien nom jusqu'à l'expiration de l'entrée (TTL du cache 'publications').
+"""
+from core.cache import get_cache, versions
+
+# Version du fil (core.cache.versions): toute écriture l'incrémente, ce qui
+# rend obsolètes d'un coup toutes les pages du fil déjà en cache
+FEED_VERSION = "feed"
+
+
+def publications_cache():
+    return get_cache("publications")
+
+
+def detail_key(pub_id):
+    """Clé du détail d'une publication"""
+    return f"publication:{pub_id}"
+
+
+def feed_key(user_id, author_id, cursor, limit, sort=None):
+    """Clé d'une page du fil pour la version courante des publications"""
+    version, = versions.get(FEED_VERSION)
+    return f"feed:v{version}:{sort or 'recent'}:{user_id or ''}:{author_id or ''}:{cursor or ''}:{limit or 'all'}"
+
+
+def invalidate_publications(*pub_ids):
+    """Invalide le détail des publications données et toutes les pages du fil"""
+    cache = publications_cache()
+    if pub_ids:
+        cache.delete_many([detail_key(pub_id) for pub_id in pub_ids])
+    versions.incr(FEED_VERSION)
@@ -0,0 +1,296 @@
+"""
+Écriture des notifications en arrière-plan, hors du chemin de la requête.
+
+Les vues déposent des documents déjà construits dans une file bornée; un
+thread du processus les regroupe et les écrit par lots: les événements de
+même destinataire, action et cible dans une même fenêtre de temps sont
+fusionnés en une seule notification (compteur + derniers acteurs), par un
+bulk_write d'upserts, puis les compteurs de non lues sont mis à jour en un
+second bulk_write. Une rafale d'activité sur une publication populaire
+donne donc un document mis à jour au lieu de milliers d'inserts. Une fois
+écrites, les notifications agrégées (_id, compteur, acteurs) sont poussées
+aux connexions SSE de leurs destinataires (social.realtime).
+
+Si la file est pleine ou si MongoDB refuse l'écriture, les documents sont
+ajoutés à un fichier local (une ligne JSON étendu par notification), rejoué
+au démarrage du thread et par la commande reconcile_notifications. Rejouer
+un lot déjà partiellement écrit peut compter deux fois un même événement
+dans le compteur d'une notification agrégée, jamais créer de doublon.
+
+La file est en mémoire: un arrêt normal (atexit, voir stop()) l'écrit ou la
+recopie dans le fichier, mais un arrêt brutal du processus (SIGKILL, OOM,
+plantage) perd les notifications acceptées et pas encore écrites, soit au
+plus FLUSH_INTERVAL secondes d'activité en temps normal. Si cette perte
+n'est pas acceptable, NOTIFICATION_QUEUE['ENABLED'] = False écrit chaque
+notification pendant la requête.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from bson import json_util
+from django.conf import settings
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from . import realtime
+from .models import Notification, UserProfile
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+_spool_lock = threading.Lock()
+
+
+def _config(name, default):
+    return getattr(settings, "NOTIFICATION_QUEUE", {}).get(name, default)
+
+
+def _group_key(doc):
+    """Clé de regroupement: même destinataire, même action, même cible, même fenêtre de temps"""
+    window = settings.NOTIFICATION_AGGREGATION["WINDOW"]
+    bucket = int(doc["created_at"].timestamp() // window)
+    target = doc.get("pub_id") or doc.get("description") or ""
+    return f"{doc['recipient_id']}|{doc['action_type']}|{target}|{bucket}"
+
+
+def _coalesce(docs):
+    """Regroupe les événements d'un lot par clé: (dernier événement, nombre, derniers acteurs)"""
+    max_actors = settings.NOTIFICATION_AGGREGATION["MAX_ACTORS"]
+    groups = {}
+    for doc in docs:
+        key = _group_key(doc)
+        _, count, actors = groups.get(key, (doc, 0, []))
+        actors = [a for a in actors if a["id"] != doc["sender_id"]]
+        actors.append({"id": doc["sender_id"], "name": doc.get("sender_name")})
+        groups[key] = (doc, count + 1, actors[-max_actors:])
+    return groups
+
+
+def _upsert(key, latest, count, actors):
+    """Upsert (pipeline) d'une notification agrégée encore ouverte (non lue)"""
+    max_actors = settings.NOTIFICATION_AGGREGATION["MAX_ACTORS"]
+    actor_ids = [a["id"] for a in actors]
+    return UpdateOne(
+        {"group_key": key},
+        [{"$set": {
+            "recipient_id": latest["recipient_id"],
+            "sender_id": latest["sender_id"],
+            "sender_name": latest.get("sender_name"),
+            "action_type": latest["action_type"],
+            "pub_id": latest.get("pub_id"),
+            "description": latest.get("description"),
+            "message": latest.get("message"),
+            "is_read": False,
+            # created_at reste celui du premier événement: la notification ne se déplace pas
+            # sous les curseurs (created_at, _id) de la boîte; updated_at date le dernier
+            "created_at": {"$ifNull": ["$created_at", latest["created_at"]]},
+            "updated_at": latest["created_at"],
+            "expires_at": latest["expires_at"],
+            "count": {"$add": [{"$ifNull": ["$count", 0]}, count]},
+            "actors": {"$slice": [
+                {"$concatArrays": [
+                    {"$filter": {
+                        "input": {"$ifNull": ["$actors", []]},
+                        "cond": {"$not": [{"$in": ["$$this.id", actor_ids]}]},
+                    }},
+                    actors,
+                ]},
+                -max_actors,
+            ]},
+        }}],
+        upsert=True,
+    )
+
+
+def write_batch(docs):
+    """Écrit un lot d'événements de notification, agrégés par cible et fenêtre de temps.
+
+    Chaque groupe devient un upsert sur la notification non lue de même
+    group_key (ex: "12 personnes ont aimé votre publication"); seules les
+    notifications nouvellement créées incrémentent le compteur de non lues.
+    Retourne le nombre de notifications créées.
+    """
+    if not docs:
+        return 0
+    groups = _coalesce(docs)
+    operations = [_upsert(key, *group) for key, group in groups.items()]
+    collection = Notification._get_collection()
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        created = list(result.upserted_ids)
+    except BulkWriteError as e:
+        # Deux processus ont créé le même groupe en même temps: le perdant
+        # (index unique sur group_key) rejoue son upsert, qui met alors à jour
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        created = [upsert["index"] for upsert in e.details.get("upserted", [])]
+        for error in errors:
+            collection.bulk_write([operations[error["index"]]])
+
+    recipients = list(groups.values())
+    unread = Counter(recipients[i][0]["recipient_id"] for i in created)
+    if unread:
+        UserProfile._get_collection().bulk_write([
+            UpdateOne(
+                {"user_id": recipient_id},
+                [{"$set": {"unread_notifications": {
+                    "$add": [{"$ifNull": ["$unread_notifications", 0]}, count]
+                }}}],
+            )
+            for recipient_id, count in unread.items()
+        ], ordered=False)
+    _publish(groups)
+    return len(created)
+
+
+def _publish(groups):
+    """Pousse l'état stocké des notifications écrites aux destinataires connectés en SSE"""
+    keys = [key for key, (latest, _, _) in groups.items() if realtime.hub.has_subscribers(latest["recipient_id"])]
+    if not keys:
+        return
+    # Import local: social.notifications importe ce module
+    from .notifications import serialize
+    try:
+        for doc in Notification._get_collection().find({"group_key": {"$in": keys}}):
+            notif = Notification._from_son(doc)
+            realtime.hub.publish(notif.recipient_id, "notification", serialize(notif))
+    except Exception:
+        # Le lot est écrit: le client rattrapera au prochain rechargement de sa boîte
+        logger.exception("Diffusion SSE de %d notifications échouée", len(keys))
+
+
+def spool(docs):
+    """Ajoute des notifications non écrites au fichier de secours local"""
+    path = _config("SPOOL_PATH", None)
+    if not path:
+        logger.error("%d notifications perdues (pas de NOTIFICATION_QUEUE['SPOOL_PATH'])", len(docs))
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _spool_lock, open(path, "a", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json_util.dumps(doc) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def replay_spool():
+    """Réécrit les notifications du fichier de secours; retourne le nombre insérées"""
+    path = _config("SPOOL_PATH", None)
+    if not path or not os.path.exists(path):
+        return 0
+    # Renommage atomique: un seul processus rejoue un même fichier
+    replaying = f"{path}.{os.getpid()}.replay"
+    with _spool_lock:
+        try:
+            os.replace(path, replaying)
+        except FileNotFoundError:
+            return 0
+
+    with open(replaying, encoding="utf-8") as f:
+        docs = [json_util.loads(line) for line in f if line.strip()]
+    batch_size = _config("BATCH_SIZE", 200)
+    inserted = 0
+    try:
+        for start in range(0, len(docs), batch_size):
+            inserted += write_batch(docs[start:start + batch_size])
+    except Exception:
+        # Remet le reste dans le fichier pour le prochain rejeu
+        spool(docs[start:])
+        logger.exception("Rejeu des notifications interrompu")
+    os.remove(replaying)
+    return inserted
+
+
+class NotificationDispatcher:
+    """File bornée + thread d'écriture par lots (batch_size ou flush_interval, le premier atteint)"""
+
+    def __init__(self, maxsize=10000, batch_size=200, flush_interval=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, doc):
+        """Dépose une notification sans attendre son écriture"""
+        self.start()
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            # Plutôt que de bloquer la requête, la notification part dans le fichier de secours
+            spool([doc])
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        # Toute erreur (MongoDB, BulkWriteError relancée, bogue) garde le lot et le thread en vie
+        try:
+            write_batch(batch)
+        except Exception:
+            logger.exception("Écriture de %d notifications échouée, copie locale", len(batch))
+            spool(batch)
+
+    def _run(self):
+        try:
+            replay_spool()
+        except Exception:
+            logger.exception("Rejeu du fichier de notifications impossible")
+        while True:
+            batch = self._next_batch()
+            stop = None in batch
+            self._write([doc for doc in batch if doc is not None])
+            if stop:
+                return
+
+    def stop(self, timeout=5):
+        """Vide la file puis arrête le thread (appelé à la sortie du processus)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        # Ce qui n'a pas pu être écrit à temps est conservé localement
+        leftover = []
+        while True:
+            try:
+                doc = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if doc is not None:
+                leftover.append(doc)
+        if leftover:
+            spool(leftover)
+
+
+dispatcher = NotificationDispatcher(
+    maxsize=_config("MAXSIZE", 10000),
+    batch_size=_config("BATCH_SIZE", 200),
+    flush_interval=_config("FLUSH_INTERVAL", 0.5),
+)
+atexit.register(dispatcher.stop)
@@ -0,0 +1,258 @@
+"""
+Relations d'abonnement, stockées comme arêtes (follower_id -> followee_id).
+
+Une arête par abonnement dans la collection follows, avec un index unique
+(follower_id, followee_id): suivre ou ne plus suivre est une écriture d'un
+document plus un $inc sur les compteurs followers_count / following_count
+des deux profils, quelle que soit la taille des comptes. Les listes sont
+paginées par curseur sur (followee_id | follower_id, -created_at, -_id).
+
+Les profils encore au format d'origine (listes followers/following) sont
+convertis en arêtes à la première opération qui les touche
+(ensure_migrated), puis leurs listes retirées et leurs compteurs
+recalculés; la commande migrate_follows convertit tout le reste d'un coup.
+"""
+from datetime import datetime
+
+from mongoengine import Q
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .models import FollowEdge, UserProfile
+from .pagination import keyset_filter, keyset_page
+
+DUPLICATE_KEY = 11000
+BATCH_SIZE = 1000
+
+# Profils dont les abonnements sont encore dans les anciennes listes
+LEGACY = {"$or": [{"followers.0": {"$exists": True}}, {"following.0": {"$exists": True}}]}
+MIGRATED = {"followers.0": {"$exists": False}, "following.0": {"$exists": False}}
+
+# Abonnés récents examinés par profil pour les abonnés en commun (au-delà, compte minoré)
+COMMON_FOLLOWERS_SCAN = 1000
+
+
+def _insert_edges(edges):
+    """Insère des arêtes en ignorant celles déjà présentes; retourne le nombre créées"""
+    if not edges:
+        return 0
+    try:
+        return len(FollowEdge._get_collection().insert_many(edges, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def recount(user_ids):
+    """Recalcule followers_count / following_count depuis les arêtes (profils déjà migrés)"""
+    user_ids = list(user_ids)
+    collection = FollowEdge._get_collection()
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        followers = {row["_id"]: row["count"] for row in collection.aggregate([
+            {"$match": {"followee_id": {"$in": chunk}}},
+            {"$group": {"_id": "$followee_id", "count": {"$sum": 1}}},
+        ])}
+        following = {row["_id"]: row["count"] for row in collection.aggregate([
+            {"$match": {"follower_id": {"$in": chunk}}},
+            {"$group": {"_id": "$follower_id", "count": {"$sum": 1}}},
+        ])}
+        UserProfile._get_collection().bulk_write([
+            UpdateOne(dict(MIGRATED, user_id=user_id), {"$set": {
+                "followers_count": followers.get(user_id, 0),
+                "following_count": following.get(user_id, 0),
+            }})
+            for user_id in chunk
+        ], ordered=False)
+
+
+def _migrate_chunk(profiles, now):
+    edges = []
+    touched = set()
+    for profile in profiles:
+        user_id = profile["user_id"]
+        followers = [f for f in profile.get("followers") or [] if f != user_id]
+        following = [f for f in profile.get("following") or [] if f != user_id]
+        # Les deux listes décrivent les mêmes arêtes; l'index unique élimine les doublons
+        edges += [{"follower_id": f, "followee_id": user_id, "created_at": now} for f in followers]
+        edges += [{"follower_id": user_id, "followee_id": f, "created_at": now} for f in following]
+        touched.update([user_id, *followers, *following])
+    inserted = _insert_edges(edges)
+    UserProfile._get_collection().update_many(
+        {"_id": {"$in": [profile["_id"] for profile in profiles]}},
+        {"$unset": {"followers": "", "following": ""}},
+    )
+    # Les profils touchés encore au format listes seront recomptés à leur propre migration
+    recount(touched)
+    return inserted
+
+
+def migrate_legacy(user_ids=None):
+    """Convertit les listes followers/following en arêtes (user_ids, ou tous les profils si None).
+
+    Retourne (arêtes créées, profils migrés).
+    """
+    query = dict(LEGACY) if user_ids is None else dict(LEGACY, user_id={"$in": list(user_ids)})
+    legacy = UserProfile._get_collection().find(query, {"user_id": 1, "followers": 1, "following": 1})
+    now = datetime.utcnow()
+    inserted = migrated = 0
+    chunk = []
+    for profile in legacy:
+        chunk.append(profile)
+        if len(chunk) >= BATCH_SIZE:
+            inserted += _migrate_chunk(chunk, now)
+            migrated += len(chunk)
+            chunk = []
+    if chunk:
+        inserted += _migrate_chunk(chunk, now)
+        migrated += len(chunk)
+    return inserted, migrated
+
+
+def ensure_migrated(*user_ids):
+    """Migre à la volée ceux de user_ids encore au format listes (une requête indexée sinon).
+
+    Retourne l'ensemble des user_id migrés par cet appel.
+    """
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if not user_ids:
+        return set()
+    legacy = {row["user_id"] for row in UserProfile._get_collection().find(
+        dict(LEGACY, user_id={"$in": user_ids}), {"_id": 0, "user_id": 1},
+    )}
+    if legacy:
+        migrate_legacy(legacy)
+    return legacy
+
+
+def _adjust_counts(follower_id, followee_id, delta):
+    profiles = UserProfile._get_collection()
+    profiles.update_one({"user_id": followee_id}, {"$inc": {"followers_count": delta}})
+    profiles.update_one({"user_id": follower_id}, {"$inc": {"following_count": delta}})
+
+
+def follow(follower_id, followee_id):
+    """Crée l'abonnement; retourne False s'il existait déjà"""
+    ensure_migrated(follower_id, followee_id)
+    try:
+        FollowEdge._get_collection().insert_one({
+            "follower_id": follower_id,
+            "followee_id": followee_id,
+            "created_at": datetime.utcnow(),
+        })
+    except DuplicateKeyError:
+        return False
+    _adjust_counts(follower_id, followee_id, 1)
+    return True
+
+
+def unfollow(follower_id, followee_id):
+    """Supprime l'abonnement; retourne False s'il n'existait pas"""
+    ensure_migrated(follower_id, followee_id)
+    result = FollowEdge._get_collection().delete_one({"follower_id": follower_id, "followee_id": followee_id})
+    if not result.deleted_count:
+        return False
+    _adjust_counts(follower_id, followee_id, -1)
+    return True
+
+
+def is_following(follower_id, followee_id):
+    ensure_migrated(follower_id, followee_id)
+    return FollowEdge._get_collection().count_documents(
+        {"follower_id": follower_id, "followee_id": followee_id}, limit=1
+    ) > 0
+
+
+def following_among(follower_id, user_ids):
+    """Sous-ensemble de user_ids suivis par follower_id (une requête)"""
+    user_ids = list(user_ids)
+    ensure_migrated(follower_id, *user_ids)
+    rows = FollowEdge._get_collection().find(
+        {"follower_id": follower_id, "followee_id": {"$in": user_ids}},
+        {"_id": 0, "followee_id": 1},
+    )
+    return {row["followee_id"] for row in rows}
+
+
+def counts(user_id):
+    """(followers_count, following_count) lus depuis les compteurs du profil"""
+    ensure_migrated(user_id)
+    profile = UserProfile.objects(user_id=user_id).only("followers_count", "following_count").as_pymongo().first()
+    profile = profile or {}
+    return profile.get("followers_count", 0), profile.get("following_count", 0)
+
+
+def follower_ids(user_id):
+    """Itère sur les identifiants des abonnés de user_id (curseur Mongo, sans tout charger)"""
+    ensure_migrated(user_id)
+    rows = FollowEdge._get_collection().find({"followee_id": user_id}, {"_id": 0, "follower_id": 1})
+    return (row["follower_id"] for row in rows)
+
+
+def followee_ids(user_id):
+    ensure_migrated(user_id)
+    rows = FollowEdge._get_collection().find({"follower_id": user_id}, {"_id": 0, "followee_id": 1})
+    return [row["followee_id"] for row in rows]
+
+
+def _page(match, id_field, cursor, limit):
+    query = match & keyset_filter(cursor) if cursor else match
+    edges, next_cursor = keyset_page(
+        FollowEdge.objects(query).order_by("-created_at", "-id").only(id_field, "created_at").limit(limit + 1),
+        limit,
+    )
+    return [getattr(edge, id_field) for edge in edges], next_cursor
+
+
+def followers_page(user_id, cursor, limit):
+    """Page des abonnés (plus récents d'abord): ([user_id, ...], curseur suivant)"""
+    ensure_migrated(user_id)
+    return _page(Q(followee_id=user_id), "follower_id", cursor, limit)
+
+
+def following_page(user_id, cursor, limit):
+    """Page des abonnements (plus récents d'abord): ([user_id, ...], curseur suivant)"""
+    ensure_migrated(user_id)
+    return _page(Q(follower_id=user_id), "followee_id", cursor, limit)
+
+
+def common_followers_counts(user_id, user_ids):
+    """Nombre d'abonnés que chaque profil de user_ids a en commun avec user_id.
+
+    Part des profils de la page: pour chacun, ses COMMON_FOLLOWERS_SCAN
+    abonnés les plus récents (index followee_id, -created_at) sont cherchés
+    parmi les abonnés de user_id (index unique follower_id, followee_id).
+    Le coût est borné par la taille de la page, pas par le nombre d'abonnés
+    de user_id; pour un profil plus suivi que la borne, le compte est minoré.
+    """
+    user_ids = list(user_ids)
+    ensure_migrated(user_id, *user_ids)
+    edges = FollowEdge._get_collection_name()
+    rows = UserProfile._get_collection().aggregate([
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$project": {"_id": 0, "user_id": 1}},
+        {"$lookup": {
+            "from": edges,
+            "let": {"followee": "$user_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$followee_id", "$$followee"]}}},
+                {"$sort": {"created_at": -1, "_id": -1}},
+                {"$limit": COMMON_FOLLOWERS_SCAN},
+                {"$lookup": {
+                    "from": edges,
+                    "let": {"follower": "$follower_id"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$follower_id", "$$follower"]}, "followee_id": user_id}},
+                        {"$project": {"_id": 1}},
+                    ],
+                    "as": "common",
+                }},
+                {"$match": {"common.0": {"$exists": True}}},
+                {"$count": "count"},
+            ],
+            "as": "common",
+        }},
+        {"$unwind": "$common"},
+    ])
+    return {row["user_id"]: row["common"]["count"] for row in rows}
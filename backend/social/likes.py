@@ -0,0 +1,203 @@
+"""
+Likes des publications, stockés comme arêtes (pub_id, user_id).
+
+Une arête par like dans la collection publication_likes, avec un index
+unique (pub_id, user_id). La publication ne garde qu'un compteur
+(likes_count) et l'aperçu des RECENT_LIKERS derniers user_id: sa taille
+et le coût d'une carte du fil ne dépendent plus du nombre de likes.
+isLiked est calculé pour toute une page en une requête (liked_among).
+
+Les publications qui portent encore l'ancien tableau likes sont converties
+en arêtes à la première opération qui les touche (ensure_migrated); les
+cartes du fil lisent leur compteur depuis ce tableau tant qu'il existe
+(voir serializers.PUBLICATION_CARD_FIELDS). La commande migrate_likes
+convertit tout le reste d'un coup.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from mongoengine import Q
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .models import LikeEdge, Publication
+from .pagination import keyset_filter, keyset_page
+
+RECENT_LIKERS = 3
+DUPLICATE_KEY = 11000
+BATCH_SIZE = 1000
+
+# Publications dont les likes sont encore dans le tableau embarqué
+LEGACY = {"likes.0": {"$exists": True}}
+
+
+def _insert_edges(edges):
+    """Insère des arêtes en ignorant celles déjà présentes; retourne le nombre créées"""
+    if not edges:
+        return 0
+    try:
+        return len(LikeEdge._get_collection().insert_many(edges, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def recount(pub_ids, unset_legacy=False):
+    """Recalcule likes_count et recent_likers depuis les arêtes des publications données"""
+    pub_ids = list(pub_ids)
+    publications = Publication._get_collection()
+    for start in range(0, len(pub_ids), BATCH_SIZE):
+        chunk = pub_ids[start:start + BATCH_SIZE]
+        counted = {row["_id"]: row for row in LikeEdge._get_collection().aggregate([
+            {"$match": {"pub_id": {"$in": chunk}}},
+            {"$sort": {"pub_id": 1, "created_at": 1}},
+            {"$group": {
+                "_id": "$pub_id",
+                "count": {"$sum": 1},
+                "recent": {"$lastN": {"input": "$user_id", "n": RECENT_LIKERS}},
+            }},
+        ])}
+        unset = {"$unset": {"likes": ""}} if unset_legacy else {}
+        publications.bulk_write([
+            UpdateOne({"_id": pub_id}, {
+                "$set": {
+                    "likes_count": counted.get(pub_id, {}).get("count", 0),
+                    "recent_likers": counted.get(pub_id, {}).get("recent", []),
+                },
+                **unset,
+            })
+            for pub_id in chunk
+        ], ordered=False)
+
+
+def migrate_legacy(pub_ids=None):
+    """Convertit les tableaux likes en arêtes (pub_ids, ou toutes les publications si None).
+
+    Retourne (arêtes créées, publications migrées).
+    """
+    query = dict(LEGACY) if pub_ids is None else dict(LEGACY, _id={"$in": list(pub_ids)})
+    legacy = Publication._get_collection().find(query, {"likes.user_id": 1, "likes.created_at": 1})
+    now = datetime.utcnow()
+    inserted = migrated = 0
+    chunk, edges = [], []
+    for pub in legacy:
+        chunk.append(pub["_id"])
+        edges += [
+            {"pub_id": pub["_id"], "user_id": like["user_id"], "created_at": like.get("created_at") or now}
+            for like in pub["likes"] if like.get("user_id")
+        ]
+        if len(chunk) >= BATCH_SIZE:
+            inserted += _insert_edges(edges)
+            recount(chunk, unset_legacy=True)
+            migrated += len(chunk)
+            chunk, edges = [], []
+    if chunk:
+        inserted += _insert_edges(edges)
+        recount(chunk, unset_legacy=True)
+        migrated += len(chunk)
+    return inserted, migrated
+
+
+def ensure_migrated(*pub_ids):
+    """Migre à la volée celles de pub_ids qui ont encore le tableau likes (une requête sur _id sinon).
+
+    Retourne l'ensemble des _id migrés par cet appel.
+    """
+    pub_ids = [ObjectId(pub_id) for pub_id in pub_ids if pub_id]
+    if not pub_ids:
+        return set()
+    legacy = {row["_id"] for row in Publication._get_collection().find(
+        dict(LEGACY, _id={"$in": pub_ids}), {"_id": 1},
+    )}
+    if legacy:
+        migrate_legacy(legacy)
+    return legacy
+
+
+def _update_publication(pub_id, update):
+    """Applique update à la publication; retourne likes_count ou None si elle n'existe pas"""
+    doc = Publication._get_collection().find_one_and_update(
+        {"_id": pub_id}, update, projection={"likes_count": 1}, return_document=ReturnDocument.AFTER,
+    )
+    return doc.get("likes_count", 0) if doc else None
+
+
+def toggle(pub_id, user_id):
+    """Ajoute ou retire le like de user_id.
+
+    Retourne (liked, likes_count, liked_at): liked_at est la date du like
+    ajouté ou retiré, None si rien n'a changé (like concurrent déjà
+    enregistré et compté). (None, None, None) si la publication n'existe pas.
+    """
+    pub_id = ObjectId(pub_id)
+    ensure_migrated(pub_id)
+    edges = LikeEdge._get_collection()
+
+    # Retire le like s'il existe (sa date sert à retirer son poids décru du score tendances)
+    removed = edges.find_one_and_delete({"pub_id": pub_id, "user_id": user_id}, projection={"created_at": 1})
+    if removed:
+        count = _update_publication(pub_id, {"$inc": {"likes_count": -1}, "$pull": {"recent_likers": user_id}})
+        return False, count, removed["created_at"]
+
+    if not Publication._get_collection().count_documents({"_id": pub_id}, limit=1):
+        return None, None, None
+
+    liked_at = datetime.utcnow()
+    try:
+        edges.insert_one({"pub_id": pub_id, "user_id": user_id, "created_at": liked_at})
+    except DuplicateKeyError:
+        # Like concurrent déjà enregistré (et déjà compté)
+        return True, counts([pub_id]).get(pub_id, 0), None
+    count = _update_publication(pub_id, {
+        "$inc": {"likes_count": 1},
+        "$push": {"recent_likers": {"$each": [user_id], "$slice": -RECENT_LIKERS}},
+    })
+    return True, count, liked_at
+
+
+def counts(pub_ids):
+    """{pub_id: likes_count} lus depuis les compteurs des publications"""
+    pub_ids = list(pub_ids)
+    ensure_migrated(*pub_ids)
+    rows = Publication._get_collection().find({"_id": {"$in": pub_ids}}, {"likes_count": 1})
+    return {row["_id"]: row.get("likes_count", 0) for row in rows}
+
+
+def is_liked(user_id, pub_id):
+    ensure_migrated(pub_id)
+    return LikeEdge._get_collection().count_documents(
+        {"pub_id": ObjectId(pub_id), "user_id": user_id}, limit=1
+    ) > 0
+
+
+def liked_among(user_id, pub_ids):
+    """Sous-ensemble de pub_ids (ObjectId) aimés par user_id (une requête)"""
+    if not user_id:
+        return set()
+    pub_ids = list(pub_ids)
+    ensure_migrated(*pub_ids)
+    rows = LikeEdge._get_collection().find(
+        {"pub_id": {"$in": pub_ids}, "user_id": user_id},
+        {"_id": 0, "pub_id": 1},
+    )
+    return {row["pub_id"] for row in rows}
+
+
+def likers_page(pub_id, cursor, limit):
+    """Page des user_id ayant aimé pub_id (plus récents d'abord): ([user_id, ...], curseur suivant)"""
+    ensure_migrated(pub_id)
+    query = Q(pub_id=ObjectId(pub_id))
+    if cursor:
+        query = query & keyset_filter(cursor)
+    edges, next_cursor = keyset_page(
+        LikeEdge.objects(query).order_by("-created_at", "-id").only("user_id", "created_at").limit(limit + 1),
+        limit,
+    )
+    return [edge.user_id for edge in edges], next_cursor
+
+
+def remove_publications(pub_ids):
+    """Supprime les likes de publications supprimées"""
+    if pub_ids:
+        LikeEdge._get_collection().delete_many({"pub_id": {"$in": list(pub_ids)}})
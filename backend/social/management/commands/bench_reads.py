@@ -0,0 +1,144 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from social import reads, serializers
+from social.likes import RECENT_LIKERS
+from social.models import Comment, ItineraryDay, Like, Place, Plan, PlanSnapshot, Publication, UserProfile
+
+BATCH_SIZE = 500
+
+
+class _FallbackNames:
+    """Resolver sans base: les deux chemins mesurés ne diffèrent que par la lecture"""
+
+    def get(self, user_id, default=None):
+        return default
+
+
+class Command(BaseCommand):
+    help = ("Compare, sur un jeu de données généré, la lecture hydratée (Document mongoengine) "
+            "et la lecture brute (social.reads) des plans, du fil et d'un profil")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plans", type=int, default=2000)
+        parser.add_argument("--publications", type=int, default=2000)
+        parser.add_argument("--places", type=int, default=20, help="Lieux par plan")
+        parser.add_argument("--likes", type=int, default=50, help="Likes et commentaires par publication")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keep", action="store_true", help="Ne pas supprimer le jeu de données")
+
+    def _seed(self, prefix, options):
+        """Insère le jeu de données; tous les auteurs commencent par prefix"""
+        start = datetime.utcnow() - timedelta(days=30)
+        places = [Place(id=f"p{i}", name=f"Lieu {i}") for i in range(options["places"])]
+        itinerary = [
+            ItineraryDay(day_index=day, date=start + timedelta(days=day), places=[f"p{(day * 3 + j) % len(places)}" for j in range(3)])
+            for day in range(max(1, options["places"] // 4))
+        ] if places else []
+
+        UserProfile._get_collection().insert_one(
+            UserProfile(user_id=f"{prefix}0", username="bench").to_mongo().to_dict()
+        )
+        plans = [
+            Plan(author_id=f"{prefix}{i % 50}", author_name="bench", city="Lyon", from_date=start,
+                 to_date=start + timedelta(days=7), is_public=True, place_bucket=places, itinerary=itinerary,
+                 created_at=start + timedelta(seconds=i)).to_mongo().to_dict()
+            for i in range(options["plans"])
+        ]
+        pubs = [
+            Publication(
+                shared_plan_id="bench", author_id=f"{prefix}{i % 50}", author_name="bench",
+                description="bench", created_at=start + timedelta(seconds=i),
+                plan_snapshot=PlanSnapshot(city="Lyon", from_date=start, to_date=start + timedelta(days=7),
+                                           place_bucket=places, itinerary=itinerary),
+                likes=[Like(user_id=f"{prefix}l{j}", user_name="bench") for j in range(options["likes"])],
+                likes_count=options["likes"],
+                recent_likers=[f"{prefix}l{j}" for j in range(options["likes"])][-RECENT_LIKERS:],
+                comments=[Comment(id=str(j), author_id=f"{prefix}l{j}", author_name="bench", text="bench")
+                          for j in range(options["likes"])],
+            ).to_mongo().to_dict()
+            for i in range(options["publications"])
+        ]
+        for rows, document_cls in ((plans, Plan), (pubs, Publication)):
+            for offset in range(0, len(rows), BATCH_SIZE):
+                document_cls._get_collection().insert_many(rows[offset:offset + BATCH_SIZE])
+
+    def _cleanup(self, prefix):
+        match = {"author_id": {"$regex": f"^{prefix}"}}
+        Plan._get_collection().delete_many(match)
+        Publication._get_collection().delete_many(match)
+        UserProfile._get_collection().delete_many({"user_id": {"$regex": f"^{prefix}"}})
+
+    def _time(self, repeat, fn):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        prefix = f"bench:{uuid.uuid4().hex[:8]}:"
+        resolver = _FallbackNames()
+        match = {"author_id": {"$regex": f"^{prefix}"}}
+
+        # Chemin précédent: documents complets aplatis en Python
+        def plans_hydrated():
+            return [
+                {
+                    "id": str(plan.id), "city": plan.city, "author": plan.author_name, "authorId": plan.author_id,
+                    "fromDate": plan.from_date.isoformat(), "toDate": plan.to_date.isoformat(),
+                    "placesCount": len(plan.place_bucket), "daysCount": len(plan.itinerary),
+                    "createdAt": plan.created_at.isoformat(),
+                }
+                for plan in Plan.objects(__raw__=match)
+            ]
+
+        def feed_hydrated():
+            return [
+                {
+                    "id": str(pub.id), "author": pub.author_name, "likes": len(pub.likes),
+                    "likedBy": [like.user_name for like in pub.likes], "commentsCount": len(pub.comments),
+                    "planSnapshot": serializers.serialize_snapshot(pub.plan_snapshot),
+                }
+                for pub in Publication.objects(__raw__=match).order_by("-created_at", "-id").limit(100)
+            ]
+
+        def profile_hydrated():
+            profile = UserProfile.objects.get(user_id=f"{prefix}0")
+            plans = Plan.objects(author_id=f"{prefix}0", is_public=True)
+            return profile.username, [len(plan.place_bucket) for plan in plans]
+
+        # Chemin brut
+        def plans_raw():
+            return [serializers.serialize_plan_card(plan, resolver) for plan in reads.plans(match)]
+
+        def feed_raw():
+            rows, _ = reads.feed_page(match, 100)
+            return [serializers.serialize_publication_card(row, resolver) for row in rows]
+
+        def profile_raw():
+            profile = reads.profile(f"{prefix}0")
+            plans = reads.plans({"author_id": f"{prefix}0", "is_public": True})
+            return profile["username"], [serializers.serialize_plan_summary(plan) for plan in plans]
+
+        self.stdout.write(f"Génération du jeu de données ({prefix})...")
+        self._seed(prefix, options)
+        try:
+            repeat = options["repeat"]
+            self.stdout.write(f"{'lecture':<22} {'hydratée (ms)':>14} {'brute (ms)':>11} {'gain':>6}")
+            for name, hydrated, raw in (
+                ("plans_list", plans_hydrated, plans_raw),
+                ("publications_feed", feed_hydrated, feed_raw),
+                ("user_profile", profile_hydrated, profile_raw),
+            ):
+                before = self._time(repeat, hydrated)
+                after = self._time(repeat, raw)
+                self.stdout.write(f"{name:<22} {before * 1000:>14.1f} {after * 1000:>11.1f} {before / after:>5.1f}x")
+        finally:
+            if not options["keep"]:
+                self._cleanup(prefix)
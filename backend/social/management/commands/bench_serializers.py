@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from social import serializers
+
+
+def _snapshot(places, days, places_per_day):
+    """Snapshot brut synthétique (même forme que as_pymongo())"""
+    start = datetime(2025, 1, 1)
+    return {
+        "city": "Lyon",
+        "from_date": start,
+        "to_date": start + timedelta(days=days - 1),
+        "place_bucket": [{"id": f"p{i}", "name": f"Lieu {i}"} for i in range(places)],
+        "itinerary": [
+            {
+                "day_index": day,
+                "date": start + timedelta(days=day),
+                # Les lieux du jour sont pris dans tout le catalogue
+                "places": [f"p{(day * places_per_day + j) * 7 % places}" for j in range(places_per_day)],
+            }
+            for day in range(days)
+        ],
+    }
+
+
+class _FallbackNames:
+    """Resolver sans base: seuls les noms recopiés (valeur de repli) sont utilisés"""
+
+    def get(self, user_id, default=None):
+        return default
+
+
+class Command(BaseCommand):
+    help = ("Mesure le coût de sérialisation d'une carte de publication selon la taille "
+            "de l'itinéraire (le coût par lieu doit rester constant)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--sizes", default="10,50,200,1000",
+                            help="Nombres de lieux du catalogue, séparés par des virgules")
+
+    def handle(self, *args, **options):
+        # Aucun nom à charger: seule la sérialisation est mesurée
+        resolver = _FallbackNames()
+        repeat = options["repeat"]
+
+        self.stdout.write(f"{'lieux':>8} {'jours':>6} {'µs/carte':>10} {'ns/lieu':>9}")
+        for places in (int(size) for size in options["sizes"].split(",")):
+            days = max(1, places // 5)
+            row = {
+                "_id": "bench",
+                "author_id": "u1",
+                "author_name": "Voyageur",
+                "created_at": datetime(2025, 1, 1),
+                "plan_snapshot": _snapshot(places, days, 5),
+            }
+            started = time.perf_counter()
+            for _ in range(repeat):
+                serializers.serialize_publication_card(row, resolver)
+            elapsed = (time.perf_counter() - started) / repeat
+            # Chaque lieu est sérialisé une fois dans le catalogue et une fois dans l'itinéraire
+            per_place = elapsed / (places + days * 5)
+            self.stdout.write(f"{places:>8} {days:>6} {elapsed * 1e6:>10.1f} {per_place * 1e9:>9.0f}")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from social import search
+from social.models import Plan, Publication
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Calcule les termes de recherche (search_terms) des plans et publications existants"
+
+    def _rebuild(self, document_cls, fields, terms):
+        collection = document_cls._get_collection()
+        updated = 0
+        operations = []
+        for row in collection.find({}, fields):
+            operations.append(UpdateOne({"_id": row["_id"]}, {"$set": {"search_terms": terms(row)}}))
+            if len(operations) >= BATCH_SIZE:
+                updated += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+        self.stdout.write(f"{collection.name}: {updated} documents mis à jour")
+
+    def handle(self, *args, **options):
+        self._rebuild(Plan, {"city": 1, "place_bucket.name": 1}, search.plan_terms)
+        self._rebuild(
+            Publication,
+            {"description": 1, "plan_snapshot.city": 1, "plan_snapshot.place_bucket.name": 1},
+            search.publication_terms,
+        )
+        self.stdout.write(self.style.SUCCESS("Index de recherche à jour"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from social import trending
+from social.cache import invalidate_publications
+
+
+class Command(BaseCommand):
+    help = ("Réapplique la décroissance des scores tendances (à lancer périodiquement, "
+            "ex: toutes les 10 minutes); --rebuild recalcule tous les scores depuis les événements")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Recalcule les scores de toutes les publications (première mise en service)")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            count = trending.rebuild()
+            self.stdout.write(f"{count} scores recalculés")
+        else:
+            count = trending.decay_all()
+            self.stdout.write(f"{count} scores décrus")
+        # Les pages ?sort=trending en cache reposent sur les anciens scores
+        invalidate_publications()
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+
+from social.models import Plan, Publication, Notification, UserProfile, User, TimelineEntry, LikeEdge, FollowEdge, UserSuggestions
+
+MODELS = [Plan, Publication, Notification, UserProfile, User, TimelineEntry, LikeEdge, FollowEdge, UserSuggestions]
+
+# Requêtes des vues servies par chaque index (clé: nom d'index MongoDB)
+INDEX_USAGE = {
+    "plans": {
+        "is_public_1_created_at_-1": ["plans_list"],
+        "author_id_1_is_public_1_created_at_-1": ["user_profile", "user_private_plans", "all_users (publicPlansCount)"],
+        "author_id_1_cloned_from_1": ["user_cloned_plans"],
+        "is_public_1_search_terms_1": ["plans_by_city"],
+    },
+    "publications": {
+        "created_at_-1__id_-1": ["publications_feed"],
+        "author_id_1_created_at_-1__id_-1": ["publications_feed (author_id)", "sync_publications_with_plans", "following_feed (auteurs en pull)"],
+        "shared_plan_id_1": ["unshare_plan"],
+        "search_terms_1": ["publications_by_city"],
+        "trend_score_-1_created_at_-1__id_-1": ["publications_feed (?sort=trending)"],
+    },
+    "notifications": {
+        "recipient_id_1_created_at_-1": ["user_notifications"],
+        "recipient_id_1_is_read_1_created_at_-1": ["user_notifications (?unread=1)", "mark_notifications_read"],
+        "expires_at_1": ["expiration TTL des notifications"],
+        "group_key_1": ["dispatcher (agrégation des notifications)"],
+    },
+    "user_profiles": {
+        "user_id_1": ["user_profile", "follow_user", "check_follow_status", "UsernameResolver", "compteurs d'abonnements"],
+        "created_at_-1__id_-1": ["all_users"],
+        "followers_count_-1_created_at_-1": ["user_suggestions (comptes populaires)"],
+    },
+    "timelines": {
+        "owner_id_1_created_at_-1_pub_id_-1": ["following_feed"],
+        "owner_id_1_author_id_1": ["unfollow_user", "remove_follower"],
+        "pub_id_1": ["unshare_plan"],
+    },
+    "publication_likes": {
+        "pub_id_1_user_id_1": ["like_publication", "isLiked (cartes du fil, détails)"],
+        "pub_id_1_created_at_-1__id_-1": ["publication_likes", "get_publication_details (likedBy)"],
+    },
+    "follows": {
+        "follower_id_1_followee_id_1": ["follow_user", "unfollow_user", "check_follow_status", "all_users (isFollowing, commonFollowers)", "user_suggestions"],
+        "followee_id_1_created_at_-1__id_-1": ["user_followers", "user_profile (followersList)", "fan-out timeline"],
+        "follower_id_1_created_at_-1__id_-1": ["user_following", "user_profile (followingList)"],
+    },
+    "user_suggestions": {
+        "user_id_1": ["user_suggestions"],
+    },
+    "users": {
+        "userId_1": ["update_user_profile"],
+        "email_1": ["login", "register"],
+        "username_1": ["register"],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Crée les index déclarés dans les modèles social et indique les requêtes qu'ils servent"
+
+    def handle(self, *args, **options):
+        for model in MODELS:
+            collection = model._get_collection()
+            before = set(collection.index_information())
+            model.ensure_indexes()
+            indexes = collection.index_information()
+            usage = INDEX_USAGE.get(collection.name, {})
+
+            self.stdout.write(self.style.MIGRATE_HEADING(collection.name))
+            for name in sorted(indexes):
+                if name == "_id_":
+                    continue
+                status = "existant" if name in before else "créé"
+                served = ", ".join(usage.get(name, [])) or "-"
+                self.stdout.write(f"  {name} [{status}] -> {served}")
+
+            # Index attendus mais absents (ex: nom personnalisé ou création échouée)
+            for name in sorted(set(usage) - set(indexes)):
+                self.stdout.write(self.style.WARNING(f"  {name} [manquant] -> {', '.join(usage[name])}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from social import follows
+from social.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Convertit les listes followers/following des profils en arêtes FollowEdge, "
+            "recalcule followers_count/following_count puis retire les anciennes listes")
+
+    def handle(self, *args, **options):
+        # Les profils non migrés le sont aussi à la volée (social.follows.ensure_migrated)
+        inserted, migrated = follows.migrate_legacy()
+        self.stdout.write(f"{inserted} arêtes d'abonnement créées ({migrated} profils convertis)")
+
+        # Compteurs recalculés depuis les arêtes pour tous les profils
+        user_ids = [row["user_id"] for row in UserProfile._get_collection().find({}, {"_id": 0, "user_id": 1})]
+        follows.recount(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés pour {len(user_ids)} profils"))
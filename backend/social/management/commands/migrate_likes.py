@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from social import likes
+from social.models import Publication
+
+
+class Command(BaseCommand):
+    help = ("Convertit les likes embarqués des publications en arêtes LikeEdge, "
+            "recalcule likes_count/recent_likers puis retire les anciens tableaux")
+
+    def handle(self, *args, **options):
+        # Les publications non migrées le sont aussi à la volée (social.likes.ensure_migrated)
+        inserted, migrated = likes.migrate_legacy()
+        self.stdout.write(f"{inserted} arêtes de like créées ({migrated} publications converties)")
+
+        # Compteurs et aperçu recalculés depuis les arêtes pour toutes les publications
+        pub_ids = [row["_id"] for row in Publication._get_collection().find({}, {"_id": 1})]
+        likes.recount(pub_ids)
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés pour {len(pub_ids)} publications"))
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social.dispatcher import replay_spool
+from social.models import Notification, UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Renseigne expires_at sur les anciennes notifications et recalcule "
+            "le compteur de non lues de chaque profil (dérive due aux expirations TTL)")
+
+    def handle(self, *args, **options):
+        notifications = Notification._get_collection()
+        profiles = UserProfile._get_collection()
+
+        # Notifications restées dans le fichier de secours du dispatcher
+        replayed = replay_spool()
+        self.stdout.write(f"{replayed} notifications rejouées depuis le fichier de secours")
+
+        # Notifications créées avant l'index TTL: expiration calculée depuis created_at
+        for is_read, days in ((True, settings.NOTIFICATION_READ_TTL_DAYS),
+                              (False, settings.NOTIFICATION_UNREAD_TTL_DAYS)):
+            result = notifications.update_many(
+                {"expires_at": None, "is_read": is_read},
+                [{"$set": {"expires_at": {"$add": ["$created_at", timedelta(days=days) // timedelta(milliseconds=1)]}}}],
+            )
+            state = "lues" if is_read else "non lues"
+            self.stdout.write(f"expires_at renseigné sur {result.modified_count} notifications {state}")
+
+        # Comptage réel des non lues, en une agrégation
+        counts = {
+            row["_id"]: row["count"]
+            for row in notifications.aggregate([
+                {"$match": {"is_read": False}},
+                {"$group": {"_id": "$recipient_id", "count": {"$sum": 1}}},
+            ])
+        }
+
+        fixed = 0
+        for profile in profiles.find({}, {"user_id": 1, "unread_notifications": 1}):
+            expected = counts.get(profile.get("user_id"), 0)
+            if profile.get("unread_notifications") != expected:
+                profiles.update_one({"_id": profile["_id"]}, {"$set": {"unread_notifications": expected}})
+                fixed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{fixed} compteurs de non lues corrigés"))
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social import suggestions
+from social.models import UserProfile, UserSuggestions
+
+
+class Command(BaseCommand):
+    help = "Précalcule les suggestions d'utilisateurs (à planifier, ex: toutes les heures)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Recalcule tout le monde, pas seulement les suggestions expirées")
+
+    def handle(self, *args, **options):
+        fresh = set()
+        if not options["all"]:
+            since = datetime.utcnow() - timedelta(seconds=settings.SUGGESTIONS["MAX_AGE"])
+            fresh = set(UserSuggestions.objects(computed_at__gte=since).scalar("user_id"))
+
+        computed = 0
+        for user_id in UserProfile.objects.scalar("user_id"):
+            if user_id in fresh:
+                continue
+            suggestions.compute(user_id)
+            computed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Suggestions recalculées pour {computed} utilisateurs"))
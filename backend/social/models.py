@@ -1,9 +1,11 @@
 from django.db import models
-from mongoengine import fields, Document, StringField, IntField, DateTimeField, ListField, ReferenceField, BooleanField, DictField, EmbeddedDocument, EmbeddedDocumentField, EmailField, ObjectIdField
+from mongoengine import fields, Document, StringField, IntField, FloatField, DateTimeField, ListField, ReferenceField, BooleanField, DictField, EmbeddedDocument, EmbeddedDocumentField, EmailField, ObjectIdField
 from datetime import datetime
 import bcrypt
 import uuid
 
+from . import search
+
 class Reply(EmbeddedDocument):
     """Réponse à un commentaire"""
     id = StringField(required=True)
@@ -65,11 +67,22 @@ class Plan(Document):
     cloned_from = StringField()  # ID de l'auteur original si c'est un clone
     cloned_from_plan_id = StringField()  # ID du plan original si c'est un clone
     
+    search_terms = ListField(StringField(), default=[])  # Index de recherche (voir search.py)
+    
     meta = {
         "collection": "plans",
         "ordering": ["-created_at"],
+        "indexes": [
+            ("is_public", "-created_at"),
+            ("author_id", "is_public", "-created_at"),
+            ("author_id", "cloned_from"),
+            ("is_public", "search_terms"),
+        ],
     }
 
+    def clean(self):
+        self.search_terms = search.plan_terms(self.to_mongo())
+
     def get_duration_days(self):
         """Retourne le nombre de jours du plan"""
         if self.from_date and self.to_date:
@@ -96,7 +109,10 @@ class Publication(Document):
     # Snapshot du plan au moment du partage
     plan_snapshot = EmbeddedDocumentField(PlanSnapshot)
     
-    # Likes
+    # Likes: arêtes LikeEdge et compteurs maintenus par social.likes
+    likes_count = IntField(default=0)
+    recent_likers = ListField(StringField(), default=[])  # derniers user_id (aperçu des cartes)
+    # Ancien stockage des likes, remplacé par LikeEdge (vidé par migrate_likes)
     likes = ListField(EmbeddedDocumentField(Like), default=[])
     
     # Commentaires
@@ -105,11 +121,44 @@ class Publication(Document):
     # Clonage
     cloned_by = ListField(StringField(), default=[])  # IDs des utilisateurs qui ont cloné
     
+    search_terms = ListField(StringField(), default=[])  # Index de recherche (voir search.py)
+    
+    # Score "tendances", décru jusqu'à trend_at (maintenu par social.trending)
+    trend_score = FloatField(default=0)
+    trend_at = DateTimeField()
+    
     meta = {
         "collection": "publications",
         "ordering": ["-created_at"],
+        "indexes": [
+            ("-created_at", "-id"),
+            ("author_id", "-created_at", "-id"),
+            "shared_plan_id",
+            "search_terms",
+            ("-trend_score", "-created_at", "-id"),
+        ],
     }
 
+    def clean(self):
+        self.search_terms = search.publication_terms(self.to_mongo())
+
+class TimelineEntry(Document):
+    """Entrée du fil "abonnements" matérialisé d'un utilisateur (fan-out à la publication)"""
+    owner_id = StringField(required=True)  # Utilisateur à qui appartient le fil
+    pub_id = ObjectIdField(required=True)
+    author_id = StringField(required=True)
+    created_at = DateTimeField(required=True)  # Date de la publication (ordre du fil)
+
+    meta = {
+        "collection": "timelines",
+        "indexes": [
+            {"fields": ["owner_id", "-created_at", "-pub_id"], "unique": True},
+            ("owner_id", "author_id"),
+            "pub_id",
+        ],
+    }
+
+
 class Notification(Document):
     """Notification pour un utilisateur"""
     recipient_id = StringField(required=True)
@@ -120,13 +169,65 @@ class Notification(Document):
     description = StringField()  # Description de la publication
     message = StringField()
     is_read = BooleanField(default=False)
-    created_at = DateTimeField(default=datetime.utcnow)
+    created_at = DateTimeField(default=datetime.utcnow)  # Premier événement (ordre de la boîte)
+    updated_at = DateTimeField()  # Dernier événement regroupé
+    expires_at = DateTimeField()  # Supprimée par MongoDB à cette date (index TTL)
+    # Agrégation à l'écriture: événements regroupés tant que la notification n'est pas lue
+    group_key = StringField()  # destinataire|action|cible|fenêtre, retiré à la lecture
+    count = IntField(default=1)  # nombre d'événements regroupés
+    actors = ListField(DictField())  # derniers acteurs: [{"id", "name"}]
 
     meta = {
         "collection": "notifications",
         "ordering": ["-created_at"],
+        "indexes": [
+            ("recipient_id", "-created_at"),
+            ("recipient_id", "is_read", "-created_at"),
+            {"fields": ["expires_at"], "expireAfterSeconds": 0},
+            {"fields": ["group_key"], "unique": True, "sparse": True},
+        ],
+    }
+
+class LikeEdge(Document):
+    """Like: user_id aime la publication pub_id"""
+    pub_id = ObjectIdField(required=True)
+    user_id = StringField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        "collection": "publication_likes",
+        "indexes": [
+            {"fields": ["pub_id", "user_id"], "unique": True},
+            ("pub_id", "-created_at", "-id"),
+        ],
     }
 
+
+class FollowEdge(Document):
+    """Abonnement: follower_id suit followee_id"""
+    follower_id = StringField(required=True)
+    followee_id = StringField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        "collection": "follows",
+        "indexes": [
+            {"fields": ["follower_id", "followee_id"], "unique": True},
+            ("followee_id", "-created_at", "-id"),
+            ("follower_id", "-created_at", "-id"),
+        ],
+    }
+
+
+class UserSuggestions(Document):
+    """Suggestions d'abonnements précalculées pour un utilisateur"""
+    user_id = StringField(required=True, unique=True)
+    suggestions = ListField(DictField())  # [{"user_id", "score"}], meilleures d'abord
+    computed_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {"collection": "user_suggestions"}
+
+
 class UserProfile(Document):
     """Profil utilisateur"""
     user_id = StringField(required=True, unique=True)
@@ -134,12 +235,20 @@ class UserProfile(Document):
     email = StringField()
     bio = StringField()
     avatar_url = StringField()
+    # Ancien stockage des abonnements, remplacé par FollowEdge (converti à la volée ou par migrate_follows)
     followers = ListField(StringField(), default=[])
     following = ListField(StringField(), default=[])
+    followers_count = IntField(default=0)  # Compteurs maintenus par social.follows
+    following_count = IntField(default=0)
+    unread_notifications = IntField(default=0)  # Compteur maintenu par social.notifications
     created_at = DateTimeField(default=datetime.utcnow)
 
     meta = {
         "collection": "user_profiles",
+        "indexes": [
+            ("-created_at", "-id"),
+            ("-followers_count", "-created_at"),
+        ],
     }
 
 
@@ -0,0 +1,50 @@
+"""
+Cache des noms affichés: user_id -> username, commun au processus.
+
+Les noms recopiés dans les documents (author_name, sender_name, user_name)
+ne servent plus que de valeur de repli: les sérialiseurs affichent le nom
+courant du profil, lu ici par lots (une requête pour tous les absents).
+
+Renommer ne touche que l'entrée de l'utilisateur renommé: les autres noms
+en cache restent valides. Avec le backend 'shared' le nouveau nom est vu
+par tous les processus immédiatement; avec le backend 'local' (un cache
+par processus), les autres processus le voient à l'expiration de l'entrée
+(TTL du cache 'usernames'). Les pages et détails de publications en cache
+(social.cache) gardent de même l'ancien nom jusqu'à leur propre TTL.
+"""
+from core.cache import get_cache
+from .models import UserProfile
+
+
+def names_cache():
+    return get_cache("usernames")
+
+
+def _key(user_id):
+    return f"name:{user_id}"
+
+
+def lookup(user_ids):
+    """{user_id: username} pour les profils existants, en une requête au plus"""
+    cache = names_cache()
+    names = {}
+    missing = []
+    for user_id in set(user_ids):
+        if not user_id:
+            continue
+        username = cache.get(_key(user_id))
+        if username is None:
+            missing.append(user_id)
+        else:
+            names[user_id] = username
+    if missing:
+        profiles = UserProfile.objects(user_id__in=missing).only("user_id", "username").as_pymongo()
+        for profile in profiles:
+            names[profile["user_id"]] = profile.get("username")
+            cache.set(_key(profile["user_id"]), profile.get("username"))
+    return names
+
+
+def rename(user_id, username):
+    """À appeler après l'enregistrement du profil renommé"""
+    names_cache().set(_key(user_id), username)
@@ -0,0 +1,183 @@
+"""Boîte de réception des notifications: création, pages, compteur de non lues, actions groupées"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.conf import settings
+
+from .dispatcher import dispatcher, write_batch
+from .models import Notification, UserProfile
+
+
+def build_message(sender_name, action_type, description=None):
+    """Message affiché pour une action (généré une seule fois, à l'écriture)"""
+    action_prefix = {
+        "like": f"{sender_name} a aimé votre publication",
+        "comment": f"{sender_name} a commenté votre publication",
+        "clone": f"{sender_name} a cloné votre plan"
+    }
+    base_message = action_prefix.get(action_type, f"{sender_name} a interagi avec votre publication")
+
+    # Limiter la description à 50 caractères pour éviter un message trop long
+    if description:
+        desc_preview = description[:50] + "..." if len(description) > 50 else description
+        return f"{base_message}: \"{desc_preview}\""
+    return base_message
+
+
+def build_aggregated_message(actors, count, action_type, description=None):
+    """Message d'une notification agrégée, ex: Alice, Bob et 10 autres ont aimé votre publication"""
+    names = [actor.get("name") or "Quelqu'un" for actor in reversed(actors)]
+    others = count - len(names)
+    if others > 0:
+        who = f"{', '.join(names)} et {others} autre{'s' if others > 1 else ''}"
+    elif len(names) > 1:
+        who = f"{', '.join(names[:-1])} et {names[-1]}"
+    else:
+        return build_message(names[0] if names else "", action_type, description)
+
+    action_suffix = {
+        "like": "ont aimé votre publication",
+        "comment": "ont commenté votre publication",
+        "clone": "ont cloné votre plan"
+    }
+    message = f"{who} {action_suffix.get(action_type, 'ont interagi avec votre publication')}"
+    if description:
+        desc_preview = description[:50] + "..." if len(description) > 50 else description
+        return f"{message}: \"{desc_preview}\""
+    return message
+
+
+def _expires_at(is_read, now=None):
+    """Date d'expiration (index TTL): les notifications lues sont gardées moins longtemps"""
+    days = settings.NOTIFICATION_READ_TTL_DAYS if is_read else settings.NOTIFICATION_UNREAD_TTL_DAYS
+    return (now or datetime.utcnow()) + timedelta(days=days)
+
+
+def _adjust_unread(user_id, delta):
+    """Ajuste le compteur de non lues du profil (jamais en dessous de 0)"""
+    if not delta:
+        return
+    UserProfile._get_collection().update_one(
+        {"user_id": user_id},
+        [{"$set": {"unread_notifications": {
+            "$max": [0, {"$add": [{"$ifNull": ["$unread_notifications", 0]}, delta]}]
+        }}}],
+    )
+
+
+def notify(recipient_id, sender_id, sender_name, action_type, pub_id=None, description=None, message=None):
+    """Enregistre un événement de notification pour le destinataire.
+
+    L'écriture est confiée au dispatcher (lots en arrière-plan), qui le
+    fusionne avec la notification non lue de même cible si elle existe,
+    puis pousse le document agrégé aux connexions SSE du destinataire.
+    L'_id retourné est celui de l'événement, pas forcément celui du
+    document agrégé.
+    """
+    now = datetime.utcnow()
+    notification = Notification(
+        id=ObjectId(),
+        recipient_id=recipient_id,
+        sender_id=sender_id,
+        sender_name=sender_name,
+        action_type=action_type,
+        pub_id=pub_id,
+        description=description,
+        message=message or build_message(sender_name, action_type, description),
+        created_at=now,
+        expires_at=_expires_at(False, now),
+    )
+    notification.validate()
+    doc = notification.to_mongo().to_dict()
+    if settings.NOTIFICATION_QUEUE.get("ENABLED", True):
+        dispatcher.submit(doc)
+    else:
+        write_batch([doc])
+    return notification
+
+
+def unread_count(user_id):
+    """Nombre de notifications non lues, lu depuis le compteur du profil (O(1))"""
+    profile = UserProfile.objects(user_id=user_id).only("unread_notifications").as_pymongo().first()
+    return (profile or {}).get("unread_notifications", 0)
+
+
+def _selection(user_id, ids=None):
+    query = {"recipient_id": user_id}
+    if ids is not None:
+        query["_id"] = {"$in": [ObjectId(i) for i in ids]}
+    return query
+
+
+def mark_read(user_id, ids=None):
+    """Marque comme lues les notifications données (toutes si ids est None), en un update_many"""
+    query = dict(_selection(user_id, ids), is_read=False)
+    result = Notification._get_collection().update_many(
+        query,
+        # La notification lue est close: les événements suivants en ouvrent une nouvelle
+        {"$set": {"is_read": True, "expires_at": _expires_at(True)}, "$unset": {"group_key": ""}},
+    )
+    _adjust_unread(user_id, -result.modified_count)
+    return result.modified_count
+
+
+def delete(user_id, ids=None):
+    """Supprime les notifications données (toutes si ids est None)"""
+    collection = Notification._get_collection()
+    query = _selection(user_id, ids)
+    # Les non lues d'abord, pour décrémenter le compteur du nombre exact supprimé
+    unread = collection.delete_many(dict(query, is_read=False)).deleted_count
+    read = collection.delete_many(query).deleted_count
+    _adjust_unread(user_id, -unread)
+    return unread + read
+
+
+def prefetch_names(resolver, notifs):
+    """Charge en une requête les noms courants des émetteurs et acteurs d'une page"""
+    resolver.prefetch(
+        [notif.sender_id for notif in notifs] +
+        [actor.get("id") for notif in notifs for actor in notif.actors]
+    )
+
+
+def serialize(notif, resolver=None):
+    """Représentation JSON d'une notification (clés camelCase et snake_case pour le frontend).
+
+    Avec un resolver, les noms affichés sont les noms courants des profils.
+    """
+    def name(user_id, stored):
+        return resolver.get(user_id, stored) if resolver else stored
+
+    sender_name = name(notif.sender_id, notif.sender_name)
+    actors = [dict(actor, name=name(actor.get("id"), actor.get("name"))) for actor in notif.actors]
+    count = notif.count or 1
+    if count > 1:
+        message = build_aggregated_message(actors, count, notif.action_type, notif.description)
+    else:
+        message = notif.message or build_message(sender_name, notif.action_type, notif.description)
+        # Le message enregistré commence par le nom de l'émetteur au moment de l'envoi
+        if notif.sender_name and sender_name != notif.sender_name and message.startswith(notif.sender_name):
+            message = sender_name + message[len(notif.sender_name):]
+    return {
+        "id": str(notif.id),
+        "sender": sender_name,
+        "sender_name": sender_name,
+        "senderId": notif.sender_id,
+        "sender_id": notif.sender_id,
+        "action": notif.action_type,
+        "action_type": notif.action_type,
+        "pubId": notif.pub_id,
+        "pub_id": notif.pub_id,
+        "recipientId": notif.recipient_id,
+        "recipient_id": notif.recipient_id,
+        "description": notif.description,
+        "message": message,
+        "count": count,
+        "actors": [{"userId": actor.get("id"), "username": actor.get("name")} for actor in actors],
+        "isRead": notif.is_read,
+        "is_read": notif.is_read,
+        "createdAt": notif.created_at.isoformat(),
+        "created_at": notif.created_at.isoformat(),
+        "updatedAt": (notif.updated_at or notif.created_at).isoformat(),
+        "updated_at": (notif.updated_at or notif.created_at).isoformat(),
+    }
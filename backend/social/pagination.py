@@ -0,0 +1,133 @@
+"""Pagination par curseur (keyset) sur le couple (created_at, _id)"""
+import base64
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine import Q
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# En-tête HTTP qui transporte le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def parse_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Lit le paramètre ?limit= en le bornant à [1, maximum]"""
+    try:
+        limit = int(request.GET.get("limit", default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def parse_page_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """parse_limit pour les listes qui étaient renvoyées en entier.
+
+    Sans ?limit= ni ?cursor=, retourne None: la liste complète est servie
+    (sans curseur), comme les clients existants l'attendent. Les clients
+    qui paginent envoient ?limit= et suivent X-Next-Cursor.
+    """
+    if "limit" not in request.GET and "cursor" not in request.GET:
+        return None
+    return parse_limit(request, default, maximum)
+
+
+def encode_cursor(created_at, obj_id):
+    """Encode (created_at, _id) en un curseur opaque"""
+    raw = f"{created_at.isoformat()}|{obj_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Décode un curseur; lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, obj_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), ObjectId(obj_id)
+    except (UnicodeError, ValueError, InvalidId) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+def keyset_filter(cursor):
+    """Filtre des documents strictement après le curseur dans l'ordre (-created_at, -_id)"""
+    created_at, obj_id = decode_cursor(cursor)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=obj_id)
+
+
+def keyset_match(cursor, id_field="_id"):
+    """Équivalent brut (filtre pymongo) de keyset_filter; id_field: champ de départage"""
+    created_at, obj_id = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, id_field: {"$lt": obj_id}},
+    ]}
+
+
+def keyset_page(rows, limit):
+    """Tronque rows (limit + 1 éléments demandés) et calcule le curseur suivant.
+
+    Les lignes peuvent être des documents ou des dicts bruts (champ _id).
+    limit=None: liste complète, sans curseur suivant.
+    """
+    rows = list(rows)
+    if limit is None:
+        return rows, None
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last["created_at"], last["_id"])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def encode_ranked_cursor(score, created_at, obj_id):
+    """Curseur d'un résultat trié par (-score, -created_at, -_id)"""
+    raw = f"{score}|{created_at.isoformat()}|{obj_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_ranked_cursor(cursor):
+    """Décode un curseur de recherche; lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        score, created_at, obj_id = raw.split("|", 2)
+        return float(score), datetime.fromisoformat(created_at), ObjectId(obj_id)
+    except (UnicodeError, ValueError, InvalidId) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+def ranked_match(cursor, score_field):
+    """Filtre brut des lignes strictement après le curseur dans l'ordre (-score, -created_at, -_id)"""
+    score, created_at, obj_id = decode_ranked_cursor(cursor)
+    return {"$or": [
+        {score_field: {"$lt": score}},
+        {score_field: score, "created_at": {"$lt": created_at}},
+        {score_field: score, "created_at": created_at, "_id": {"$lt": obj_id}},
+    ]}
+
+
+def ranked_page(rows, limit):
+    """keyset_page pour des lignes brutes portant leur score (_score)"""
+    rows = list(rows)
+    if limit is None:
+        return rows, None
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_ranked_cursor(last["_score"], last["created_at"], last["_id"])
+    return rows, next_cursor
+
+
+def with_next_cursor(response, next_cursor):
+    """Ajoute l'en-tête du curseur suivant à la réponse (si une page suit)"""
+    if next_cursor:
+        response[NEXT_CURSOR_HEADER] = next_cursor
+    return response
@@ -0,0 +1,49 @@
+"""
+Lectures des vues GET fréquentes, sans hydratation mongoengine.
+
+Les vues de liste et de profil lisaient des Document/EmbeddedDocument
+complets (tous les lieux, jours, commentaires...) aussitôt aplatis en
+dicts. Ici, les requêtes passent directement par pymongo avec une
+projection limitée aux champs affichés, et retournent des dicts bruts
+(clé _id, noms de champs Mongo) consommés par social.serializers.
+
+Lecture seule: les écritures restent sur les modèles (validation, clean()).
+"""
+from .models import Plan, Publication, UserProfile
+from .pagination import keyset_page
+from .serializers import PLAN_CARD_FIELDS, PUBLICATION_CARD_FIELDS
+
+PROFILE_FIELDS = {
+    "user_id": 1, "username": 1, "email": 1, "bio": 1, "avatar_url": 1,
+    "followers_count": 1, "following_count": 1, "created_at": 1,
+}
+
+_NEWEST_FIRST = {"created_at": -1, "_id": -1}
+
+
+def plans(match, **kwargs):
+    """Curseur des plans bruts correspondant à match (filtre Mongo), plus récents d'abord"""
+    return Plan._get_collection().aggregate([
+        {"$match": match},
+        {"$sort": _NEWEST_FIRST},
+        {"$project": PLAN_CARD_FIELDS},
+    ], **kwargs)
+
+
+def profile(user_id):
+    """Profil brut de user_id, ou None"""
+    return UserProfile._get_collection().find_one({"user_id": user_id}, PROFILE_FIELDS)
+
+
+def feed(match, limit=None, **kwargs):
+    """Curseur des cartes de publication brutes (voir PUBLICATION_CARD_FIELDS)"""
+    stages = [{"$match": match}, {"$sort": _NEWEST_FIRST}]
+    if limit is not None:
+        stages.append({"$limit": limit})
+    stages.append({"$project": PUBLICATION_CARD_FIELDS})
+    return Publication._get_collection().aggregate(stages, **kwargs)
+
+
+def feed_page(match, limit):
+    """Une page de cartes brutes: ([carte, ...], curseur suivant); limit=None: toutes les cartes"""
+    return keyset_page(feed(match, None if limit is None else limit + 1), limit)
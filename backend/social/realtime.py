@@ -0,0 +1,103 @@
+"""
+Diffusion en temps réel (Server-Sent Events) des notifications et du fil.
+
+Le hub est en mémoire du processus: chaque connexion SSE s'abonne avec sa
+propre file asyncio; le dispatcher de notifications (après écriture) et les
+vues (synchrones, exécutées dans un thread par ASGI) publient des deltas via
+call_soon_threadsafe sans attendre les clients. Un client ne reçoit que les événements émis par le worker auquel
+il est connecté: il recharge sa boîte (GET paginé) à chaque reconnexion,
+ce qui rattrape ce qu'un autre worker aurait pu émettre entre-temps.
+"""
+import asyncio
+import json
+import threading
+
+HEARTBEAT_SECONDS = 25
+SUBSCRIBER_QUEUE_SIZE = 100
+# Le navigateur attend ce délai (ms) avant de se reconnecter
+RETRY_MS = 5000
+
+
+class Hub:
+    """Abonnements par utilisateur; publish() est appelable depuis n'importe quel thread"""
+
+    def __init__(self):
+        self._subscribers = {}  # user_id -> {(boucle, asyncio.Queue)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event, data):
+        """Envoie un événement aux connexions de user_id (None: à toutes les connexions)"""
+        with self._lock:
+            if user_id is None:
+                targets = [s for subscriptions in self._subscribers.values() for s in subscriptions]
+            else:
+                targets = list(self._subscribers.get(user_id, ()))
+        message = (event, data)
+        for loop, q in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, q, message)
+            except RuntimeError:
+                # Boucle fermée: la connexion est déjà terminée
+                pass
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return user_id in self._subscribers
+
+    def connections(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+def _offer(q, message):
+    try:
+        q.put_nowait(message)
+    except asyncio.QueueFull:
+        # Client trop lent: on perd l'événement plutôt que de bloquer les autres,
+        # il sera visible au prochain rechargement de la boîte
+        pass
+
+
+hub = Hub()
+
+
+def publish_feed(publication_id, author_id):
+    """Signale une nouvelle publication à tous les clients connectés"""
+    hub.publish(None, "feed", {"publicationId": publication_id, "authorId": author_id})
+
+
+def _format(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(user_id, unread):
+    """Corps SSE d'une connexion: compteur initial puis deltas, jusqu'à la déconnexion"""
+    subscription = hub.subscribe(user_id)
+    _, q = subscription
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        yield _format("unread", {"unread": unread})
+        while True:
+            try:
+                event, data = await asyncio.wait_for(q.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Commentaire SSE: garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
+                continue
+            yield _format(event, data)
+    finally:
+        hub.unsubscribe(user_id, subscription)
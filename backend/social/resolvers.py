@@ -0,0 +1,63 @@
+"""Résolution groupée des user_id en usernames (évite les requêtes N+1)"""
+from . import names
+
+
+class UsernameResolver:
+    """Résout des user_id en usernames par lots.
+
+    Les noms viennent du cache de noms du processus (social.names); chaque
+    lot d'absents coûte une seule requête `user_id__in`. Les résultats (y
+    compris les profils introuvables) sont mémorisés pour la durée de vie du
+    resolver, c'est-à-dire une requête HTTP (voir get_resolver).
+    """
+
+    def __init__(self):
+        self._usernames = {}
+
+    def prefetch(self, user_ids):
+        """Charge en une requête tous les user_id pas encore connus"""
+        missing = {uid for uid in user_ids if uid and uid not in self._usernames}
+        if not missing:
+            return
+        self._usernames.update(names.lookup(missing))
+        # Mémorise aussi les absents pour ne pas les redemander
+        for uid in missing:
+            self._usernames.setdefault(uid, None)
+
+    def get(self, user_id, default=None):
+        """Retourne le username d'un user_id (préchargé ou chargé à la demande)"""
+        if user_id not in self._usernames:
+            self.prefetch([user_id])
+        username = self._usernames.get(user_id)
+        return username if username is not None else default
+
+    def exists(self, user_id):
+        """Indique si un profil existe pour ce user_id"""
+        self.prefetch([user_id])
+        return self._usernames.get(user_id) is not None
+
+    def users(self, user_ids, default=None):
+        """Liste [{userId, username}] dans l'ordre donné, avec une seule requête.
+
+        Si default est None, les profils introuvables sont ignorés.
+        """
+        user_ids = list(user_ids or [])
+        self.prefetch(user_ids)
+        data = []
+        for uid in user_ids:
+            username = self._usernames.get(uid)
+            if username is None:
+                if default is None:
+                    continue
+                username = default
+            data.append({"userId": uid, "username": username})
+        return data
+
+
+def get_resolver(request):
+    """Resolver mémorisé sur la requête HTTP courante"""
+    resolver = getattr(request, "_username_resolver", None)
+    if resolver is None:
+        resolver = UsernameResolver()
+        request._username_resolver = resolver
+    return resolver
@@ -0,0 +1,133 @@
+"""
+Recherche plein texte des plans et publications (index inversé embarqué).
+
+Chaque document porte un champ search_terms (index multikey): les préfixes
+(MIN_PREFIX à MAX_PREFIX caractères) des mots normalisés de la ville, des
+noms de lieux et de la description, étiquetés par champ ("c:", "p:", "t:").
+La normalisation (minuscules, accents retirés, mots vides français ignorés)
+est la même à l'indexation et à la requête: "sao" trouve "São Paulo",
+"mont" trouve "Montréal". Contrairement à un index $text, la recherche par
+préfixe et sans accents est servie par l'index.
+
+Une recherche exige que chaque mot de la requête soit présent dans au moins
+un champ; le score pondère le champ où il est trouvé (ville > lieux > texte).
+Les termes sont calculés à l'enregistrement (clean() des modèles); la
+commande build_search_index les recalcule pour les documents existants.
+Tant qu'elle n'a pas tourné, les documents sans termes restent trouvables
+par l'ancienne recherche (sous-chaîne sans casse, voir legacy_match), après
+les résultats indexés.
+"""
+import re
+import unicodedata
+
+from .pagination import ranked_match
+
+MIN_PREFIX = 2
+MAX_PREFIX = 15
+# Mots distincts de la description indexés (borne la taille du document)
+MAX_TEXT_WORDS = 100
+# Mots de requête pris en compte
+MAX_QUERY_WORDS = 8
+
+CITY, PLACE, TEXT = "c:", "p:", "t:"
+WEIGHTS = {CITY: 3, PLACE: 2, TEXT: 1}
+
+# Champs lus par l'ancienne recherche (legacy_match): les mêmes que ceux indexés
+PLAN_LEGACY_FIELDS = ("city", "place_bucket.name")
+PUBLICATION_LEGACY_FIELDS = ("plan_snapshot.city", "plan_snapshot.place_bucket.name", "description")
+
+STOPWORDS = {
+    "au", "aux", "ce", "ces", "dans", "de", "des", "du", "en", "et", "la", "le",
+    "les", "ou", "par", "pour", "sur", "un", "une", "the", "of", "and",
+}
+
+_WORD = re.compile(r"\w+")
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+
+def normalize(text):
+    """Mots normalisés d'un texte: minuscules, sans accents ni mots vides"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower().translate(_LIGATURES))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [word for word in _WORD.findall(text) if len(word) >= MIN_PREFIX and word not in STOPWORDS]
+
+
+def _prefixes(tag, words):
+    return {
+        tag + word[:length]
+        for word in words
+        for length in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1)
+    }
+
+
+def index_terms(city=None, places=(), text=None):
+    """Termes à stocker dans search_terms"""
+    text_words = list(dict.fromkeys(normalize(text)))[:MAX_TEXT_WORDS]
+    terms = _prefixes(CITY, normalize(city))
+    terms |= _prefixes(PLACE, [word for name in places for word in normalize(name)])
+    terms |= _prefixes(TEXT, text_words)
+    return sorted(terms)
+
+
+def plan_terms(plan):
+    """Termes d'un plan (document brut, ex: to_mongo())"""
+    return index_terms(
+        city=plan.get("city"),
+        places=[place.get("name") for place in plan.get("place_bucket") or []],
+    )
+
+
+def publication_terms(pub):
+    """Termes d'une publication (document brut): ville et lieux du snapshot, description"""
+    snapshot = pub.get("plan_snapshot") or {}
+    return index_terms(
+        city=snapshot.get("city"),
+        places=[place.get("name") for place in snapshot.get("place_bucket") or []],
+        text=pub.get("description"),
+    )
+
+
+def query_words(query):
+    """Mots de la requête (tronqués à MAX_PREFIX); liste vide si rien d'utile"""
+    return [word[:MAX_PREFIX] for word in dict.fromkeys(normalize(query))][:MAX_QUERY_WORDS]
+
+
+def legacy_match(query, paths):
+    """Filtre de l'ancienne recherche (sous-chaîne, sans casse) pour les documents sans termes"""
+    pattern = {"$regex": re.escape(query.strip()), "$options": "i"}
+    return {"$or": [{path: pattern} for path in paths]}
+
+
+def _score(words, fields):
+    return {"$add": [
+        {"$cond": [{"$in": [tag + word, {"$ifNull": ["$search_terms", []]}]}, WEIGHTS[tag], 0]}
+        for word in words
+        for tag in fields
+    ]}
+
+
+def pipeline(words, match, projection, cursor, limit, fields=(CITY, PLACE, TEXT), legacy=None):
+    """Pipeline d'agrégation d'une page de résultats, triés par pertinence puis récence.
+
+    match: filtre de base (dict Mongo) combiné aux mots; les lignes portent
+    leur score dans _score. legacy: filtre appliqué aux documents sans
+    search_terms (score 0). limit=None: tous les résultats, sans curseur
+    suivant. Lève ValueError si le curseur est invalide.
+    """
+    indexed = {"$and": [{"search_terms": {"$in": [tag + word for tag in fields]}} for word in words]}
+    if legacy:
+        # null: champ absent, []: document créé sans termes
+        indexed = {"$or": [indexed, {"$and": [{"search_terms": {"$in": [None, []]}}, legacy]}]}
+    stages = [
+        {"$match": {"$and": [match, indexed]}},
+        {"$addFields": {"_score": _score(words, fields)}},
+    ]
+    if cursor:
+        stages.append({"$match": ranked_match(cursor, "_score")})
+    stages.append({"$sort": {"_score": -1, "created_at": -1, "_id": -1}})
+    if limit is not None:
+        stages.append({"$limit": limit + 1})
+    stages.append({"$project": dict(projection, _score=1)})
+    return stages
@@ -0,0 +1,168 @@
+"""
+Sérialisation partagée des plans, snapshots et publications.
+
+Les fonctions acceptent indifféremment des documents mongoengine ou des
+lignes brutes (dicts issus de as_pymongo() / aggregate()), plus compactes
+et moins coûteuses à construire. Les lieux d'un itinéraire sont résolus
+par une table id -> lieu construite une fois par plan/snapshot: le coût
+est linéaire en (lieux + jours × lieux du jour), au lieu de parcourir tout
+le place_bucket pour chaque identifiant.
+"""
+from .likes import RECENT_LIKERS
+
+
+def _get(obj, name, default=None):
+    """Lecture d'un champ sur un dict brut ou un document"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        value = obj.get(name, default)
+    else:
+        value = getattr(obj, name, default)
+    return default if value is None else value
+
+
+def _isoformat(value):
+    return value.isoformat() if value else ""
+
+
+def place_map(place_bucket):
+    """Table {id (str): lieu} du catalogue de lieux"""
+    return {str(_get(place, "id")): place for place in place_bucket or []}
+
+
+def serialize_places(place_bucket):
+    return [
+        {
+            "name": _get(place, "name", _get(place, "title", "Lieu")),
+            "title": _get(place, "title", ""),
+            "description": _get(place, "description", ""),
+        }
+        for place in place_bucket or []
+    ]
+
+
+def serialize_itinerary(itinerary, places_by_id):
+    """Jours de l'itinéraire, lieux résolus via places_by_id (identifiants inconnus ignorés)"""
+    days = []
+    for day in itinerary or []:
+        day_places = []
+        for place_id in _get(day, "places", []):
+            place = places_by_id.get(str(place_id))
+            if place is not None:
+                day_places.append({"id": _get(place, "id"), "name": _get(place, "name")})
+        days.append({
+            "dayIndex": _get(day, "day_index", 0),
+            "date": _isoformat(_get(day, "date")),
+            "description": _get(day, "description", ""),
+            "places": day_places,
+            "activities": _get(day, "activities", []),
+        })
+    return days
+
+
+def serialize_snapshot(snapshot):
+    """Contenu d'un plan (Plan ou PlanSnapshot): ville, dates, lieux et itinéraire"""
+    if not snapshot:
+        return None
+    place_bucket = _get(snapshot, "place_bucket", [])
+    places = serialize_places(place_bucket)
+    itinerary = serialize_itinerary(_get(snapshot, "itinerary", []), place_map(place_bucket))
+    return {
+        "city": _get(snapshot, "city"),
+        "fromDate": _isoformat(_get(snapshot, "from_date")),
+        "toDate": _isoformat(_get(snapshot, "to_date")),
+        "placesCount": len(places),
+        "daysCount": len(itinerary),
+        "placeBucket": places,
+        "itinerary": itinerary,
+    }
+
+
+# Projection des champs affichés par une carte du fil d'actualité: les compteurs
+# (likes, commentaires, clones) sont calculés ou lus côté serveur, les commentaires
+# et les listes d'identifiants ne sont jamais chargés. isLiked vient de
+# social.likes.liked_among, une requête par page. Tant que l'ancien tableau likes
+# n'a pas été converti en arêtes (social.likes.ensure_migrated), le compteur et
+# l'aperçu en sont tirés.
+_LEGACY_LIKES = {"$ifNull": ["$likes", []]}
+_HAS_LEGACY_LIKES = {"$gt": [{"$size": _LEGACY_LIKES}, 0]}
+
+PUBLICATION_CARD_FIELDS = {
+    "author_id": 1,
+    "author_name": 1,
+    "description": 1,
+    "created_at": 1,
+    "plan_snapshot": 1,
+    "likes_count": {"$cond": [_HAS_LEGACY_LIKES, {"$size": _LEGACY_LIKES}, {"$ifNull": ["$likes_count", 0]}]},
+    "recent_likers": {"$cond": [
+        _HAS_LEGACY_LIKES,
+        {"$slice": [{"$map": {"input": _LEGACY_LIKES, "in": "$$this.user_id"}}, -RECENT_LIKERS]},
+        {"$ifNull": ["$recent_likers", []]},
+    ]},
+    "comments_count": {"$size": {"$ifNull": ["$comments", []]}},
+    "cloned_count": {"$size": {"$ifNull": ["$cloned_by", []]}},
+}
+
+
+def prefetch_card_names(resolver, rows):
+    """Charge en une fois les noms des auteurs et des derniers likes d'un lot de cartes"""
+    resolver.prefetch(
+        [row.get("author_id") for row in rows] +
+        [uid for row in rows for uid in row.get("recent_likers", [])]
+    )
+
+
+def serialize_publication_card(pub, resolver, liked=False):
+    """Carte du fil à partir d'une ligne brute (issue de PUBLICATION_CARD_FIELDS).
+
+    Les noms affichés sont les noms courants (resolver), les noms recopiés servant de repli.
+    likedBy n'est qu'un aperçu des derniers likes (liste complète: publications/<id>/likes/).
+    """
+    liked_by = [resolver.get(uid) for uid in reversed(pub.get("recent_likers", []))]
+    return {
+        "id": str(pub["_id"]),
+        "authorId": pub.get("author_id"),
+        "author": resolver.get(pub.get("author_id"), pub.get("author_name")),
+        "description": pub.get("description"),
+        "createdAt": _isoformat(pub.get("created_at")),
+        "likes": pub.get("likes_count", 0),
+        "likedBy": [name for name in liked_by if name],
+        "commentsCount": pub.get("comments_count", 0),
+        "isLiked": liked,
+        "clonedBy": pub.get("cloned_count", 0),
+        "planSnapshot": serialize_snapshot(pub.get("plan_snapshot")),
+    }
+
+
+# Projection des champs lus par serialize_plan_summary / serialize_plan_card:
+# les lieux et jours sont comptés par Mongo, sans transférer les tableaux
+PLAN_CARD_FIELDS = {
+    "author_id": 1, "author_name": 1, "city": 1, "from_date": 1, "to_date": 1, "created_at": 1,
+    "is_public": 1, "cloned_from": 1, "cloned_from_plan_id": 1,
+    "places_count": {"$size": {"$ifNull": ["$place_bucket", []]}},
+    "days_count": {"$size": {"$ifNull": ["$itinerary", []]}},
+}
+
+
+def serialize_plan_summary(plan):
+    """Résumé d'un plan brut (issu de PLAN_CARD_FIELDS)"""
+    return {
+        "id": str(plan["_id"]),
+        "city": plan.get("city") or "",
+        "fromDate": _isoformat(plan.get("from_date")),
+        "toDate": _isoformat(plan.get("to_date")),
+        "placesCount": plan.get("places_count", 0),
+        "daysCount": plan.get("days_count", 0),
+        "createdAt": _isoformat(plan.get("created_at")),
+    }
+
+
+def serialize_plan_card(plan, resolver):
+    """Résumé d'un plan avec son auteur (liste ou recherche)"""
+    author_id = plan.get("author_id")
+    return dict(
+        serialize_plan_summary(plan),
+        author=resolver.get(author_id, plan.get("author_name") or "Voyageur"),
+        authorId=author_id,
+    )
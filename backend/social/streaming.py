@@ -0,0 +1,34 @@
+"""
+Mode flux (?stream=1) des listes: toute la collection, sans pagination.
+
+Les documents sont lus depuis un curseur Mongo par lots de BATCH_SIZE et
+sérialisés lot par lot (noms et compteurs chargés une fois par lot), puis
+encodés en un tableau JSON envoyé au fil de l'eau (core.json.stream_json).
+"""
+from core.json import stream_json
+
+BATCH_SIZE = 500
+
+
+def requested(request):
+    return request.GET.get("stream") in ("1", "true")
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def response(request, rows, serialize_batch, size=BATCH_SIZE):
+    """Réponse en flux: serialize_batch(lot) retourne les éléments JSON d'un lot de rows"""
+    def items():
+        for batch in _batches(rows, size):
+            yield from serialize_batch(batch)
+
+    return stream_json(request, items())
@@ -0,0 +1,123 @@
+"""
+Suggestions d'abonnements ("personnes que vous pourriez connaître").
+
+Score d'un candidat: nombre de personnes suivies par l'utilisateur qui le
+suivent aussi (amis d'amis), calculé par une agrégation bornée sur les
+arêtes FollowEdge: au plus SEED_LIMIT abonnements récents explorés, au plus
+FANOUT_LIMIT abonnements lus pour chacun, classement et limite côté MongoDB.
+Les comptes les plus suivis complètent la liste si le réseau est trop petit.
+
+Le résultat est précalculé par utilisateur (collection user_suggestions,
+rafraîchie au-delà de MAX_AGE ou par la commande refresh_suggestions) et
+gardé dans le cache applicatif 'suggestions'.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from core.cache import get_cache
+from . import follows
+from .models import FollowEdge, UserProfile, UserSuggestions
+
+
+def _config(name):
+    return settings.SUGGESTIONS[name]
+
+
+def suggestions_cache():
+    return get_cache("suggestions")
+
+
+def _cache_key(user_id):
+    return f"suggestions:{user_id}"
+
+
+def _friends_of_friends(user_id, size):
+    """[(candidat, score)] classés par nombre d'abonnements en commun, hors comptes déjà suivis"""
+    collection_name = FollowEdge._get_collection_name()
+    rows = FollowEdge._get_collection().aggregate([
+        {"$match": {"follower_id": user_id}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": _config("SEED_LIMIT")},
+        {"$lookup": {
+            "from": collection_name,
+            "let": {"seed": "$followee_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$follower_id", "$$seed"]}}},
+                {"$sort": {"created_at": -1}},
+                {"$limit": _config("FANOUT_LIMIT")},
+                {"$project": {"_id": 0, "followee_id": 1}},
+            ],
+            "as": "next",
+        }},
+        {"$unwind": "$next"},
+        {"$match": {"next.followee_id": {"$ne": user_id}}},
+        {"$group": {"_id": "$next.followee_id", "score": {"$sum": 1}}},
+        {"$sort": {"score": -1, "_id": 1}},
+        # Anti-jointure sur l'index unique (follower_id, followee_id); après le tri,
+        # les étapes suivantes s'arrêtent dès que size candidats sont trouvés
+        {"$lookup": {
+            "from": collection_name,
+            "let": {"candidate": "$_id"},
+            "pipeline": [
+                {"$match": {"follower_id": user_id, "$expr": {"$eq": ["$followee_id", "$$candidate"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "already",
+        }},
+        {"$match": {"already": []}},
+        {"$limit": size},
+    ])
+    return [(row["_id"], row["score"]) for row in rows]
+
+
+def _popular(user_id, exclude, size):
+    """Comptes les plus suivis (index -followers_count) non encore suivis, pour compléter la liste"""
+    rows = UserProfile._get_collection().find(
+        {"user_id": {"$nin": list(exclude | {user_id})}},
+        {"_id": 0, "user_id": 1},
+    ).sort([("followers_count", -1), ("created_at", -1)]).limit(size * 2)
+    candidates = [row["user_id"] for row in rows]
+    followed = follows.following_among(user_id, candidates)
+    return [(candidate, 0) for candidate in candidates if candidate not in followed][:size]
+
+
+def compute(user_id):
+    """Calcule et enregistre les suggestions de user_id; retourne [{"user_id", "score"}]"""
+    size = _config("SIZE")
+    # Le graphe exploré part des abonnements de user_id: ceux encore au format listes sont convertis
+    follows.ensure_migrated(*follows.followee_ids(user_id))
+    ranked = _friends_of_friends(user_id, size)
+    if len(ranked) < size:
+        ranked += _popular(user_id, {candidate for candidate, _ in ranked}, size - len(ranked))
+
+    suggestions = [{"user_id": candidate, "score": score} for candidate, score in ranked]
+    UserSuggestions._get_collection().update_one(
+        {"user_id": user_id},
+        {"$set": {"suggestions": suggestions, "computed_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    suggestions_cache().set(_cache_key(user_id), suggestions)
+    return suggestions
+
+
+def _load(user_id):
+    stored = UserSuggestions.objects(user_id=user_id).as_pymongo().first()
+    max_age = timedelta(seconds=_config("MAX_AGE"))
+    if stored and stored.get("computed_at") and datetime.utcnow() - stored["computed_at"] < max_age:
+        return stored.get("suggestions", [])
+    return compute(user_id)
+
+
+def for_user(user_id, limit):
+    """Les limit meilleures suggestions de user_id, hors comptes suivis depuis le calcul"""
+    suggestions = suggestions_cache().get_or_set(_cache_key(user_id), lambda: _load(user_id))
+    # Sur-échantillonne pour absorber les abonnements faits depuis le précalcul
+    candidates = suggestions[:limit * 2]
+    followed = follows.following_among(user_id, [s["user_id"] for s in candidates])
+    return [s for s in candidates if s["user_id"] not in followed][:limit]
+
+
+def invalidate(user_id):
+    suggestions_cache().delete(_cache_key(user_id))
@@ -1,3 +1,519 @@
-from django.test import TestCase
+import json
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from bson import ObjectId
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+
+from core.cache import versions
+from . import (
+    dispatcher, follows, likes, names, notifications, pagination, search, serializers, timeline, trending, updates, views,
+)
+from .models import (
+    Comment, FollowEdge, Like, LikeEdge, Notification, Plan, Publication, Reaction, Reply, TimelineEntry, UserProfile,
+)
+
+TEST_DB = "plan_and_go_test"
+
+
+class MongoTestCase(SimpleTestCase):
+    """Tests sur une base MongoDB réelle (TEST_MONGODB_URI), vidée avant chaque test.
+
+    Ignorés si TEST_MONGODB_URI n'est pas défini: les mises à jour pipeline
+    et les agrégations testées ont besoin d'un vrai serveur.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        uri = os.getenv("TEST_MONGODB_URI")
+        if not uri:
+            raise unittest.SkipTest("TEST_MONGODB_URI non défini")
+        super().setUpClass()
+        disconnect()
+        connect(db=TEST_DB, host=uri, serverSelectionTimeoutMS=5000)
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect()
+        super().tearDownClass()
+
+    def setUp(self):
+        db = get_db()
+        db.client.drop_database(db.name)
+        # Les versions repartent de 0 avec la base: les copies du processus sont périmées
+        versions.forget()
+
+
+class KeysetCursorTests(SimpleTestCase):
+    """Curseurs opaques de social.pagination"""
+
+    def test_cursor_round_trip(self):
+        created_at = datetime(2026, 3, 14, 15, 9, 26, 535897)
+        obj_id = ObjectId()
+        cursor = pagination.encode_cursor(created_at, obj_id)
+        self.assertEqual(pagination.decode_cursor(cursor), (created_at, obj_id))
+
+    def test_ranked_cursor_round_trip(self):
+        created_at = datetime(2026, 3, 14, 15, 9, 26)
+        obj_id = ObjectId()
+        cursor = pagination.encode_ranked_cursor(2.5, created_at, obj_id)
+        self.assertEqual(pagination.decode_ranked_cursor(cursor), (2.5, created_at, obj_id))
+
+    def test_invalid_cursor(self):
+        for cursor in ("", "not-a-cursor", pagination.encode_ranked_cursor(1, datetime.utcnow(), ObjectId())):
+            with self.assertRaises(ValueError):
+                pagination.decode_cursor(cursor)
+
+    def test_keyset_page_next_cursor_points_at_last_row(self):
+        rows = [{"_id": ObjectId(), "created_at": datetime(2026, 1, day)} for day in (5, 4, 3)]
+        page, next_cursor = pagination.keyset_page(rows, 2)
+        self.assertEqual(page, rows[:2])
+        self.assertEqual(pagination.decode_cursor(next_cursor), (rows[1]["created_at"], rows[1]["_id"]))
+
+        # La page suivante commence strictement après la dernière ligne renvoyée
+        match = pagination.keyset_match(next_cursor)
+        self.assertEqual(match["$or"][0], {"created_at": {"$lt": rows[1]["created_at"]}})
+        self.assertEqual(match["$or"][1], {"created_at": rows[1]["created_at"], "_id": {"$lt": rows[1]["_id"]}})
+
+    def test_keyset_page_last_page(self):
+        rows = [{"_id": ObjectId(), "created_at": datetime(2026, 1, 1)}]
+        self.assertEqual(pagination.keyset_page(rows, 2), (rows, None))
+        self.assertEqual(pagination.keyset_page(rows, None), (rows, None))
+
+    def test_page_limit_is_optional(self):
+        factory = RequestFactory()
+        self.assertIsNone(pagination.parse_page_limit(factory.get("/")))
+        self.assertEqual(pagination.parse_page_limit(factory.get("/", {"limit": "5"})), 5)
+        self.assertEqual(pagination.parse_page_limit(factory.get("/", {"limit": "1000"})), pagination.MAX_LIMIT)
+        self.assertEqual(pagination.parse_page_limit(factory.get("/", {"cursor": "x"})), pagination.DEFAULT_LIMIT)
+
+
+def _event(sender_id, created_at, pub_id="pub1", recipient_id="owner", action_type="like"):
+    """Document d'événement tel que notifications.notify() le dépose dans la file"""
+    return {
+        "_id": ObjectId(),
+        "recipient_id": recipient_id,
+        "sender_id": sender_id,
+        "sender_name": sender_id.title(),
+        "action_type": action_type,
+        "pub_id": pub_id,
+        "message": f"{sender_id} a aimé votre publication",
+        "is_read": False,
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(days=90),
+    }
+
+
+@override_settings(NOTIFICATION_AGGREGATION={"WINDOW": 3600, "MAX_ACTORS": 2})
+class NotificationCoalescingTests(SimpleTestCase):
+    """Regroupement des événements d'un lot (social.dispatcher._coalesce)"""
+
+    def test_same_target_and_window_is_one_group(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        events = [_event(sender, start + timedelta(minutes=i)) for i, sender in enumerate(["ann", "bob", "cat"])]
+        groups = dispatcher._coalesce(events)
+        self.assertEqual(len(groups), 1)
+        latest, count, actors = next(iter(groups.values()))
+        self.assertIs(latest, events[-1])
+        self.assertEqual(count, 3)
+        # Seuls les MAX_ACTORS derniers acteurs sont gardés, le plus récent en dernier
+        self.assertEqual([actor["id"] for actor in actors], ["bob", "cat"])
+
+    def test_repeated_actor_is_listed_once(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        events = [_event(sender, start + timedelta(minutes=i)) for i, sender in enumerate(["ann", "bob", "ann"])]
+        _, count, actors = next(iter(dispatcher._coalesce(events).values()))
+        self.assertEqual(count, 3)
+        self.assertEqual([actor["id"] for actor in actors], ["bob", "ann"])
+
+    def test_target_action_recipient_and_window_split_groups(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        events = [
+            _event("ann", start),
+            _event("ann", start, pub_id="pub2"),
+            _event("ann", start, action_type="comment"),
+            _event("ann", start, recipient_id="other"),
+            _event("ann", start + timedelta(hours=1)),
+        ]
+        self.assertEqual(len(dispatcher._coalesce(events)), 5)
+
+
+class CreateNotificationViewTests(SimpleTestCase):
+    """POST /notifications/: la notification est mise en file, son identifiant renvoyé"""
+
+    def test_returns_the_queued_notification_id(self):
+        request = RequestFactory().post("/notifications/", json.dumps({
+            "recipient_id": "owner", "sender_id": "ann", "sender_name": "Ann", "action_type": "like",
+        }), content_type="application/json")
+        with mock.patch.object(dispatcher.dispatcher, "submit") as submit:
+            response = views.create_notification(request)
+
+        notification_id = json.loads(response.content)["notification_id"]
+        submit.assert_called_once()
+        self.assertEqual(str(submit.call_args.args[0]["_id"]), notification_id)
+
+
+@override_settings(NOTIFICATION_AGGREGATION={"WINDOW": 3600, "MAX_ACTORS": 2})
+class NotificationWriteTests(MongoTestCase):
+    """Écriture agrégée des notifications (social.dispatcher.write_batch)"""
+
+    def test_events_merge_into_the_open_notification(self):
+        UserProfile(user_id="owner", username="owner").save()
+        start = datetime(2026, 5, 1, 10, 0)
+
+        self.assertEqual(dispatcher.write_batch([_event("ann", start), _event("bob", start + timedelta(minutes=1))]), 1)
+        self.assertEqual(dispatcher.write_batch([_event("cat", start + timedelta(minutes=5))]), 0)
+
+        notif = Notification.objects.get(recipient_id="owner")
+        self.assertEqual(notif.count, 3)
+        self.assertEqual([actor["id"] for actor in notif.actors], ["bob", "cat"])
+        # La position dans la boîte (created_at) est celle du premier événement
+        self.assertEqual(notif.created_at, start)
+        self.assertEqual(notif.updated_at, start + timedelta(minutes=5))
+        self.assertEqual(UserProfile.objects.get(user_id="owner").unread_notifications, 1)
+
+    def test_read_notification_is_not_reopened(self):
+        UserProfile(user_id="owner", username="owner").save()
+        start = datetime(2026, 5, 1, 10, 0)
+        dispatcher.write_batch([_event("ann", start)])
+        notifications.mark_read("owner")
+
+        self.assertEqual(dispatcher.write_batch([_event("bob", start + timedelta(minutes=1))]), 1)
+        self.assertEqual(Notification.objects(recipient_id="owner").count(), 2)
+
+
+@override_settings(TIMELINE={"MAX_LENGTH": 2, "FANOUT_MAX_FOLLOWERS": 2, "BACKFILL": 10, "TRIM_EVERY": 1})
+class TimelineFanOutTests(MongoTestCase):
+    """Fan-out des publications dans les fils matérialisés (social.timeline)"""
+
+    def setUp(self):
+        super().setUp()
+        timeline.timelines_cache().clear()
+
+    def test_fan_out_trims_timelines_over_max_length(self):
+        UserProfile(user_id="author", username="author", followers_count=2).save()
+        FollowEdge(follower_id="full", followee_id="author").save()
+        FollowEdge(follower_id="empty", followee_id="author").save()
+        start = datetime(2026, 5, 1)
+        TimelineEntry._get_collection().insert_many([
+            {"owner_id": "full", "pub_id": ObjectId(), "author_id": "other", "created_at": start + timedelta(days=day)}
+            for day in range(2)
+        ])
+
+        pub_id = ObjectId()
+        self.assertEqual(timeline.fan_out(pub_id, "author", start + timedelta(days=2)), 2)
+
+        full = list(TimelineEntry.objects(owner_id="full").order_by("-created_at").scalar("created_at"))
+        self.assertEqual(full, [start + timedelta(days=2), start + timedelta(days=1)])
+        self.assertEqual(TimelineEntry.objects(owner_id="empty").count(), 1)
+
+    def test_page_merges_pull_authors_without_writing(self):
+        UserProfile(user_id="star", username="star", followers_count=3).save()
+        FollowEdge(follower_id="ann", followee_id="star").save()
+        start = datetime(2026, 5, 1)
+        pushed = [ObjectId() for _ in range(3)]
+        TimelineEntry._get_collection().insert_many([
+            {"owner_id": "ann", "pub_id": pub_id, "author_id": "other", "created_at": start + timedelta(days=day)}
+            for day, pub_id in enumerate(pushed)
+        ])
+        pulled = Publication._get_collection().insert_one(
+            {"author_id": "star", "created_at": start + timedelta(days=1, hours=12)}
+        ).inserted_id
+
+        first, cursor = timeline.page("ann", None, 2)
+        second, end = timeline.page("ann", cursor, 2)
+
+        self.assertEqual(first + second, [pushed[2], pulled, pushed[1], pushed[0]])
+        self.assertIsNone(end)
+        # La lecture ne réduit pas le fil, même au-delà de MAX_LENGTH
+        self.assertEqual(TimelineEntry.objects(owner_id="ann").count(), 3)
+
+
+class UsernameCacheTests(MongoTestCase):
+    """Cache des noms affichés (social.names)"""
+
+    def setUp(self):
+        super().setUp()
+        names.names_cache().clear()
+
+    def test_rename_only_replaces_the_renamed_user(self):
+        UserProfile(user_id="ann", username="ann").save()
+        UserProfile(user_id="bob", username="bob").save()
+        self.assertEqual(names.lookup(["ann", "bob"]), {"ann": "ann", "bob": "bob"})
+
+        UserProfile.objects(user_id="ann").update_one(set__username="anne")
+        names.rename("ann", "anne")
+        UserProfile.objects.delete()
+
+        # Les deux noms viennent du cache: seul celui de ann a changé
+        self.assertEqual(names.lookup(["ann", "bob"]), {"ann": "anne", "bob": "bob"})
+
+
+class CommonFollowersTests(MongoTestCase):
+    """Abonnés en commun d'une page de profils (social.follows)"""
+
+    def test_counts_are_bounded_by_the_page(self):
+        start = datetime(2026, 5, 1)
+        for user_id in ("me", "bob", "cat"):
+            UserProfile(user_id=user_id, username=user_id).save()
+        for day, (follower, followee) in enumerate([
+            ("x", "me"), ("y", "me"), ("z", "me"),
+            ("x", "bob"), ("y", "bob"), ("w", "bob"),
+            ("w", "cat"),
+        ]):
+            FollowEdge(follower_id=follower, followee_id=followee, created_at=start + timedelta(days=day)).save()
+
+        self.assertEqual(follows.common_followers_counts("me", ["bob", "cat"]), {"bob": 2})
+        # Seuls les 2 abonnés les plus récents de bob (w, y) sont examinés
+        with mock.patch.object(follows, "COMMON_FOLLOWERS_SCAN", 2):
+            self.assertEqual(follows.common_followers_counts("me", ["bob"]), {"bob": 1})
+
+
+class LegacyFollowsTests(MongoTestCase):
+    """Conversion à la volée des anciennes listes followers/following (social.follows)"""
+
+    def test_legacy_lists_are_migrated_on_first_read(self):
+        UserProfile(user_id="ann", username="ann", followers=["bob"], following=["bob", "cat"]).save()
+        UserProfile(user_id="bob", username="bob", followers=["ann"], following=["ann"]).save()
+        UserProfile(user_id="cat", username="cat").save()
+
+        self.assertEqual(follows.counts("ann"), (1, 2))
+        self.assertTrue(follows.is_following("bob", "ann"))
+        self.assertEqual(set(follows.following_page("ann", None, 10)[0]), {"bob", "cat"})
+        self.assertEqual(FollowEdge.objects.count(), 3)
+        # cat n'avait pas de listes: son compteur est recalculé depuis les arêtes créées pour ann
+        self.assertEqual(follows.counts("cat"), (1, 0))
+        self.assertEqual(UserProfile._get_collection().count_documents(follows.LEGACY), 0)
+
+    def test_follow_after_migration_keeps_counters_exact(self):
+        UserProfile(user_id="ann", username="ann", following=["bob"]).save()
+        UserProfile(user_id="bob", username="bob", followers=["ann"]).save()
+
+        self.assertFalse(follows.follow("ann", "bob"))
+        self.assertTrue(follows.unfollow("ann", "bob"))
+        self.assertEqual(follows.counts("ann"), (0, 0))
+        self.assertEqual(follows.counts("bob"), (0, 0))
+
+
+class SearchPipelineTests(SimpleTestCase):
+    """Recherche par préfixes (social.search)"""
+
+    def test_terms_ignore_case_and_accents(self):
+        terms = search.index_terms(city="São Paulo", text="Le Café")
+        self.assertIn("c:sao", terms)
+        self.assertIn("t:cafe", terms)
+        self.assertEqual(search.query_words("  SAO  de  "), ["sao"])
+
+    def test_legacy_match_escapes_the_query(self):
+        self.assertEqual(
+            search.legacy_match(" a.b ", ("city",)),
+            {"$or": [{"city": {"$regex": r"a\.b", "$options": "i"}}]},
+        )
+
+    def test_unlimited_pipeline_has_no_limit_stage(self):
+        stages = search.pipeline(["par"], {}, {"title": 1}, None, None)
+        self.assertFalse(any("$limit" in stage for stage in stages))
+        stages = search.pipeline(["par"], {}, {"title": 1}, None, 5)
+        self.assertIn({"$limit": 6}, stages)
+
+
+class SearchFallbackTests(MongoTestCase):
+    """Documents pas encore indexés (sans search_terms) trouvés par l'ancienne recherche"""
+
+    def test_documents_without_terms_come_after_indexed_ones(self):
+        collection = Plan._get_collection()
+        legacy_id = collection.insert_one({"city": "Lyon", "place_bucket": [{"id": "1", "name": "Hôtel de Paris"}],
+                                           "is_public": True, "created_at": datetime(2026, 2, 1)}).inserted_id
+        indexed_id = collection.insert_one({"city": "Paris", "is_public": True, "created_at": datetime(2026, 1, 1),
+                                            "search_terms": search.index_terms(city="Paris")}).inserted_id
+        collection.insert_one({"city": "Marseille", "is_public": True, "created_at": datetime(2026, 3, 1), "search_terms": []})
+
+        rows = list(collection.aggregate(search.pipeline(
+            search.query_words("paris"), {"is_public": True}, {"city": 1}, None, None,
+            legacy=search.legacy_match("paris", search.PLAN_LEGACY_FIELDS),
+        )))
+        # Trouvé par le nom d'un lieu, comme le serait un plan indexé
+        self.assertEqual([row["_id"] for row in rows], [indexed_id, legacy_id])
+
+
+TRENDING = {"HALF_LIFE_HOURS": 1, "WEIGHTS": {"publish": 1.0, "like": 1.0, "comment": 2.0, "clone": 3.0},
+            "MIN_SCORE": 0.01}
+
+
+@override_settings(TRENDING=TRENDING)
+class TrendingCursorTests(SimpleTestCase):
+    """Curseur du fil tendances (social.trending)"""
+
+    def test_scored_cursor_also_reaches_unscored_rows(self):
+        cursor = pagination.encode_ranked_cursor(0.0, datetime(2026, 1, 1), ObjectId())
+        self.assertIn({"trend_score": None}, trending._after(cursor)["$or"])
+
+    def test_unscored_cursor_stays_among_unscored_rows(self):
+        created_at, obj_id = datetime(2026, 1, 1), ObjectId()
+        match = trending._after(pagination.encode_ranked_cursor(trending.UNSCORED, created_at, obj_id))
+        self.assertIsNone(match["trend_score"])
+        self.assertEqual(match["$or"][1], {"created_at": created_at, "_id": {"$lt": obj_id}})
+
+
+@override_settings(TRENDING=TRENDING)
+class DecayedWeightTests(SimpleTestCase):
+    """Poids restant d'un événement (social.trending.decayed_weight)"""
+
+    def test_half_life(self):
+        at = datetime(2026, 5, 1, 10, 0)
+        self.assertEqual(trending.decayed_weight("comment", at, at), 2.0)
+        self.assertAlmostEqual(trending.decayed_weight("comment", at, at + timedelta(hours=1)), 1.0)
+        self.assertAlmostEqual(trending.decayed_weight("comment", at, at + timedelta(hours=3)), 0.25)
+        # Événement daté après now (horloges décalées): poids plein
+        self.assertEqual(trending.decayed_weight("like", at + timedelta(minutes=1), at), 1.0)
+
+
+@override_settings(TRENDING=TRENDING)
+class TrendingScoreTests(MongoTestCase):
+    """Score décru dans le temps, maintenu par mises à jour pipeline (social.trending)"""
+
+    def _publication(self, created_at, **fields):
+        return Publication._get_collection().insert_one(dict(fields, created_at=created_at)).inserted_id
+
+    def _score(self, pub_id):
+        return Publication._get_collection().find_one({"_id": pub_id})["trend_score"]
+
+    def test_record_decays_previous_score(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        pub_id = self._publication(start)
+        trending.record(pub_id, "comment", now=start)
+        self.assertAlmostEqual(self._score(pub_id), 2.0)
+        # Une demi-vie plus tard: 2 * 0.5 + 1
+        trending.record(pub_id, "like", now=start + timedelta(hours=1))
+        self.assertAlmostEqual(self._score(pub_id), 2.0)
+        trending.record(pub_id, "like", sign=-1, now=start + timedelta(hours=2))
+        self.assertAlmostEqual(self._score(pub_id), 0.0)
+
+    def test_unlike_removes_the_remaining_weight(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        pub_id = self._publication(start)
+        trending.record(pub_id, "like", now=start)
+        trending.record(pub_id, "like", sign=-1, now=start + timedelta(hours=1), at=start)
+        self.assertAlmostEqual(self._score(pub_id), 0.0)
+
+    def test_decay_all(self):
+        start = datetime(2026, 5, 1, 10, 0)
+        pub_id = self._publication(start, trend_score=4.0, trend_at=start)
+        faded_id = self._publication(start, trend_score=0.01, trend_at=start)
+        unscored_id = self._publication(start)
+
+        self.assertEqual(trending.decay_all(now=start + timedelta(hours=2)), 3)
+        self.assertAlmostEqual(self._score(pub_id), 1.0)
+        self.assertEqual(self._score(faded_id), 0)
+        self.assertEqual(self._score(unscored_id), 0)
+
+    def test_pages_cover_unscored_publications(self):
+        start = datetime(2026, 5, 1)
+        ids = [self._publication(start + timedelta(days=1), trend_score=1.0),
+               self._publication(start + timedelta(days=2), trend_score=0.0),
+               self._publication(start + timedelta(days=4)),
+               self._publication(start + timedelta(days=3))]
+        seen, cursor = [], None
+        while True:
+            rows, cursor = trending.page({}, {"_id": 1}, cursor, 1)
+            seen += [row["_id"] for row in rows]
+            if not cursor:
+                break
+        self.assertEqual(seen, ids)
+
+
+class LikeToggleTests(MongoTestCase):
+    """Arêtes de like et compteurs de la publication (social.likes.toggle)"""
+
+    def test_like_then_unlike(self):
+        pub_id = Publication._get_collection().insert_one({"created_at": datetime(2026, 5, 1)}).inserted_id
+
+        liked, count, liked_at = likes.toggle(str(pub_id), "ann")
+        self.assertEqual((liked, count), (True, 1))
+        self.assertIsNotNone(liked_at)
+        self.assertEqual(likes.toggle(str(pub_id), "bob")[:2], (True, 2))
+        self.assertEqual(Publication._get_collection().find_one({"_id": pub_id})["recent_likers"], ["ann", "bob"])
+
+        liked, count, unliked_at = likes.toggle(str(pub_id), "ann")
+        self.assertEqual((liked, count), (False, 1))
+        # Le retrait renvoie la date du like retiré (stockée à la milliseconde)
+        self.assertLess(abs(unliked_at - liked_at), timedelta(milliseconds=1))
+        self.assertEqual(Publication._get_collection().find_one({"_id": pub_id})["recent_likers"], ["bob"])
+        self.assertEqual(likes.liked_among("bob", [pub_id]), {pub_id})
+
+    def test_missing_publication(self):
+        self.assertEqual(likes.toggle(str(ObjectId()), "ann"), (None, None, None))
+        self.assertEqual(LikeEdge.objects.count(), 0)
+
+    def test_legacy_likes_are_migrated_on_first_access(self):
+        liked_at = datetime(2026, 4, 1)
+        pub_id = Publication._get_collection().insert_one({
+            "created_at": datetime(2026, 3, 1),
+            "likes": [{"user_id": user_id, "created_at": liked_at} for user_id in ("ann", "bob", "cat", "dan")],
+        }).inserted_id
+
+        # Carte du fil avant migration: compteur et aperçu tirés du tableau
+        card, = Publication._get_collection().aggregate([
+            {"$match": {"_id": pub_id}}, {"$project": serializers.PUBLICATION_CARD_FIELDS},
+        ])
+        self.assertEqual((card["likes_count"], card["recent_likers"]), (4, ["bob", "cat", "dan"]))
+
+        # Un like déjà présent dans le tableau est retiré, pas recompté
+        self.assertEqual(likes.toggle(str(pub_id), "ann"), (False, 3, liked_at))
+        pub = Publication._get_collection().find_one({"_id": pub_id})
+        self.assertNotIn("likes", pub)
+        self.assertEqual(pub["likes_count"], 3)
+        self.assertEqual(likes.liked_among("bob", [pub_id]), {pub_id})
+
+
+class EmbeddedUpdatesTests(MongoTestCase):
+    """Mises à jour atomiques des tableaux embarqués (social.updates)"""
+
+    def setUp(self):
+        super().setUp()
+        self.pub_id = str(Publication._get_collection().insert_one({
+            "comments": [Comment(id="1", author_id="ann", text="Super").to_mongo()],
+            "cloned_by": [],
+        }).inserted_id)
+        self.missing_id = str(ObjectId())
+
+    def _comment(self):
+        return Publication._get_collection().find_one({"_id": ObjectId(self.pub_id)})["comments"][0]
+
+    def test_toggle_like_twice_restores_the_document(self):
+        liked, doc = updates.toggle_like(Publication, self.pub_id, Like(user_id="bob"))
+        self.assertEqual((liked, doc["likes_count"]), (True, 1))
+        liked, doc = updates.toggle_like(Publication, self.pub_id, Like(user_id="bob"))
+        self.assertEqual((liked, doc["likes_count"]), (False, 0))
+
+    def test_toggle_like_on_missing_document(self):
+        self.assertEqual(updates.toggle_like(Publication, self.missing_id, Like(user_id="bob")), (None, None))
+
+    def test_toggle_reaction_twice_restores_the_comment(self):
+        reaction = Reaction(id="r1", author_id="bob", type="👍")
+        reactions = updates.toggle_reaction(Publication, self.pub_id, "1", reaction)
+        self.assertEqual([(r["author_id"], r["type"]) for r in reactions], [("bob", "👍")])
+        self.assertEqual(updates.toggle_reaction(Publication, self.pub_id, "1", reaction), [])
+        self.assertEqual(self._comment()["reactions"], [])
+
+    def test_toggle_reaction_on_missing_comment_or_document(self):
+        reaction = Reaction(id="r1", author_id="bob", type="👍")
+        self.assertIsNone(updates.toggle_reaction(Publication, self.pub_id, "2", reaction))
+        self.assertIsNone(updates.toggle_reaction(Publication, self.missing_id, "1", reaction))
+
+    def test_push_reply(self):
+        self.assertTrue(updates.push_reply(Publication, self.pub_id, "1", Reply(id="1", author_id="bob", text="Merci")))
+        self.assertEqual([reply["text"] for reply in self._comment()["replies"]], ["Merci"])
+        self.assertFalse(updates.push_reply(Publication, self.pub_id, "2", Reply(id="2", author_id="bob", text="?")))
+        self.assertFalse(updates.push_reply(Publication, self.missing_id, "1", Reply(id="3", author_id="bob", text="?")))
+
+    def test_add_cloner_ignores_duplicates(self):
+        self.assertEqual(updates.add_cloner(Publication, self.pub_id, "bob"), (True, 1))
+        self.assertEqual(updates.add_cloner(Publication, self.pub_id, "bob"), (False, 1))
+        self.assertEqual(updates.add_cloner(Publication, self.pub_id, "cat"), (True, 2))
+        self.assertEqual(Publication._get_collection().find_one({"_id": ObjectId(self.pub_id)})["cloned_by"], ["bob", "cat"])
+        self.assertEqual(updates.add_cloner(Publication, self.missing_id, "bob"), (None, None))
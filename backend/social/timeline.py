@@ -0,0 +1,176 @@
+"""
+Fil "abonnements" matérialisé (fan-out à l'écriture).
+
+À la publication, une entrée (owner_id, pub_id, created_at) est insérée dans
+le fil de chaque abonné de l'auteur: la lecture d'une page est alors une
+seule requête par intervalle sur l'index (owner_id, -created_at, -pub_id).
+Chaque fil est borné à environ TIMELINE['MAX_LENGTH'] entrées sans être
+compté: à chaque fan-out, un fil sur TRIM_EVERY (tiré au hasard) est réduit
+par trim(), soit en moyenne une réduction toutes les TRIM_EVERY insertions
+par fil. La lecture n'écrit jamais.
+
+Mode hybride: les publications des auteurs très suivis (plus de
+FANOUT_MAX_FOLLOWERS abonnés) ne sont pas recopiées chez chacun; elles sont
+lues à la demande sur l'index (author_id, -created_at, -_id) de Publication
+et fusionnées avec le fil matérialisé. La liste de ces auteurs, et pour
+chaque utilisateur ceux qu'il suit, sont gardées dans le cache 'timelines':
+une page est alors une requête par intervalle sur le fil (plus une sur les
+publications s'il suit de tels auteurs). Un auteur qui franchit le seuil
+est vu par ses abonnés à l'expiration du TTL de ce cache.
+"""
+import heapq
+import random
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError
+
+from core.cache import get_cache
+from . import follows
+from .models import FollowEdge, Publication, TimelineEntry, UserProfile
+from .pagination import encode_cursor, keyset_match
+
+DUPLICATE_KEY = 11000
+INSERT_CHUNK = 1000
+PULL_AUTHORS_KEY = "pull_authors"
+
+
+def _config(name):
+    return settings.TIMELINE[name]
+
+
+def timelines_cache():
+    return get_cache("timelines")
+
+
+def _followed_pull_key(user_id):
+    return f"pull_authors:{user_id}"
+
+
+def is_pull_author(author_id):
+    """Auteur trop suivi pour le fan-out: ses publications sont lues à la demande"""
+    return follows.counts(author_id)[0] > _config("FANOUT_MAX_FOLLOWERS")
+
+
+def pull_author_ids():
+    """Tous les auteurs en mode pull (index -followers_count), en cache"""
+    def load():
+        rows = UserProfile._get_collection().find(
+            {"followers_count": {"$gt": _config("FANOUT_MAX_FOLLOWERS")}}, {"_id": 0, "user_id": 1},
+        )
+        return [row["user_id"] for row in rows]
+
+    return timelines_cache().get_or_set(PULL_AUTHORS_KEY, load)
+
+
+def _pull_authors(user_id):
+    """Auteurs suivis par user_id dont les publications ne sont pas poussées, en cache"""
+    def load():
+        authors = pull_author_ids()
+        if not authors:
+            return []
+        follows.ensure_migrated(user_id)
+        rows = FollowEdge._get_collection().find(
+            {"follower_id": user_id, "followee_id": {"$in": authors}}, {"_id": 0, "followee_id": 1},
+        )
+        return [row["followee_id"] for row in rows]
+
+    return timelines_cache().get_or_set(_followed_pull_key(user_id), load)
+
+
+def _insert(entries):
+    """Insère des entrées de fil en ignorant celles déjà présentes (index unique)"""
+    collection = TimelineEntry._get_collection()
+    for start in range(0, len(entries), INSERT_CHUNK):
+        try:
+            collection.insert_many(entries[start:start + INSERT_CHUNK], ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+
+
+def fan_out(pub_id, author_id, created_at):
+    """Pousse une nouvelle publication dans le fil des abonnés de l'auteur.
+
+    Retourne le nombre de fils alimentés (0 pour un auteur en mode pull).
+    """
+    if is_pull_author(author_id):
+        return 0
+    follower_ids = list(follows.follower_ids(author_id))
+    entries = [
+        {"owner_id": follower_id, "pub_id": pub_id, "author_id": author_id, "created_at": created_at}
+        for follower_id in follower_ids
+    ]
+    _insert(entries)
+    # Environ len(follower_ids) / TRIM_EVERY sondages bornés (skip sur l'index), sans compter les fils
+    for owner_id in follower_ids:
+        if random.random() * _config("TRIM_EVERY") < 1:
+            trim(owner_id)
+    return len(entries)
+
+
+def backfill(owner_id, author_id):
+    """Ajoute au fil de owner_id les publications récentes d'un auteur qu'il vient de suivre"""
+    timelines_cache().delete(_followed_pull_key(owner_id))
+    if is_pull_author(author_id):
+        return
+    rows = Publication.objects(author_id=author_id).order_by("-created_at", "-id") \
+        .only("id", "created_at").limit(_config("BACKFILL")).as_pymongo()
+    entries = [
+        {"owner_id": owner_id, "pub_id": row["_id"], "author_id": author_id, "created_at": row["created_at"]}
+        for row in rows
+    ]
+    if entries:
+        _insert(entries)
+        trim(owner_id)
+
+
+def remove_author(owner_id, author_id):
+    """Retire du fil de owner_id les publications d'un auteur qu'il ne suit plus"""
+    timelines_cache().delete(_followed_pull_key(owner_id))
+    TimelineEntry._get_collection().delete_many({"owner_id": owner_id, "author_id": author_id})
+
+
+def remove_publications(pub_ids):
+    """Retire des publications supprimées de tous les fils"""
+    if pub_ids:
+        TimelineEntry._get_collection().delete_many({"pub_id": {"$in": list(pub_ids)}})
+
+
+def trim(owner_id):
+    """Borne le fil de owner_id à MAX_LENGTH entrées (les plus anciennes sont supprimées)"""
+    collection = TimelineEntry._get_collection()
+    oldest_kept = collection.find({"owner_id": owner_id}, {"created_at": 1, "pub_id": 1}) \
+        .sort([("created_at", -1), ("pub_id", -1)]).skip(_config("MAX_LENGTH") - 1).limit(1)
+    for entry in oldest_kept:
+        collection.delete_many({"owner_id": owner_id, "$or": [
+            {"created_at": {"$lt": entry["created_at"]}},
+            {"created_at": entry["created_at"], "pub_id": {"$lt": entry["pub_id"]}},
+        ]})
+
+
+def _after(cursor, id_field):
+    """Filtre brut des lignes strictement après le curseur dans l'ordre (-created_at, -id)"""
+    return keyset_match(cursor, id_field) if cursor else {}
+
+
+def page(user_id, cursor, limit):
+    """Une page du fil abonnements: retourne ([pub_id, ...], curseur suivant).
+
+    Lève ValueError si le curseur est invalide.
+    """
+    pushed = TimelineEntry._get_collection().find(
+        dict(_after(cursor, "pub_id"), owner_id=user_id),
+        {"_id": 0, "pub_id": 1, "created_at": 1},
+    ).sort([("created_at", -1), ("pub_id", -1)]).limit(limit + 1)
+    rows = [(row["created_at"], row["pub_id"]) for row in pushed]
+
+    pull_authors = _pull_authors(user_id)
+    if pull_authors:
+        pulled = Publication._get_collection().find(
+            dict(_after(cursor, "_id"), author_id={"$in": pull_authors}),
+            {"created_at": 1},
+        ).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1)
+        rows = heapq.nlargest(limit + 1, set(rows) | {(row["created_at"], row["_id"]) for row in pulled})
+
+    next_cursor = encode_cursor(*rows[limit - 1]) if len(rows) > limit else None
+    return [pub_id for _, pub_id in rows[:limit]], next_cursor
@@ -0,0 +1,160 @@
+"""
+Classement "tendances" des publications, par score décroissant dans le temps.
+
+Le score d'une publication est la somme des poids de ses événements
+(publication, likes, commentaires, clones), chacun divisé par deux toutes
+les HALF_LIFE_HOURS. Il est stocké déjà décru jusqu'à trend_at: un
+événement de poids w à l'instant t applique
+
+    trend_score <- trend_score * 0.5 ** ((t - trend_at) / HALF_LIFE) + w
+    trend_at    <- t
+
+en une seule mise à jour pipeline (atomique, sans relire le document).
+Le fil ?sort=trending lit l'index (-trend_score, -created_at, -_id).
+
+Les publications sans trend_score (antérieures au classement) sont triées
+après toutes les autres, comme le fait l'index; le curseur en tient compte
+et decay_trending leur donne un score de 0.
+
+La commande decay_trending, lancée périodiquement, ramène tous les scores
+au même instant. Entre deux passages, une publication sans activité garde
+le score de son dernier passage: elle est surestimée d'au plus un facteur
+2 ** (intervalle / HALF_LIFE) par rapport à une publication active.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import UpdateOne
+
+from .models import LikeEdge, Publication
+from .pagination import decode_ranked_cursor, ranked_match, ranked_page
+
+BATCH_SIZE = 1000
+# Score des lignes sans trend_score dans les curseurs (les vrais scores sont >= 0)
+UNSCORED = -1
+
+
+def _config(name):
+    return settings.TRENDING[name]
+
+
+def _half_life_ms():
+    return _config("HALF_LIFE_HOURS") * 3600 * 1000
+
+
+def _decay(value, since, now):
+    """Expression: value décru de since à now"""
+    elapsed_ms = {"$max": [0, {"$subtract": [now, {"$ifNull": [since, now]}]}]}
+    return {"$multiply": [value, {"$pow": [0.5, {"$divide": [elapsed_ms, _half_life_ms()]}]}]}
+
+
+def weight(event):
+    return _config("WEIGHTS")[event]
+
+
+def decayed_weight(event, at, now):
+    """Poids restant à now d'un événement survenu à at"""
+    elapsed_ms = max(0, (now - at).total_seconds() * 1000)
+    return weight(event) * 0.5 ** (elapsed_ms / _half_life_ms())
+
+
+def record(pub_id, event, sign=1, now=None, at=None):
+    """Ajoute (sign=1) ou retire (sign=-1, ex: like annulé) le poids d'un événement.
+
+    at: date de l'événement (défaut: now); un like retiré ne retire que ce
+    qu'il lui reste de poids.
+    """
+    now = now or datetime.utcnow()
+    score = {"$add": [
+        _decay({"$ifNull": ["$trend_score", 0]}, "$trend_at", now),
+        sign * decayed_weight(event, at or now, now),
+    ]}
+    Publication._get_collection().update_one(
+        {"_id": ObjectId(pub_id)},
+        [{"$set": {"trend_score": {"$max": [0, score]}, "trend_at": now}}],
+    )
+
+
+def decay_all(now=None):
+    """Ramène tous les scores non nuls à l'instant now; retourne le nombre de publications mises à jour"""
+    now = now or datetime.utcnow()
+    decayed = _decay("$trend_score", "$trend_at", now)
+    collection = Publication._get_collection()
+    result = collection.update_many(
+        {"trend_score": {"$gt": 0}},
+        [{"$set": {
+            "trend_score": {"$cond": [{"$lt": [decayed, _config("MIN_SCORE")]}, 0, decayed]},
+            "trend_at": now,
+        }}],
+    )
+    # Publications antérieures au classement: score 0 (null couvre le champ absent)
+    unscored = collection.update_many({"trend_score": None}, {"$set": {"trend_score": 0, "trend_at": now}})
+    return result.modified_count + unscored.modified_count
+
+
+def rebuild(now=None):
+    """Recalcule tous les scores depuis les dates des événements (publications existantes).
+
+    Les clones n'ont pas de date: ils sont comptés à la date de la publication.
+    Les likes sont lus depuis leurs arêtes (lancer migrate_likes avant).
+    """
+    now = now or datetime.utcnow()
+
+    def events(array, event):
+        return {"$sum": {"$map": {
+            "input": {"$ifNull": [array, []]},
+            "in": _decay(weight(event), "$$this.created_at", now),
+        }}}
+
+    publications = Publication._get_collection()
+    result = publications.update_many({}, [{"$set": {
+        "trend_score": {"$add": [
+            _decay(weight("publish"), "$created_at", now),
+            events("$comments", "comment"),
+            _decay({"$multiply": [weight("clone"), {"$size": {"$ifNull": ["$cloned_by", []]}}]}, "$created_at", now),
+        ]},
+        "trend_at": now,
+    }}])
+
+    # Likes: arêtes de la collection publication_likes, sommées par publication
+    operations = [
+        UpdateOne({"_id": row["_id"]}, {"$inc": {"trend_score": row["score"]}})
+        for row in LikeEdge._get_collection().aggregate([
+            {"$group": {"_id": "$pub_id", "score": {"$sum": _decay(weight("like"), "$created_at", now)}}},
+        ])
+    ]
+    for start in range(0, len(operations), BATCH_SIZE):
+        publications.bulk_write(operations[start:start + BATCH_SIZE], ordered=False)
+    return result.modified_count
+
+
+def _after(cursor):
+    """Filtre des lignes après le curseur, dans l'ordre de l'index (sans score en dernier)"""
+    score, created_at, obj_id = decode_ranked_cursor(cursor)
+    if score == UNSCORED:
+        return {"trend_score": None, "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": obj_id}},
+        ]}
+    match = ranked_match(cursor, "trend_score")
+    match["$or"].append({"trend_score": None})
+    return match
+
+
+def page(match, projection, cursor, limit):
+    """Une page du fil tendances (lignes brutes): ([ligne, ...], curseur suivant).
+
+    limit=None: tout le classement, sans curseur suivant.
+    Lève ValueError si le curseur est invalide.
+    """
+    if cursor:
+        match = {"$and": [match, _after(cursor)]}
+    stages = [
+        {"$match": match},
+        {"$sort": {"trend_score": -1, "created_at": -1, "_id": -1}},
+    ]
+    if limit is not None:
+        stages.append({"$limit": limit + 1})
+    stages.append({"$project": dict(projection, _score={"$ifNull": ["$trend_score", UNSCORED]})})
+    return ranked_page(Publication._get_collection().aggregate(stages), limit)
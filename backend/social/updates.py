@@ -0,0 +1,153 @@
+"""Mises à jour atomiques des tableaux embarqués (likes, commentaires, réponses, réactions).
+
+Ces fonctions n'envoient que l'opérateur de mise à jour ($push, $pull,
+$addToSet avec array_filters) et ne relisent que les champs projetés:
+le document complet n'est jamais chargé ni réécrit, et deux écritures
+concurrentes ne s'écrasent plus.
+"""
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+LIKES_COUNT = {"likes_count": {"$size": {"$ifNull": ["$likes", []]}}}
+
+
+def _projection(fields, extra=None):
+    projection = {field: 1 for field in fields}
+    projection.update(extra or {})
+    return projection
+
+
+def _comment_reactions(comment_id):
+    """Expression de projection: réactions du commentaire comment_id"""
+    return {
+        "$let": {
+            "vars": {
+                "comment": {
+                    "$arrayElemAt": [
+                        {"$filter": {"input": {"$ifNull": ["$comments", []]}, "cond": {"$eq": ["$$this.id", comment_id]}}},
+                        0,
+                    ]
+                }
+            },
+            "in": {"$ifNull": ["$$comment.reactions", []]},
+        }
+    }
+
+
+def exists(document_cls, doc_id):
+    """Vérifie l'existence d'un document sans le charger"""
+    return document_cls._get_collection().count_documents({"_id": ObjectId(doc_id)}, limit=1) > 0
+
+
+def toggle_like(document_cls, doc_id, like, fields=()):
+    """Ajoute ou retire le like de like.user_id.
+
+    Retourne (liked, doc) où doc contient likes_count et les champs demandés,
+    ou (None, None) si le document n'existe pas.
+    """
+    collection = document_cls._get_collection()
+    oid = ObjectId(doc_id)
+    projection = _projection(fields, LIKES_COUNT)
+
+    # Retire le like s'il existe
+    doc = collection.find_one_and_update(
+        {"_id": oid, "likes.user_id": like.user_id},
+        {"$pull": {"likes": {"user_id": like.user_id}}},
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc:
+        return False, doc
+
+    # Sinon ajoute le like (la condition évite un doublon si deux requêtes arrivent ensemble)
+    doc = collection.find_one_and_update(
+        {"_id": oid, "likes.user_id": {"$ne": like.user_id}},
+        {"$push": {"likes": like.to_mongo()}},
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc:
+        return True, doc
+
+    # Like concurrent déjà enregistré, ou document inexistant
+    doc = collection.find_one({"_id": oid}, projection)
+    return (True, doc) if doc else (None, None)
+
+
+def push_comment(document_cls, doc_id, comment, fields=()):
+    """Ajoute un commentaire; retourne les champs demandés ou None si le document n'existe pas"""
+    return document_cls._get_collection().find_one_and_update(
+        {"_id": ObjectId(doc_id)},
+        {"$push": {"comments": comment.to_mongo()}},
+        projection=_projection(fields or ("_id",)),
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def push_reply(document_cls, doc_id, comment_id, reply):
+    """Ajoute une réponse au commentaire comment_id; retourne False si le commentaire n'existe pas"""
+    result = document_cls._get_collection().update_one(
+        {"_id": ObjectId(doc_id), "comments.id": comment_id},
+        {"$push": {"comments.$[c].replies": reply.to_mongo()}},
+        array_filters=[{"c.id": comment_id}],
+    )
+    return result.matched_count > 0
+
+
+def toggle_reaction(document_cls, doc_id, comment_id, reaction):
+    """Ajoute ou retire la réaction (auteur, type) sur le commentaire comment_id.
+
+    Retourne la liste des réactions du commentaire après mise à jour,
+    ou None si le commentaire n'existe pas.
+    """
+    collection = document_cls._get_collection()
+    oid = ObjectId(doc_id)
+    projection = {"reactions": _comment_reactions(comment_id)}
+    match = {"author_id": reaction.author_id, "type": reaction.type}
+
+    # Retire la réaction si elle existe
+    doc = collection.find_one_and_update(
+        {"_id": oid, "comments": {"$elemMatch": {"id": comment_id, "reactions": {"$elemMatch": match}}}},
+        {"$pull": {"comments.$[c].reactions": match}},
+        array_filters=[{"c.id": comment_id}],
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc:
+        return doc["reactions"]
+
+    # Sinon ajoute la réaction
+    doc = collection.find_one_and_update(
+        {"_id": oid, "comments": {"$elemMatch": {"id": comment_id, "reactions": {"$not": {"$elemMatch": match}}}}},
+        {"$push": {"comments.$[c].reactions": reaction.to_mongo()}},
+        array_filters=[{"c.id": comment_id}],
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc:
+        return doc["reactions"]
+
+    # Réaction concurrente déjà enregistrée, ou commentaire inexistant
+    doc = collection.find_one({"_id": oid, "comments.id": comment_id}, projection)
+    return doc["reactions"] if doc else None
+
+
+def add_cloner(document_cls, doc_id, user_id):
+    """Ajoute user_id à cloned_by (sans doublon).
+
+    Retourne (ajouté, nombre de cloneurs), ou (None, None) si le document n'existe pas.
+    """
+    doc = document_cls._get_collection().find_one_and_update(
+        {"_id": ObjectId(doc_id)},
+        {"$addToSet": {"cloned_by": user_id}},
+        projection={
+            "cloned_count": {"$size": {"$ifNull": ["$cloned_by", []]}},
+            "already": {"$in": [user_id, {"$ifNull": ["$cloned_by", []]}]},
+        },
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not doc:
+        return None, None
+    if doc["already"]:
+        return False, doc["cloned_count"]
+    return True, doc["cloned_count"] + 1
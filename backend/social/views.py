@@ -1,8 +1,28 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
+from asgiref.sync import sync_to_async
+from mongoengine import Q
+from core.json import JsonResponse
 from .models import Plan, Comment, Like, Notification, UserProfile, User, Publication, PlanSnapshot, Reply, Reaction
+from .resolvers import UsernameResolver, get_resolver
+from . import updates
+from . import notifications
+from . import realtime
+from . import timeline
+from . import follows
+from . import suggestions
+from . import names
+from . import search
+from . import serializers
+from . import streaming
+from . import reads
+from . import trending
+from . import likes
+from .cache import publications_cache, detail_key, feed_key, invalidate_publications
+from .pagination import MAX_LIMIT, parse_limit, parse_page_limit, keyset_filter, keyset_match, keyset_page, ranked_page, with_next_cursor
 from datetime import datetime
 import uuid
 
@@ -58,9 +78,7 @@ def register(request):
             username=username,
             email=email,
             bio="",
-            avatar_url="",
-            followers=[],
-            following=[]
+            avatar_url=""
         )
         profile.save()
         
@@ -136,59 +154,33 @@ def login(request):
         }, status=500)
 
 
+def _plan_cards(rows):
+    """Cartes d'un lot de plans bruts (noms des auteurs chargés en une requête)"""
+    resolver = UsernameResolver()
+    resolver.prefetch(row.get("author_id") for row in rows)
+    return [serializers.serialize_plan_card(row, resolver) for row in rows]
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def plans_list(request):
-    """GET: récupère tous les plans publics (sauf ceux de l'utilisateur)"""
+    """GET: récupère tous les plans publics (sauf ceux de l'utilisateur)
+
+    ?stream=1: réponse en flux lue depuis un curseur, mémoire indépendante du nombre de plans
+    """
     
     try:
         user_id = request.GET.get("user_id", None)
         
-        # Récupère tous les plans publics
-        all_plans = Plan.objects(is_public=True)
-        
-        # Exclut les plans de l'utilisateur courant
+        # Plans publics, sauf ceux de l'utilisateur courant
+        match = {"is_public": True}
         if user_id:
-            plans = [p for p in all_plans if p.author_id != user_id]
-        else:
-            plans = list(all_plans)
+            match["author_id"] = {"$ne": user_id}
         
-        data = []
-        for plan in plans:
-            try:
-                # Get username from UserProfile
-                author_username = "Voyageur"
-                if plan.author_id:
-                    try:
-                        author_profile = UserProfile.objects.get(user_id=plan.author_id)
-                        author_username = author_profile.username
-                    except UserProfile.DoesNotExist:
-                        author_username = str(plan.author_name) if plan.author_name else "Voyageur"
-                
-                created_at = ""
-                if hasattr(plan, 'created_at') and plan.created_at:
-                    created_at = plan.created_at.isoformat()
-                
-                plan_data = {
-                    "id": str(plan.id) if plan.id else "",
-                    "city": str(plan.city) if plan.city else "",
-                    "author": author_username,
-                    "authorId": str(plan.author_id) if plan.author_id else "",
-                    "fromDate": plan.from_date.isoformat() if plan.from_date else "",
-                    "toDate": plan.to_date.isoformat() if plan.to_date else "",
-                    "placesCount": len(plan.place_bucket) if plan.place_bucket else 0,
-                    "daysCount": len(plan.itinerary) if plan.itinerary else 0,
-                    "createdAt": created_at,
-                }
-                
-                data.append(plan_data)
-            except Exception as e:
-                print(f"Erreur lors du traitement du plan: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                continue
+        if streaming.requested(request):
+            rows = reads.plans(match, batchSize=streaming.BATCH_SIZE)
+            return streaming.response(request, rows, _plan_cards)
         
-        return JsonResponse(data, safe=False)
+        return JsonResponse(_plan_cards(list(reads.plans(match))), safe=False)
         
     except Exception as e:
         print(f"ERREUR dans plans_list: {str(e)}")
@@ -229,6 +221,17 @@ def plan_detail(request, plan_id):
     try:
         plan = Plan.objects.get(id=plan_id)
         
+        # Charge en une requête les usernames de l'auteur, des likes et des commentaires
+        resolver = get_resolver(request)
+        comments = getattr(plan, 'comments', None) or []
+        plan_likes = getattr(plan, 'likes', None) or []
+        resolver.prefetch(
+            [like.user_id for like in plan_likes] + [plan.author_id] +
+            [comment.author_id for comment in comments] +
+            [reply.author_id for comment in comments for reply in (comment.replies or [])] +
+            [reaction.author_id for comment in comments for reaction in (comment.reactions or [])]
+        )
+        
         # Construire les commentaires avec replies et reactions
         comments_data = []
         if hasattr(plan, 'comments') and plan.comments:
@@ -240,7 +243,7 @@ def plan_detail(request, plan_id):
                         replies_data.append({
                             "id": reply.id,
                             "author_id": reply.author_id,
-                            "author_name": reply.author_name,
+                            "author_name": resolver.get(reply.author_id, reply.author_name),
                             "text": reply.text,
                             "created_at": reply.created_at.isoformat() if hasattr(reply, 'created_at') and reply.created_at else ""
                         })
@@ -252,14 +255,14 @@ def plan_detail(request, plan_id):
                         reactions_data.append({
                             "id": reaction.id,
                             "author_id": reaction.author_id,
-                            "author_name": reaction.author_name,
+                            "author_name": resolver.get(reaction.author_id, reaction.author_name),
                             "type": reaction.type,
                             "created_at": reaction.created_at.isoformat() if hasattr(reaction, 'created_at') and reaction.created_at else ""
                         })
                 
                 comments_data.append({
                     "id": comment.id,
-                    "author": comment.author_name,
+                    "author": resolver.get(comment.author_id, comment.author_name),
                     "authorId": comment.author_id,
                     "text": comment.text,
                     "createdAt": comment.created_at.isoformat() if hasattr(comment, 'created_at') and comment.created_at else "",
@@ -267,48 +270,37 @@ def plan_detail(request, plan_id):
                     "reactions": reactions_data
                 })
         
-        # Récupérer les usernames des likes
-        likes_data = []
-        for like in plan.likes:
-            try:
-                user = User.objects.get(userId=like.user_id)
-                likes_data.append(user.username)
-            except User.DoesNotExist:
-                # Si l'utilisateur n'existe pas, utiliser l'ID
-                likes_data.append(like.user_id)
+        # Récupérer les usernames des likes (l'ID si l'utilisateur n'existe pas)
+        likes_data = [resolver.get(like.user_id, like.user_id) for like in plan_likes]
         
         # Récupérer le nom d'auteur
         author_username = "Voyageur"
         if plan.author_id:
-            try:
-                author_profile = UserProfile.objects.get(user_id=plan.author_id)
-                author_username = author_profile.username
-            except UserProfile.DoesNotExist:
-                author_username = str(plan.author_name) if plan.author_name else "Voyageur"
-        
-        # Récupérer les champs optionnels de manière sûre
-        place_bucket = getattr(plan, 'place_bucket', None)
-        city = getattr(plan, 'city', None)
-        from_date = getattr(plan, 'from_date', None)
-        to_date = getattr(plan, 'to_date', None)
+            author_username = resolver.get(
+                plan.author_id,
+                str(plan.author_name) if plan.author_name else "Voyageur"
+            )
         
         data = {
             "id": str(plan.id),
-            "title": plan.title,
-            "description": plan.description,
-            "location": plan.location,
             "author": author_username,
             "authorId": plan.author_id,
-            "likes": plan.get_likes_count(),
+            "isPublic": plan.is_public,
+            "likes": len(plan_likes),
             "likedBy": likes_data,
             "comments": comments_data,
-            "clonedBy": plan.cloned_by,
+            "clonedBy": getattr(plan, 'cloned_by', None) or [],
             "createdAt": plan.created_at.isoformat(),
-            "place_bucket": place_bucket if place_bucket and place_bucket.strip() else None,
-            "city": city if city and city.strip() else None,
-            "from_date": from_date if from_date and from_date.strip() else None,
-            "to_date": to_date if to_date and to_date.strip() else None,
         }
+        # Ville, dates, lieux et itinéraire (lieux résolus par table id -> lieu)
+        snapshot = serializers.serialize_snapshot(plan)
+        data.update(snapshot)
+        # Anciennes clés, gardées pour les clients qui les lisent encore
+        data.update(
+            place_bucket=snapshot["placeBucket"],
+            from_date=snapshot["fromDate"],
+            to_date=snapshot["toDate"],
+        )
         
         return JsonResponse(data)
     except Plan.DoesNotExist:
@@ -323,62 +315,25 @@ def like_plan(request, plan_id):
         user_id = body.get("user_id")
         user_name = body.get("user_name")
         
-        plan = Plan.objects.get(id=plan_id)
-        
-        # Vérifie si l'utilisateur a déjà liké
-        existing_like = next((like for like in plan.likes if like.user_id == user_id), None)
+        # Ajoute ou retire le like sans relire ni réécrire le plan
+        liked, plan = updates.toggle_like(Plan, plan_id, Like(user_id=user_id), fields=("author_id", "city"))
+        if liked is None:
+            return JsonResponse({"error": "Plan non trouvé"}, status=404)
         
-        if existing_like:
-            # Retire le like
-            plan.likes.remove(existing_like)
-        else:
-            # Ajoute le like
-            like = Like(user_id=user_id)
-            plan.likes.append(like)
-            
-            # Crée une notification
-            if plan.author_id != user_id:
-                notification = Notification(
-                    recipient_id=plan.author_id,
-                    sender_id=user_id,
-                    sender_name=user_name,
-                    action_type="like",
-                    plan_id=str(plan.id),
-                    plan_title=plan.title,
-                    message=f"{user_name} a aimé votre plan: {plan.title}"
-                )
-                notification.save()
-        
-        # Nettoyer et valider les commentaires avant de sauvegarder
-        try:
-            if hasattr(plan, 'comments') and plan.comments:
-                for comment in plan.comments:
-                    # Assurer que created_at existe
-                    if not hasattr(comment, 'created_at') or comment.created_at is None:
-                        comment.created_at = datetime.utcnow()
-                    
-                    # Nettoyer les replies
-                    if hasattr(comment, 'replies') and comment.replies:
-                        for reply in comment.replies:
-                            if not hasattr(reply, 'created_at') or reply.created_at is None:
-                                reply.created_at = datetime.utcnow()
-                    
-                    # Nettoyer les reactions
-                    if hasattr(comment, 'reactions') and comment.reactions:
-                        for reaction in comment.reactions:
-                            if not hasattr(reaction, 'created_at') or reaction.created_at is None:
-                                reaction.created_at = datetime.utcnow()
-            
-            plan.save()
-        except Exception as save_error:
-            print(f"Erreur lors de la sauvegarde du plan: {str(save_error)}")
-            import traceback
-            traceback.print_exc()
-            raise
+        # Crée une notification
+        if liked and plan.get("author_id") != user_id:
+            notifications.notify(
+                recipient_id=plan.get("author_id"),
+                sender_id=user_id,
+                sender_name=user_name,
+                action_type="like",
+                description=plan.get("city"),
+                message=f"{user_name} a aimé votre plan: {plan.get('city')}"
+            )
         
         return JsonResponse({
-            "likes": plan.get_likes_count(),
-            "isLiked": not existing_like
+            "likes": plan["likes_count"],
+            "isLiked": liked
         })
     except Exception as e:
         print(f"Erreur lors du like: {str(e)}")
@@ -410,16 +365,14 @@ def add_comment(request, plan_id):
         
         # Crée une notification
         if plan.author_id != user_id:
-            notification = Notification(
+            notifications.notify(
                 recipient_id=plan.author_id,
                 sender_id=user_id,
                 sender_name=user_name,
                 action_type="comment",
-                plan_id=str(plan.id),
-                plan_title=plan.title,
-                message=f"{user_name} a commenté votre plan: {plan.title}"
+                description=plan.city,
+                message=f"{user_name} a commenté votre plan: {plan.city}"
             )
-            notification.save()
         
         return JsonResponse({
             "id": comment.id,
@@ -554,16 +507,14 @@ def clone_plan(request, plan_id):
             profile.save()
         
         # Crée une notification
-        notification = Notification(
+        notifications.notify(
             recipient_id=original_plan.author_id,
             sender_id=user_id,
             sender_name=user_name,
             action_type="clone",
-            plan_id=str(original_plan.id),
-            plan_title=original_plan.title,
-            message=f"{user_name} a cloné votre plan: {original_plan.title}"
+            description=original_plan.city,
+            message=f"{user_name} a cloné votre plan: {original_plan.city}"
         )
-        notification.save()
         
         return JsonResponse({
             "id": str(cloned_plan.id),
@@ -572,53 +523,111 @@ def clone_plan(request, plan_id):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+def _notification_items(notifs):
+    resolver = UsernameResolver()
+    notifications.prefetch_names(resolver, notifs)
+    return [notifications.serialize(notif, resolver) for notif in notifs]
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def user_notifications(request, user_id):
-    """Récupère les notifications d'un utilisateur"""
+    """Récupère une page des notifications d'un utilisateur.
+
+    Pagination par curseur: ?limit=N&cursor=<X-Next-Cursor>; ?unread=1 pour les non lues seulement
+    (sans limit ni cursor: toutes les notifications, comme avant la pagination)
+    ?stream=1: toutes les notifications, en flux
+    """
     try:
-        notifications = Notification.objects(recipient_id=user_id).order_by('-created_at')
+        cursor = request.GET.get("cursor", None)
+        limit = parse_page_limit(request)
         
-        data = []
-        for notif in notifications:
-            # Générer le message si absent (pour les anciennes notifications)
-            message = notif.message
-            if not message:
-                action_prefix = {
-                    "like": f"{notif.sender_name} a aimé votre publication",
-                    "comment": f"{notif.sender_name} a commenté votre publication",
-                    "clone": f"{notif.sender_name} a cloné votre plan"
-                }
-                base_message = action_prefix.get(notif.action_type, f"{notif.sender_name} a interagi avec votre publication")
-                
-                # Ajouter la description si disponible
-                if notif.description:
-                    desc_preview = notif.description[:50] + "..." if len(notif.description) > 50 else notif.description
-                    message = f"{base_message}: \"{desc_preview}\""
-                else:
-                    message = base_message
-            
-            data.append({
-                "id": str(notif.id),
-                "sender": notif.sender_name,
-                "sender_name": notif.sender_name,
-                "senderId": notif.sender_id,
-                "sender_id": notif.sender_id,
-                "action": notif.action_type,
-                "action_type": notif.action_type,
-                "pubId": notif.pub_id,
-                "pub_id": notif.pub_id,
-                "recipientId": user_id,
-                "recipient_id": user_id,
-                "description": notif.description,
-                "message": message,
-                "isRead": notif.is_read,
-                "is_read": notif.is_read,
-                "createdAt": notif.created_at.isoformat(),
-                "created_at": notif.created_at.isoformat(),
-            })
+        query = Q(recipient_id=user_id)
+        if request.GET.get("unread") in ("1", "true"):
+            query = query & Q(is_read=False)
         
-        return JsonResponse(data, safe=False)
+        if streaming.requested(request):
+            rows = Notification.objects(query).order_by('-created_at', '-id') \
+                .no_cache().batch_size(streaming.BATCH_SIZE)
+            return streaming.response(request, rows, _notification_items)
+        
+        if cursor:
+            try:
+                query = query & keyset_filter(cursor)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+        
+        notifs = Notification.objects(query).order_by('-created_at', '-id')
+        if limit is not None:
+            notifs = notifs.limit(limit + 1)
+        page, next_cursor = keyset_page(notifs, limit)
+        resolver = get_resolver(request)
+        notifications.prefetch_names(resolver, page)
+        data = [notifications.serialize(notif, resolver) for notif in page]
+        
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@require_http_methods(["GET"])
+async def notification_stream(request, user_id):
+    """Flux SSE (text/event-stream) des nouvelles notifications et publications.
+
+    Événements: unread (compteur initial), notification (delta), feed (nouvelle publication).
+    Servi en WSGI, chaque flux occuperait un worker: on répond 204, qui arrête
+    EventSource, et le client recharge périodiquement sa boîte.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    unread = await sync_to_async(notifications.unread_count)(user_id)
+    response = StreamingHttpResponse(realtime.event_stream(user_id, unread), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Désactive la mise en tampon de nginx pour que chaque événement parte immédiatement
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def unread_notifications_count(request, user_id):
+    """Nombre de notifications non lues (compteur maintenu, sans parcourir la collection)"""
+    try:
+        return JsonResponse({"unread": notifications.unread_count(user_id)})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def mark_notifications_read(request, user_id):
+    """Marque comme lues les notifications {"ids": [...]} (ou toutes si ids est absent)"""
+    try:
+        body = json.loads(request.body or "{}")
+        updated = notifications.mark_read(user_id, body.get("ids"))
+        
+        return JsonResponse({
+            "success": True,
+            "updated": updated,
+            "unread": notifications.unread_count(user_id)
+        })
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def delete_notifications(request, user_id):
+    """Supprime les notifications {"ids": [...]} ou toutes avec {"all": true}"""
+    try:
+        body = json.loads(request.body or "{}")
+        ids = body.get("ids")
+        
+        if ids is None and not body.get("all"):
+            return JsonResponse({"error": "ids ou all requis"}, status=400)
+        
+        deleted = notifications.delete(user_id, ids)
+        
+        return JsonResponse({
+            "success": True,
+            "deleted": deleted,
+            "unread": notifications.unread_count(user_id)
+        })
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -627,65 +636,43 @@ def user_notifications(request, user_id):
 def user_profile(request, user_id):
     """Récupère le profil d'un utilisateur"""
     try:
-        profile = UserProfile.objects.get(user_id=user_id)
+        # Convertit les anciennes listes d'abonnements avant de lire les compteurs
+        follows.ensure_migrated(user_id)
+        profile = reads.profile(user_id)
+        if profile is None:
+            return JsonResponse({"error": "Profil non trouvé"}, status=404)
         
         # Récupère les plans publics de l'utilisateur (nouvelle structure)
-        public_plans = Plan.objects(author_id=user_id, is_public=True)
         public_plans_data = [
-            {
-                "id": str(plan.id),
-                "city": plan.city,
-                "fromDate": plan.from_date.isoformat() if plan.from_date else "",
-                "toDate": plan.to_date.isoformat() if plan.to_date else "",
-                "placesCount": len(plan.place_bucket) if plan.place_bucket else 0,
-                "daysCount": len(plan.itinerary) if plan.itinerary else 0,
-                "createdAt": plan.created_at.isoformat() if plan.created_at else "",
-            }
-            for plan in public_plans
+            serializers.serialize_plan_summary(plan)
+            for plan in reads.plans({"author_id": user_id, "is_public": True})
         ]
         
-        # Convertir les user_ids en usernames pour followers
-        followers_data = []
-        if profile.followers:
-            for follower_id in profile.followers:
-                try:
-                    follower_profile = UserProfile.objects.get(user_id=follower_id)
-                    followers_data.append({
-                        "userId": follower_id,
-                        "username": follower_profile.username
-                    })
-                except UserProfile.DoesNotExist:
-                    pass
-        
-        # Convertir les user_ids en usernames pour following
-        following_data = []
-        if profile.following:
-            for following_id in profile.following:
-                try:
-                    following_profile = UserProfile.objects.get(user_id=following_id)
-                    following_data.append({
-                        "userId": following_id,
-                        "username": following_profile.username
-                    })
-                except UserProfile.DoesNotExist:
-                    pass
+        # Première page des abonnés/abonnements (la suite via followers/ et following/),
+        # convertie en usernames en une seule requête
+        follower_ids, _ = follows.followers_page(user_id, None, MAX_LIMIT)
+        following_ids, _ = follows.following_page(user_id, None, MAX_LIMIT)
+        resolver = get_resolver(request)
+        resolver.prefetch(follower_ids + following_ids)
+        followers_data = resolver.users(follower_ids)
+        following_data = resolver.users(following_ids)
         
         data = {
-            "userId": profile.user_id,
-            "username": profile.username,
-            "email": profile.email,
-            "bio": profile.bio,
-            "avatarUrl": profile.avatar_url,
+            "userId": profile["user_id"],
+            "username": profile.get("username"),
+            "email": profile.get("email"),
+            "bio": profile.get("bio"),
+            "avatarUrl": profile.get("avatar_url"),
             "publicPlans": public_plans_data,
-            "followers": len(profile.followers),
-            "following": len(profile.following),
+            "followers": profile.get("followers_count", 0),
+            "following": profile.get("following_count", 0),
             "followersList": followers_data,
             "followingList": following_data,
         }
         
         return JsonResponse(data)
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"error": "Profil non trouvé"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -693,18 +680,9 @@ def user_private_plans(request, user_id):
     """Récupère les plans privés d'un utilisateur (plans non publics)"""
     try:
         # Récupère tous les plans privés de l'utilisateur (is_public=False)
-        private_plans = Plan.objects(author_id=user_id, is_public=False)
+        private_plans = reads.plans({"author_id": user_id, "is_public": False})
         data = [
-            {
-                "id": str(plan.id),
-                "city": plan.city,
-                "fromDate": plan.from_date.isoformat() if plan.from_date else "",
-                "toDate": plan.to_date.isoformat() if plan.to_date else "",
-                "placesCount": len(plan.place_bucket) if plan.place_bucket else 0,
-                "daysCount": len(plan.itinerary) if plan.itinerary else 0,
-                "isPublic": plan.is_public,
-                "createdAt": plan.created_at.isoformat() if plan.created_at else "",
-            }
+            dict(serializers.serialize_plan_summary(plan), isPublic=False)
             for plan in private_plans
         ]
         
@@ -718,19 +696,13 @@ def user_cloned_plans(request, user_id):
     """Récupère les plans clonés d'un utilisateur (plans où cloned_from est défini)"""
     try:
         # Récupère les plans clonés par cet utilisateur (plans où cloned_from est défini)
-        cloned_plans = Plan.objects(author_id=user_id, cloned_from__exists=True)
+        cloned_plans = reads.plans({"author_id": user_id, "cloned_from": {"$exists": True}})
         data = [
-            {
-                "id": str(plan.id),
-                "city": plan.city,
-                "fromDate": plan.from_date.isoformat() if plan.from_date else "",
-                "toDate": plan.to_date.isoformat() if plan.to_date else "",
-                "placesCount": len(plan.place_bucket) if plan.place_bucket else 0,
-                "daysCount": len(plan.itinerary) if plan.itinerary else 0,
-                "clonedFrom": plan.cloned_from,  # ID de l'auteur original
-                "clonedFromPlanId": plan.cloned_from_plan_id,  # ID du plan original
-                "createdAt": plan.created_at.isoformat() if plan.created_at else "",
-            }
+            dict(
+                serializers.serialize_plan_summary(plan),
+                clonedFrom=plan.get("cloned_from"),  # ID de l'auteur original
+                clonedFromPlanId=plan.get("cloned_from_plan_id"),  # ID du plan original
+            )
             for plan in cloned_plans
         ]
         
@@ -741,57 +713,42 @@ def user_cloned_plans(request, user_id):
 @csrf_exempt
 @require_http_methods(["GET"])
 def plans_by_city(request):
-    """Récupère tous les plans publics en cherchant dans title, description et location"""
+    """Recherche les plans publics par ville et noms de lieux (voir search.py).
+
+    Résultats triés par pertinence puis récence.
+    Pagination par curseur: ?city=...&limit=N&cursor=<X-Next-Cursor de la page précédente>
+    (sans limit ni cursor: tous les résultats, comme avant la pagination)
+    """
     try:
-        search_query = request.GET.get("city", "").strip()
+        search_query = request.GET.get("q") or request.GET.get("city", "")
         user_id = request.GET.get("user_id", None)
+        cursor = request.GET.get("cursor", None)
+        limit = parse_page_limit(request)
         
-        if not search_query:
+        words = search.query_words(search_query)
+        if not words:
             return JsonResponse({"error": "Veuillez spécifier une recherche"}, status=400)
         
-        # Cherche dans title, description ET location (case-insensitive)
-        from mongoengine import Q
-        
-        # Cherche dans title, description ET location avec Q objects
-        query = Q(is_public=True) & (
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query)
-        )
-        
+        match = {"is_public": True}
         # Exclut les plans de l'utilisateur courant
         if user_id:
-            query = query & Q(author_id__ne=user_id)
+            match["author_id"] = {"$ne": user_id}
         
-        plans = Plan.objects(query)
+        try:
+            rows = Plan._get_collection().aggregate(search.pipeline(
+                words, match, serializers.PLAN_CARD_FIELDS, cursor, limit, fields=(search.CITY, search.PLACE),
+                legacy=search.legacy_match(search_query, search.PLAN_LEGACY_FIELDS),
+            ))
+            plans, next_cursor = ranked_page(rows, limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         
-        data = []
-        for plan in plans:
-            # Récupérer les champs optionnels de manière sûre
-            place_bucket = getattr(plan, 'place_bucket', None)
-            city = getattr(plan, 'city', None)
-            from_date = getattr(plan, 'from_date', None)
-            to_date = getattr(plan, 'to_date', None)
-            
-            data.append({
-                "id": str(plan.id),
-                "title": plan.title,
-                "description": plan.description,
-                "location": plan.location,
-                "author": plan.author_name or "Voyageur",
-                "authorId": plan.author_id,
-                "likes": plan.get_likes_count(),
-                "commentsCount": plan.get_comments_count(),
-                "isLiked": any(like.user_id == user_id for like in plan.likes) if user_id else False,
-                "isCloned": user_id in plan.cloned_by if user_id else False,
-                "createdAt": plan.created_at.isoformat(),
-                "place_bucket": place_bucket if place_bucket and place_bucket.strip() else None,
-                "city": city if city and city.strip() else None,
-                "from_date": from_date if from_date and from_date.strip() else None,
-                "to_date": to_date if to_date and to_date.strip() else None,
-            })
+        resolver = get_resolver(request)
+        resolver.prefetch(plan.get("author_id") for plan in plans)
         
-        return JsonResponse(data, safe=False)
+        data = [serializers.serialize_plan_card(plan, resolver) for plan in plans]
+        
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -805,28 +762,23 @@ def follow_user(request, user_id):
         
         if not current_user_id:
             return JsonResponse({"error": "current_user_id requis"}, status=400)
+        if current_user_id == user_id:
+            return JsonResponse({"error": "Vous ne pouvez pas vous suivre vous-même"}, status=400)
         
-        # Récupère les profils
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        current_profile = UserProfile.objects.get(user_id=current_user_id)
-        
-        # Ajoute le follow
-        if current_user_id not in user_profile.followers:
-            user_profile.followers.append(current_user_id)
-            user_profile.save()
+        # Vérifie que les deux profils existent
+        if UserProfile.objects(user_id__in=[user_id, current_user_id]).count() < 2:
+            return JsonResponse({"error": "Profil non trouvé"}, status=404)
         
-        if user_id not in current_profile.following:
-            current_profile.following.append(user_id)
-            current_profile.save()
+        # Ajoute le follow (une arête, sans réécrire les profils)
+        if follows.follow(current_user_id, user_id):
+            timeline.backfill(current_user_id, user_id)
         
         return JsonResponse({
             "success": True,
             "message": "Vous suivez maintenant cet utilisateur",
-            "followers": len(user_profile.followers),
-            "following": len(current_profile.following)
+            "followers": follows.counts(user_id)[0],
+            "following": follows.counts(current_user_id)[1]
         })
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"error": "Profil non trouvé"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -841,27 +793,16 @@ def unfollow_user(request, user_id):
         if not current_user_id:
             return JsonResponse({"error": "current_user_id requis"}, status=400)
         
-        # Récupère les profils
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        current_profile = UserProfile.objects.get(user_id=current_user_id)
-        
         # Retire le follow
-        if current_user_id in user_profile.followers:
-            user_profile.followers.remove(current_user_id)
-            user_profile.save()
-        
-        if user_id in current_profile.following:
-            current_profile.following.remove(user_id)
-            current_profile.save()
+        if follows.unfollow(current_user_id, user_id):
+            timeline.remove_author(current_user_id, user_id)
         
         return JsonResponse({
             "success": True,
             "message": "Vous ne suivez plus cet utilisateur",
-            "followers": len(user_profile.followers),
-            "following": len(current_profile.following)
+            "followers": follows.counts(user_id)[0],
+            "following": follows.counts(current_user_id)[1]
         })
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"error": "Profil non trouvé"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -869,35 +810,22 @@ def unfollow_user(request, user_id):
 @require_http_methods(["POST"])
 def remove_follower(request, user_id):
     """Permet à l'utilisateur courant de retirer un follower"""
-    print(f"DEBUG: remove_follower called with user_id={user_id}")
     try:
         body = json.loads(request.body)
         follower_id = body.get("follower_id")
-        print(f"DEBUG: follower_id={follower_id}")
         
         if not follower_id:
             return JsonResponse({"error": "follower_id requis"}, status=400)
         
-        # Récupère les profils
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        follower_profile = UserProfile.objects.get(user_id=follower_id)
-        
         # Retire le follower
-        if follower_id in user_profile.followers:
-            user_profile.followers.remove(follower_id)
-            user_profile.save()
-        
-        if user_id in follower_profile.following:
-            follower_profile.following.remove(user_id)
-            follower_profile.save()
+        if follows.unfollow(follower_id, user_id):
+            timeline.remove_author(follower_id, user_id)
         
         return JsonResponse({
             "success": True,
             "message": "Follower retiré avec succès",
-            "followers": len(user_profile.followers)
+            "followers": follows.counts(user_id)[0]
         })
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"error": "Profil non trouvé"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -911,19 +839,47 @@ def check_follow_status(request, user_id):
         if not current_user_id:
             return JsonResponse({"error": "current_user_id requis"}, status=400)
         
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        is_following = current_user_id in user_profile.followers
+        if not UserProfile.objects(user_id=user_id).count():
+            return JsonResponse({"error": "Profil non trouvé"}, status=404)
+        
+        followers_count, following_count = follows.counts(user_id)
         
         return JsonResponse({
-            "isFollowing": is_following,
-            "followers": len(user_profile.followers),
-            "following": len(user_profile.following) if user_profile else 0
+            "isFollowing": follows.is_following(current_user_id, user_id),
+            "followers": followers_count,
+            "following": following_count
         })
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"error": "Profil non trouvé"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+def _follow_list(request, user_id, page):
+    """Réponse paginée d'une liste d'abonnés/abonnements ({userId, username})"""
+    try:
+        cursor = request.GET.get("cursor", None)
+        limit = parse_limit(request)
+        
+        try:
+            user_ids, next_cursor = page(user_id, cursor, limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        data = get_resolver(request).users(user_ids)
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def user_followers(request, user_id):
+    """Abonnés d'un utilisateur, plus récents d'abord (?limit=N&cursor=<X-Next-Cursor>)"""
+    return _follow_list(request, user_id, follows.followers_page)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def user_following(request, user_id):
+    """Abonnements d'un utilisateur, plus récents d'abord (?limit=N&cursor=<X-Next-Cursor>)"""
+    return _follow_list(request, user_id, follows.following_page)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def share_plan(request, plan_id):
@@ -982,7 +938,12 @@ def unshare_plan(request, plan_id):
         plan.save()
         
         # Supprime la publication associée
-        Publication.objects(shared_plan_id=str(plan.id)).delete()
+        publications = Publication.objects(shared_plan_id=str(plan.id))
+        pub_oids = list(publications.scalar('id'))
+        publications.delete()
+        timeline.remove_publications(pub_oids)
+        likes.remove_publications(pub_oids)
+        invalidate_publications(*[str(pub_id) for pub_id in pub_oids])
         
         return JsonResponse({
             "success": True,
@@ -997,118 +958,77 @@ def unshare_plan(request, plan_id):
         traceback.print_exc()
         return JsonResponse({"error": str(e)}, status=400)
 
+def _feed_match(user_id, author_id):
+    if author_id:
+        # Si author_id est spécifié, récupère uniquement les publications de cet auteur
+        return {"author_id": author_id}
+    if user_id:
+        # Utilisateur connecté: affiche UNIQUEMENT les publications des AUTRES utilisateurs
+        return {"author_id": {"$ne": user_id}}
+    # Utilisateur NON connecté: affiche TOUTES les publications
+    return {}
+
+def _feed_cards(publications, user_id=None, resolver=None):
+    """Cartes d'un lot de publications brutes (noms et isLiked chargés en une requête chacun)"""
+    resolver = resolver or UsernameResolver()
+    serializers.prefetch_card_names(resolver, publications)
+    liked = likes.liked_among(user_id, [pub["_id"] for pub in publications])
+    
+    data = []
+    for pub in publications:
+        try:
+            data.append(serializers.serialize_publication_card(pub, resolver, liked=pub["_id"] in liked))
+        except Exception as e:
+            print(f"Erreur lors du traitement de la publication: {str(e)}")
+            continue
+    return data
+
+def _feed_page(user_id, author_id, cursor, limit, sort=None):
+    """Charge une page du fil: retourne (cartes, curseur suivant)"""
+    match = _feed_match(user_id, author_id)
+    if sort == "trending":
+        publications, next_cursor = trending.page(match, serializers.PUBLICATION_CARD_FIELDS, cursor, limit)
+        return _feed_cards(publications, user_id), next_cursor
+    if cursor:
+        match = {"$and": [match, keyset_match(cursor)]}
+    
+    publications, next_cursor = reads.feed_page(match, limit)
+    return _feed_cards(publications, user_id), next_cursor
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def publications_feed(request):
-    """Récupère toutes les publications pour la page d'accueil ou les publications d'un utilisateur spécifique"""
+    """Récupère une page de publications pour la page d'accueil ou les publications d'un utilisateur spécifique.
+
+    Pagination par curseur: ?limit=N&cursor=<X-Next-Cursor de la page précédente>
+    (sans limit ni cursor: toutes les publications, comme avant la pagination)
+    Les pages sont servies depuis le cache tant qu'aucune publication n'est modifiée.
+    ?sort=trending: classement tendances (voir trending.py) au lieu de l'ordre chronologique
+    ?stream=1: toutes les publications, en flux (sans cache)
+    """
     try:
         user_id = request.GET.get("user_id", None)
         author_id = request.GET.get("author_id", None)
+        cursor = request.GET.get("cursor", None)
+        sort = request.GET.get("sort", None)
+        limit = parse_page_limit(request)
         
-        # Récupère les publications
-        if author_id:
-            # Si author_id est spécifié, récupère uniquement les publications de cet auteur
-            publications = Publication.objects(author_id=author_id).order_by('-created_at')
-        else:
-            # Sinon, récupère les publications selon le statut de connexion
-            if user_id:
-                # Utilisateur connecté: affiche UNIQUEMENT les publications des AUTRES utilisateurs
-                publications = Publication.objects(author_id__ne=user_id).order_by('-created_at')
-            else:
-                # Utilisateur NON connecté: affiche TOUTES les publications
-                publications = Publication.objects().order_by('-created_at')
+        if sort not in (None, "recent", "trending"):
+            return JsonResponse({"error": f"Tri inconnu: {sort}"}, status=400)
         
-        data = []
-        for pub in publications:
-            try:
-                # Récupère le nombre de likes
-                likes_count = len(pub.likes) if pub.likes else 0
-                
-                # Récupère les noms des utilisateurs qui ont liké
-                liked_by = []
-                if pub.likes:
-                    for like in pub.likes:
-                        if like.user_name:
-                            liked_by.append(like.user_name)
-                
-                # Récupère le nombre de commentaires
-                comments_count = len(pub.comments) if pub.comments else 0
-                
-                # Vérifie si l'utilisateur courant a liké
-                is_liked = False
-                if user_id and pub.likes:
-                    is_liked = any(like.user_id == user_id for like in pub.likes)
-                
-                # Construit les données de la publication
-                pub_data = {
-                    "id": str(pub.id),
-                    "authorId": pub.author_id,
-                    "author": pub.author_name,
-                    "description": pub.description,
-                    "createdAt": pub.created_at.isoformat() if pub.created_at else "",
-                    "likes": likes_count,
-                    "likedBy": liked_by,
-                    "commentsCount": comments_count,
-                    "isLiked": is_liked,
-                    "clonedBy": len(pub.cloned_by) if pub.cloned_by else 0,
-                    "planSnapshot": None
-                }
-                
-                # Ajoute le snapshot du plan s'il existe
-                if pub.plan_snapshot:
-                    # Convertir place_bucket
-                    places = []
-                    if pub.plan_snapshot.place_bucket:
-                        for place in pub.plan_snapshot.place_bucket:
-                            place_data = {
-                                "name": getattr(place, 'name', getattr(place, 'title', 'Lieu')),
-                                "title": getattr(place, 'title', ''),
-                                "description": getattr(place, 'description', ''),
-                            }
-                            places.append(place_data)
-                    
-                    # Convertir itinerary
-                    itinerary = []
-                    if pub.plan_snapshot.itinerary:
-                        for day in pub.plan_snapshot.itinerary:
-                            # Récupérer les lieux pour ce jour
-                            day_places = []
-                            if hasattr(day, 'places') and day.places:
-                                for place_id in day.places:
-                                    # Chercher le lieu dans place_bucket
-                                    for place in pub.plan_snapshot.place_bucket:
-                                        if str(place.id) == str(place_id):
-                                            day_places.append({
-                                                "id": place.id,
-                                                "name": place.name,
-                                            })
-                                            break
-                            
-                            day_data = {
-                                "dayIndex": getattr(day, 'day_index', 0),
-                                "date": day.date.isoformat() if hasattr(day, 'date') and day.date else "",
-                                "description": getattr(day, 'description', ''),
-                                "places": day_places,
-                                "activities": getattr(day, 'activities', []),
-                            }
-                            itinerary.append(day_data)
-                    
-                    pub_data["planSnapshot"] = {
-                        "city": pub.plan_snapshot.city,
-                        "fromDate": pub.plan_snapshot.from_date.isoformat() if pub.plan_snapshot.from_date else "",
-                        "toDate": pub.plan_snapshot.to_date.isoformat() if pub.plan_snapshot.to_date else "",
-                        "placesCount": len(places),
-                        "daysCount": len(itinerary),
-                        "placeBucket": places,
-                        "itinerary": itinerary,
-                    }
-                
-                data.append(pub_data)
-            except Exception as e:
-                print(f"Erreur lors du traitement de la publication: {str(e)}")
-                continue
+        if streaming.requested(request):
+            rows = reads.feed(_feed_match(user_id, author_id), batchSize=streaming.BATCH_SIZE)
+            return streaming.response(request, rows, lambda batch: _feed_cards(batch, user_id))
         
-        return JsonResponse(data, safe=False)
+        try:
+            data, next_cursor = publications_cache().get_or_set(
+                feed_key(user_id, author_id, cursor, limit, sort),
+                lambda: _feed_page(user_id, author_id, cursor, limit, sort)
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
     except Exception as e:
         print(f"Erreur dans publications_feed: {str(e)}")
         import traceback
@@ -1117,118 +1037,72 @@ def publications_feed(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
-def publications_by_city(request):
-    """Recherche les publications par ville"""
+def following_feed(request):
+    """Fil des publications des utilisateurs suivis par user_id (fil matérialisé, voir timeline.py).
+
+    Pagination par curseur: ?user_id=...&limit=N&cursor=<X-Next-Cursor de la page précédente>
+    """
     try:
-        search_query = request.GET.get("city", "").strip()
         user_id = request.GET.get("user_id", None)
+        cursor = request.GET.get("cursor", None)
+        limit = parse_limit(request)
         
-        if not search_query:
-            return JsonResponse({"error": "Veuillez spécifier une ville"}, status=400)
+        if not user_id:
+            return JsonResponse({"error": "user_id requis"}, status=400)
         
-        # Cherche dans la ville du plan_snapshot (case-insensitive)
-        from mongoengine import Q
+        try:
+            pub_ids, next_cursor = timeline.page(user_id, cursor, limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        rows = list(Publication._get_collection().find(
+            {"_id": {"$in": pub_ids}}, serializers.PUBLICATION_CARD_FIELDS
+        ))
+        cards = {card["id"]: card for card in _feed_cards(rows, user_id, get_resolver(request))}
+        # Ordre du fil; une publication supprimée entre-temps est simplement ignorée
+        data = [cards[str(pub_id)] for pub_id in pub_ids if str(pub_id) in cards]
+        
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
+    except Exception as e:
+        print(f"Erreur dans following_feed: {str(e)}")
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def publications_by_city(request):
+    """Recherche les publications par ville, lieux et description (voir search.py).
+
+    Résultats triés par pertinence puis récence, sans tenir compte des accents
+    ni de la casse; un début de mot suffit ("mars" trouve "Marseille").
+    Pagination par curseur: ?city=...&limit=N&cursor=<X-Next-Cursor de la page précédente>
+    (sans limit ni cursor: tous les résultats, comme avant la pagination)
+    """
+    try:
+        search_query = request.GET.get("q") or request.GET.get("city", "")
+        user_id = request.GET.get("user_id", None)
+        cursor = request.GET.get("cursor", None)
+        limit = parse_page_limit(request)
         
-        # Cherche dans plan_snapshot.city avec recherche partielle
-        query = Q(plan_snapshot__city__icontains=search_query)
+        words = search.query_words(search_query)
+        if not words:
+            return JsonResponse({"error": "Veuillez spécifier une ville"}, status=400)
         
         # Exclut les publications de l'utilisateur courant
-        if user_id:
-            query = query & Q(author_id__ne=user_id)
-        
-        publications = Publication.objects(query).order_by('-created_at')
-        
-        data = []
-        for pub in publications:
-            try:
-                # Récupère le nombre de likes
-                likes_count = len(pub.likes) if pub.likes else 0
-                
-                # Récupère les noms des utilisateurs qui ont liké
-                liked_by = []
-                if pub.likes:
-                    for like in pub.likes:
-                        if like.user_name:
-                            liked_by.append(like.user_name)
-                
-                # Récupère le nombre de commentaires
-                comments_count = len(pub.comments) if pub.comments else 0
-                
-                # Vérifie si l'utilisateur courant a liké
-                is_liked = False
-                if user_id and pub.likes:
-                    is_liked = any(like.user_id == user_id for like in pub.likes)
-                
-                # Construit les données de la publication
-                pub_data = {
-                    "id": str(pub.id),
-                    "authorId": pub.author_id,
-                    "author": pub.author_name,
-                    "description": pub.description,
-                    "createdAt": pub.created_at.isoformat() if pub.created_at else "",
-                    "likes": likes_count,
-                    "likedBy": liked_by,
-                    "commentsCount": comments_count,
-                    "isLiked": is_liked,
-                    "clonedBy": len(pub.cloned_by) if pub.cloned_by else 0,
-                    "planSnapshot": None
-                }
-                
-                # Ajoute le snapshot du plan s'il existe
-                if pub.plan_snapshot:
-                    # Convertir place_bucket
-                    places = []
-                    if pub.plan_snapshot.place_bucket:
-                        for place in pub.plan_snapshot.place_bucket:
-                            place_data = {
-                                "name": getattr(place, 'name', getattr(place, 'title', 'Lieu')),
-                                "title": getattr(place, 'title', ''),
-                                "description": getattr(place, 'description', ''),
-                            }
-                            places.append(place_data)
-                    
-                    # Convertir itinerary
-                    itinerary = []
-                    if pub.plan_snapshot.itinerary:
-                        for day in pub.plan_snapshot.itinerary:
-                            # Récupérer les lieux pour ce jour
-                            day_places = []
-                            if hasattr(day, 'places') and day.places:
-                                for place_id in day.places:
-                                    # Chercher le lieu dans place_bucket
-                                    for place in pub.plan_snapshot.place_bucket:
-                                        if str(place.id) == str(place_id):
-                                            day_places.append({
-                                                "id": place.id,
-                                                "name": place.name,
-                                            })
-                                            break
-                            
-                            day_data = {
-                                "dayIndex": getattr(day, 'day_index', 0),
-                                "date": day.date.isoformat() if hasattr(day, 'date') and day.date else "",
-                                "description": getattr(day, 'description', ''),
-                                "places": day_places,
-                                "activities": getattr(day, 'activities', []),
-                            }
-                            itinerary.append(day_data)
-                    
-                    pub_data["planSnapshot"] = {
-                        "city": pub.plan_snapshot.city,
-                        "fromDate": pub.plan_snapshot.from_date.isoformat() if pub.plan_snapshot.from_date else "",
-                        "toDate": pub.plan_snapshot.to_date.isoformat() if pub.plan_snapshot.to_date else "",
-                        "placesCount": len(places),
-                        "daysCount": len(itinerary),
-                        "placeBucket": places,
-                        "itinerary": itinerary,
-                    }
-                
-                data.append(pub_data)
-            except Exception as e:
-                print(f"Erreur lors du traitement de la publication: {str(e)}")
-                continue
+        match = {"author_id": {"$ne": user_id}} if user_id else {}
         
-        return JsonResponse(data, safe=False)
+        try:
+            rows = Publication._get_collection().aggregate(search.pipeline(
+                words, match, serializers.PUBLICATION_CARD_FIELDS, cursor, limit,
+                legacy=search.legacy_match(search_query, search.PUBLICATION_LEGACY_FIELDS),
+            ))
+            publications, next_cursor = ranked_page(rows, limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        # Noms courants des auteurs et des likes, isLiked: une requête chacun
+        data = _feed_cards(publications, user_id, get_resolver(request))
+        
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
     except Exception as e:
         print(f"Erreur dans publications_by_city: {str(e)}")
         import traceback
@@ -1242,30 +1116,23 @@ def like_publication(request, pub_id):
     try:
         body = json.loads(request.body)
         user_id = body.get("user_id")
-        user_name = body.get("user_name")
         
         if not user_id:
             return JsonResponse({"error": "user_id requis"}, status=400)
         
-        publication = Publication.objects.get(id=pub_id)
-        
-        # Vérifie si l'utilisateur a déjà liké
-        already_liked = any(like.user_id == user_id for like in publication.likes)
-        
-        if already_liked:
-            # Retire le like
-            publication.likes = [like for like in publication.likes if like.user_id != user_id]
-        else:
-            # Ajoute un like
-            like = Like(user_id=user_id, user_name=user_name)
-            publication.likes.append(like)
-        
-        publication.save()
+        # Ajoute ou retire l'arête de like et met à jour le compteur de la publication
+        liked, likes_count, liked_at = likes.toggle(pub_id, user_id)
+        if liked is None:
+            return JsonResponse({"error": "Publication non trouvée"}, status=404)
+        # liked_at est None si un like concurrent a déjà été enregistré (et compté)
+        if liked_at:
+            trending.record(pub_id, "like", sign=1 if liked else -1, at=liked_at)
+        invalidate_publications(pub_id)
         
         return JsonResponse({
             "success": True,
-            "liked": not already_liked,
-            "likesCount": len(publication.likes)
+            "liked": liked,
+            "likesCount": likes_count
         })
     except Publication.DoesNotExist:
         return JsonResponse({"error": "Publication non trouvée"}, status=404)
@@ -1286,8 +1153,6 @@ def add_publication_comment(request, pub_id):
         if not user_id or not text:
             return JsonResponse({"error": "user_id et text requis"}, status=400)
         
-        publication = Publication.objects.get(id=pub_id)
-        
         # Crée un nouveau commentaire
         comment = Comment(
             id=str(uuid.uuid4()),
@@ -1298,18 +1163,22 @@ def add_publication_comment(request, pub_id):
             reactions=[]
         )
         
-        publication.comments.append(comment)
-        publication.save()
-         # Crée une notification
-        if publication.author_id != user_id:
-            notification = Notification(
-                recipient_id=publication.author_id,
+        publication = updates.push_comment(Publication, pub_id, comment, fields=("author_id", "description"))
+        if publication is None:
+            return JsonResponse({"error": "Publication non trouvée"}, status=404)
+        trending.record(pub_id, "comment")
+        invalidate_publications(pub_id)
+        
+        # Crée une notification
+        if publication.get("author_id") != user_id:
+            notifications.notify(
+                recipient_id=publication.get("author_id"),
                 sender_id=user_id,
                 sender_name=user_name,
                 action_type="comment",
-                message=f"{user_name} a commenté votre publication: {publication.description}"
+                pub_id=pub_id,
+                message=f"{user_name} a commenté votre publication: {publication.get('description')}"
             )
-            notification.save()
         
         return JsonResponse({
             "success": True,
@@ -1342,18 +1211,6 @@ def add_publication_reply(request, pub_id, comment_id):
         if not user_id or not text:
             return JsonResponse({"error": "user_id et text requis"}, status=400)
         
-        publication = Publication.objects.get(id=pub_id)
-        
-        # Trouve le commentaire
-        comment = None
-        for c in publication.comments:
-            if c.id == comment_id:
-                comment = c
-                break
-        
-        if not comment:
-            return JsonResponse({"error": "Commentaire non trouvé"}, status=404)
-        
         # Crée une réponse
         reply = Reply(
             id=str(uuid.uuid4()),
@@ -1362,8 +1219,12 @@ def add_publication_reply(request, pub_id, comment_id):
             text=text
         )
         
-        comment.replies.append(reply)
-        publication.save()
+        # Ajoute la réponse directement dans le commentaire ciblé
+        if not updates.push_reply(Publication, pub_id, comment_id, reply):
+            if not updates.exists(Publication, pub_id):
+                return JsonResponse({"error": "Publication non trouvée"}, status=404)
+            return JsonResponse({"error": "Commentaire non trouvé"}, status=404)
+        invalidate_publications(pub_id)
         
         return JsonResponse({
             "success": True,
@@ -1394,50 +1255,34 @@ def add_publication_reaction(request, pub_id, comment_id):
         if not user_id or not emoji:
             return JsonResponse({"error": "user_id et emoji requis"}, status=400)
         
-        publication = Publication.objects.get(id=pub_id)
-        
-        # Trouve le commentaire
-        comment = None
-        for c in publication.comments:
-            if c.id == comment_id:
-                comment = c
-                break
+        # Ajoute ou retire la réaction directement dans le commentaire ciblé
+        reaction = Reaction(
+            id=str(uuid.uuid4()),
+            author_id=user_id,
+            author_name=user_name,
+            type=emoji
+        )
+        reactions = updates.toggle_reaction(Publication, pub_id, comment_id, reaction)
         
-        if not comment:
+        if reactions is None:
+            if not updates.exists(Publication, pub_id):
+                return JsonResponse({"error": "Publication non trouvée"}, status=404)
             return JsonResponse({"error": "Commentaire non trouvé"}, status=404)
+        invalidate_publications(pub_id)
         
-        # Vérifie si l'utilisateur a déjà réagi
-        existing_reaction = None
-        for r in comment.reactions:
-            if r.author_id == user_id and r.type == emoji:
-                existing_reaction = r
-                break
-        
-        if existing_reaction:
-            # Retire la réaction
-            comment.reactions = [r for r in comment.reactions if not (r.author_id == user_id and r.type == emoji)]
-        else:
-            # Ajoute une réaction
-            reaction = Reaction(
-                id=str(uuid.uuid4()),
-                author_id=user_id,
-                author_name=user_name,
-                type=emoji
-            )
-            comment.reactions.append(reaction)
-        
-        publication.save()
+        resolver = get_resolver(request)
+        resolver.prefetch(r.get("author_id") for r in reactions)
         
         return JsonResponse({
             "success": True,
             "reactions": [
                 {
-                    "id": r.id,
-                    "authorId": r.author_id,
-                    "author": r.author_name,
-                    "type": r.type
+                    "id": r.get("id"),
+                    "authorId": r.get("author_id"),
+                    "author": resolver.get(r.get("author_id"), r.get("author_name")),
+                    "type": r.get("type")
                 }
-                for r in comment.reactions
+                for r in reactions
             ]
         })
     except Publication.DoesNotExist:
@@ -1458,7 +1303,7 @@ def clone_publication(request, pub_id):
         if not user_id:
             return JsonResponse({"error": "user_id requis"}, status=400)
         
-        publication = Publication.objects.get(id=pub_id)
+        publication = Publication.objects.only("shared_plan_id").get(id=pub_id)
         
         # Récupère le plan original
         original_plan = Plan.objects.get(id=publication.shared_plan_id)
@@ -1479,15 +1324,16 @@ def clone_publication(request, pub_id):
         cloned_plan.save()
         
         # Ajoute l'utilisateur à la liste des cloneurs de la publication
-        if user_id not in publication.cloned_by:
-            publication.cloned_by.append(user_id)
-            publication.save()
+        added, cloned_count = updates.add_cloner(Publication, pub_id, user_id)
+        if added:
+            trending.record(pub_id, "clone")
+        invalidate_publications(pub_id)
         
         return JsonResponse({
             "success": True,
             "message": "Plan cloné avec succès",
             "planId": str(cloned_plan.id),
-            "clonedCount": len(publication.cloned_by)
+            "clonedCount": cloned_count or 0
         })
     except Publication.DoesNotExist:
         return JsonResponse({"error": "Publication non trouvée"}, status=404)
@@ -1497,137 +1343,240 @@ def clone_publication(request, pub_id):
         print(f"Erreur dans clone_publication: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
 
+def _publication_details(request, pub_id):
+    """Détail d'une publication, indépendant de l'utilisateur courant (donc partageable en cache)"""
+    # Convertit l'ancien tableau likes avant de lire le compteur
+    likes.ensure_migrated(pub_id)
+    publication = Publication.objects.exclude("likes", "recent_likers", "search_terms").get(id=pub_id)
+    
+    # Première page des likes (la suite via publications/<id>/likes/)
+    liker_ids, _ = likes.likers_page(pub_id, None, MAX_LIMIT)
+    
+    # Charge en une requête les noms courants de tous les participants
+    resolver = get_resolver(request)
+    resolver.prefetch(
+        [publication.author_id] + list(publication.cloned_by) + liker_ids +
+        [comment.author_id for comment in publication.comments] +
+        [reply.author_id for comment in publication.comments for reply in comment.replies] +
+        [r.author_id for comment in publication.comments for r in comment.reactions]
+    )
+    
+    # Construit les commentaires avec réponses et réactions
+    comments_data = []
+    for comment in publication.comments:
+        replies_data = [
+            {
+                "id": reply.id,
+                "authorId": reply.author_id,
+                "author": resolver.get(reply.author_id, reply.author_name),
+                "text": reply.text,
+                "createdAt": reply.created_at.isoformat()
+            }
+            for reply in comment.replies
+        ]
+        
+        reactions_data = [
+            {
+                "id": r.id,
+                "authorId": r.author_id,
+                "author": resolver.get(r.author_id, r.author_name),
+                "type": r.type
+            }
+            for r in comment.reactions
+        ]
+        
+        comments_data.append({
+            "id": comment.id,
+            "authorId": comment.author_id,
+            "author": resolver.get(comment.author_id, comment.author_name),
+            "text": comment.text,
+            "createdAt": comment.created_at.isoformat(),
+            "replies": replies_data,
+            "reactions": reactions_data
+        })
+    
+    # Construit la liste des cloneurs
+    cloned_by_data = resolver.users(publication.cloned_by, default="Utilisateur")
+    
+    # Construit la liste des likes
+    likes_data = resolver.users(liker_ids, default="Utilisateur")
+    
+    return {
+        "id": str(publication.id),
+        "authorId": publication.author_id,
+        "author": resolver.get(publication.author_id, publication.author_name),
+        "description": publication.description,
+        "createdAt": publication.created_at.isoformat(),
+        "likes": likes_data,
+        "likesCount": publication.likes_count,
+        "comments": comments_data,
+        "commentsCount": len(publication.comments),
+        "clonedBy": cloned_by_data,
+        "clonedCount": len(publication.cloned_by)
+    }
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_publication_details(request, pub_id):
-    """Récupère les détails complets d'une publication avec commentaires"""
+    """Récupère les détails complets d'une publication avec commentaires (lecture via le cache)"""
     try:
         user_id = request.GET.get("user_id", None)
         
-        publication = Publication.objects.get(id=pub_id)
-        
-        # Vérifie si l'utilisateur a liké
-        is_liked = False
-        if user_id and publication.likes:
-            is_liked = any(like.user_id == user_id for like in publication.likes)
-        
-        # Construit les commentaires avec réponses et réactions
-        comments_data = []
-        for comment in publication.comments:
-            replies_data = [
-                {
-                    "id": reply.id,
-                    "authorId": reply.author_id,
-                    "author": reply.author_name,
-                    "text": reply.text,
-                    "createdAt": reply.created_at.isoformat()
-                }
-                for reply in comment.replies
-            ]
-            
-            reactions_data = [
-                {
-                    "id": r.id,
-                    "authorId": r.author_id,
-                    "author": r.author_name,
-                    "type": r.type
-                }
-                for r in comment.reactions
-            ]
-            
-            comments_data.append({
-                "id": comment.id,
-                "authorId": comment.author_id,
-                "author": comment.author_name,
-                "text": comment.text,
-                "createdAt": comment.created_at.isoformat(),
-                "replies": replies_data,
-                "reactions": reactions_data
-            })
+        details = publications_cache().get_or_set(
+            detail_key(pub_id),
+            lambda: _publication_details(request, pub_id)
+        )
         
-        # Construit la liste des cloneurs
-        cloned_by_data = []
-        for cloner_id in publication.cloned_by:
-            try:
-                cloner_profile = UserProfile.objects.get(user_id=cloner_id)
-                cloned_by_data.append({
-                    "userId": cloner_id,
-                    "username": cloner_profile.username
-                })
-            except:
-                cloned_by_data.append({"userId": cloner_id, "username": "Utilisateur"})
+        # Vérifie si l'utilisateur a liké (calculé hors cache, le détail est commun à tous)
+        is_liked = bool(user_id) and likes.is_liked(user_id, pub_id)
         
-        # Construit la liste des likes
-        likes_data = []
-        for like in publication.likes:
-            try:
-                liker_profile = UserProfile.objects.get(user_id=like.user_id)
-                likes_data.append({
-                    "userId": like.user_id,
-                    "username": liker_profile.username
-                })
-            except:
-                likes_data.append({"userId": like.user_id, "username": "Utilisateur"})
-        
-        return JsonResponse({
-            "id": str(publication.id),
-            "authorId": publication.author_id,
-            "author": publication.author_name,
-            "description": publication.description,
-            "createdAt": publication.created_at.isoformat(),
-            "likes": likes_data,
-            "likesCount": len(publication.likes),
-            "isLiked": is_liked,
-            "comments": comments_data,
-            "commentsCount": len(publication.comments),
-            "clonedBy": cloned_by_data,
-            "clonedCount": len(publication.cloned_by)
-        })
+        return JsonResponse(dict(details, isLiked=is_liked))
     except Publication.DoesNotExist:
         return JsonResponse({"error": "Publication non trouvée"}, status=404)
     except Exception as e:
         print(f"Erreur dans get_publication_details: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def publication_likes(request, pub_id):
+    """Utilisateurs ayant aimé une publication, plus récents d'abord (?limit=N&cursor=<X-Next-Cursor>)"""
+    try:
+        cursor = request.GET.get("cursor", None)
+        limit = parse_limit(request)
+        
+        try:
+            user_ids, next_cursor = likes.likers_page(pub_id, cursor, limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        data = get_resolver(request).users(user_ids, default="Utilisateur")
+        return with_next_cursor(JsonResponse(data, safe=False), next_cursor)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+def _public_plans_counts(user_ids):
+    """Nombre de plans publics par auteur, calculé en une seule agrégation $group"""
+    rows = Plan.objects(author_id__in=list(user_ids), is_public=True).aggregate([
+        {"$group": {"_id": "$author_id", "count": {"$sum": 1}}},
+    ])
+    return {row["_id"]: row["count"] for row in rows}
+
+USER_CARD_FIELDS = ("user_id", "username", "email", "bio", "avatar_url",
+                    "followers_count", "following_count", "created_at")
+
+def _user_cards(current_user_id, profiles):
+    """Cartes d'un lot de profils bruts; compteurs et abonnements chargés pour tout le lot"""
+    # Compte les plans publics du lot en une requête
+    page_user_ids = [profile["user_id"] for profile in profiles]
+    plans_counts = _public_plans_counts(page_user_ids)
+    
+    # Profils encore au format listes: convertis à la volée, compteurs relus
+    migrated = follows.ensure_migrated(*page_user_ids)
+    for profile in profiles:
+        if profile["user_id"] in migrated:
+            profile["followers_count"], profile["following_count"] = follows.counts(profile["user_id"])
+    
+    # Abonnés en commun et abonnements de l'utilisateur courant, pour tout le lot
+    common_counts = {}
+    followed = set()
+    if current_user_id and page_user_ids:
+        common_counts = follows.common_followers_counts(current_user_id, page_user_ids)
+        followed = follows.following_among(current_user_id, page_user_ids)
+    
+    return [
+        {
+            "userId": profile["user_id"],
+            "username": profile.get("username"),
+            "email": profile.get("email"),
+            "bio": profile.get("bio"),
+            "avatarUrl": profile.get("avatar_url"),
+            "followers": profile.get("followers_count", 0),
+            "following": profile.get("following_count", 0),
+            "commonFollowers": common_counts.get(profile["user_id"], 0),
+            "isFollowing": profile["user_id"] in followed,
+            "publicPlansCount": plans_counts.get(profile["user_id"], 0)
+        }
+        for profile in profiles
+    ]
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def all_users(request):
-    """Récupère tous les utilisateurs sauf l'utilisateur courant"""
+    """Récupère une page d'utilisateurs sauf l'utilisateur courant.
+
+    Pagination par curseur: ?limit=N&cursor=<X-Next-Cursor de la page précédente>
+    (sans limit ni cursor: tous les utilisateurs, comme avant la pagination)
+    ?stream=1: tous les utilisateurs, en flux
+    """
     try:
         current_user_id = request.GET.get("current_user_id")
+        cursor = request.GET.get("cursor", None)
+        limit = parse_page_limit(request)
+        
+        # Filtre pour exclure l'utilisateur courant
+        query = Q(user_id__ne=current_user_id) if current_user_id else Q()
         
-        # Récupère le profil de l'utilisateur courant pour obtenir ses followers
-        current_user_followers = []
-        if current_user_id:
+        if streaming.requested(request):
+            rows = UserProfile.objects(query).order_by('-created_at', '-id').only(*USER_CARD_FIELDS) \
+                .as_pymongo().no_cache().batch_size(streaming.BATCH_SIZE)
+            return streaming.response(request, rows, lambda batch: _user_cards(current_user_id, batch))
+        
+        if cursor:
             try:
-                current_profile = UserProfile.objects.get(user_id=current_user_id)
-                current_user_followers = current_profile.followers  # Les followers de l'utilisateur courant
-            except UserProfile.DoesNotExist:
-                pass
+                query = query & keyset_filter(cursor)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
         
-        # Récupère tous les utilisateurs
-        all_profiles = UserProfile.objects()
+        # Récupère une page d'utilisateurs (ou tous)
+        profiles = UserProfile.objects(query).order_by('-created_at', '-id').only(*USER_CARD_FIELDS).as_pymongo()
+        if limit is not None:
+            profiles = profiles.limit(limit + 1)
+        profiles, next_cursor = keyset_page(profiles, limit)
         
-        # Filtre pour exclure l'utilisateur courant
-        if current_user_id:
-            all_profiles = all_profiles(user_id__ne=current_user_id)
+        return with_next_cursor(JsonResponse(_user_cards(current_user_id, profiles), safe=False), next_cursor)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def user_suggestions(request):
+    """Suggestions d'utilisateurs à suivre pour current_user_id (?limit=N), précalculées et classées"""
+    try:
+        current_user_id = request.GET.get("current_user_id")
+        limit = parse_limit(request)
+        
+        if not current_user_id:
+            return JsonResponse({"error": "current_user_id requis"}, status=400)
+        
+        ranked = suggestions.for_user(current_user_id, limit)
+        user_ids = [s["user_id"] for s in ranked]
+        follows.ensure_migrated(*user_ids)
+        
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects(user_id__in=user_ids).only(
+                "user_id", "username", "email", "bio", "avatar_url", "followers_count", "following_count"
+            )
+        }
+        plans_counts = _public_plans_counts(user_ids)
         
         data = []
-        for profile in all_profiles:
-            # Calculer les amis en commun (intersection entre les followers de l'utilisateur courant et les followers du profil)
-            common_followers = len(set(current_user_followers) & set(profile.followers))
-            
+        for s in ranked:
+            profile = profiles.get(s["user_id"])
+            if not profile:
+                continue
             data.append({
                 "userId": profile.user_id,
                 "username": profile.username,
                 "email": profile.email,
                 "bio": profile.bio,
                 "avatarUrl": profile.avatar_url,
-                "followers": len(profile.followers),
-                "following": len(profile.following),
-                "commonFollowers": common_followers,
-                "isFollowing": current_user_id in profile.followers if current_user_id else False,
-                "publicPlansCount": len(Plan.objects(author_id=profile.user_id, is_public=True))
+                "followers": profile.followers_count,
+                "following": profile.following_count,
+                "commonFollowers": s["score"],
+                "isFollowing": False,
+                "publicPlansCount": plans_counts.get(profile.user_id, 0)
             })
         
         return JsonResponse(data, safe=False)
@@ -1657,11 +1606,15 @@ def publish_plan(request, plan_id):
         profile = UserProfile.objects.get(user_id=user_id)
         
         # Créer la publication
+        now = datetime.utcnow()
         publication = Publication(
             shared_plan_id=str(plan.id),
             author_id=user_id,
             author_name=profile.username,
             description=description,
+            created_at=now,
+            trend_score=trending.weight("publish"),
+            trend_at=now,
             plan_snapshot=PlanSnapshot(
                 city=plan.city,
                 from_date=plan.from_date,
@@ -1671,6 +1624,9 @@ def publish_plan(request, plan_id):
             )
         )
         publication.save()
+        invalidate_publications()
+        timeline.fan_out(publication.id, user_id, publication.created_at)
+        realtime.publish_feed(str(publication.id), user_id)
         
         return JsonResponse({
             "success": True,
@@ -1729,38 +1685,10 @@ def update_user_profile(request, user_id):
         user.updatedAt = datetime.utcnow()
         user.save()
         
-        # ✅ IMPORTANT: Mettre à jour TOUTES les publications de cet utilisateur
-        Publication.objects(author_id=user_id).update(set__author_name=username)
-        
-        # ✅ Mettre à jour TOUS les commentaires de cet utilisateur dans les publications
-        # Récupérer toutes les publications avec des commentaires de cet utilisateur
-        publications_with_comments = Publication.objects(comments__author_id=user_id)
-        for pub in publications_with_comments:
-            for comment in pub.comments:
-                if comment.author_id == user_id:
-                    comment.author_name = username
-            pub.save()
-        
-        # ✅ Mettre à jour les réponses aux commentaires
-        publications_with_replies = Publication.objects(comments__replies__author_id=user_id)
-        for pub in publications_with_replies:
-            for comment in pub.comments:
-                for reply in comment.replies:
-                    if reply.author_id == user_id:
-                        reply.author_name = username
-            pub.save()
-        
-        # ✅ Mettre à jour les réactions aux commentaires
-        publications_with_reactions = Publication.objects(comments__reactions__author_id=user_id)
-        for pub in publications_with_reactions:
-            for comment in pub.comments:
-                for reaction in comment.reactions:
-                    if reaction.author_id == user_id:
-                        reaction.author_name = username
-            pub.save()
-        
-        # ✅ Mettre à jour la collection 'plans' - tous les plans de cet utilisateur
-        Plan.objects(author_id=user_id).update(set__author_name=username)
+        # Les noms sont résolus à la lecture: le renommage se limite au cache de noms
+        # (les noms recopiés dans les contenus restent des valeurs de repli)
+        if username != old_username:
+            names.rename(user_id, username)
         
         return JsonResponse({
             "success": True,
@@ -1831,35 +1759,17 @@ def create_notification(request):
         if not recipient_id or not sender_id or not action_type:
             return JsonResponse({"error": "Paramètres requis manquants"}, status=400)
         
-        # Générer le message automatiquement selon l'action avec description de la publication
-        action_prefix = {
-            "like": f"{sender_name} a aimé votre publication",
-            "comment": f"{sender_name} a commenté votre publication",
-            "clone": f"{sender_name} a cloné votre plan"
-        }
-        
-        base_message = action_prefix.get(action_type, f"{sender_name} a interagi avec votre publication")
-        
-        # Ajouter le détail de la publication si disponible
-        if description:
-            # Limiter la description à 50 caractères pour éviter un message trop long
-            desc_preview = description[:50] + "..." if len(description) > 50 else description
-            message = f"{base_message}: \"{desc_preview}\""
-        else:
-            message = base_message
-        
-        # Créer la notification
-        notification = Notification(
+        # Le message est généré automatiquement selon l'action avec description de la publication.
+        # L'écriture est différée et peut être fusionnée dans une notification existante:
+        # notification_id est l'identifiant de l'événement, attribué avant sa mise en file
+        notification = notifications.notify(
             recipient_id=recipient_id,
             sender_id=sender_id,
             sender_name=sender_name,
             action_type=action_type,
             pub_id=pub_id,
-            description=description,
-            message=message,
-            created_at=datetime.utcnow()
+            description=description
         )
-        notification.save()
         
         return JsonResponse({
             "success": True,
@@ -25,19 +25,35 @@ export class NotificationsComponent implements OnInit {
     private router: Router
   ) {
     this.currentUserId = this.authService.currentUserId;
-    // Recharge les notifications toutes les 10 secondes
-    effect(() => {
+    // Reçoit les nouvelles notifications en temps réel (SSE); tant que le flux n'est pas
+    // ouvert (serveur WSGI, coupure), recharge les notifications toutes les 10 secondes
+    effect((onCleanup) => {
       const userId = this.currentUserId();
       if (userId) {
-        const interval = setInterval(() => {
-          this.loadNotifications();
-        }, 10000);
-        
-        return () => {
+        let interval: ReturnType<typeof setInterval> | undefined;
+        const stopPolling = () => {
           clearInterval(interval);
+          interval = undefined;
         };
+        const subscription = this.socialService.streamNotifications(userId).subscribe(event => {
+          if (event.type === 'open') {
+            // Connexion ou reconnexion: rattrape ce qui a pu être manqué
+            stopPolling();
+            this.loadNotifications();
+          } else if (event.type === 'error') {
+            interval ??= setInterval(() => this.loadNotifications(), 10000);
+          } else if (event.type === 'notification') {
+            // Notification agrégée: remplace la ligne existante, sinon l'ajoute en tête
+            this.notifications.update(list => list.some(n => n.id === event.data.id)
+              ? list.map(n => n.id === event.data.id ? event.data : n)
+              : [event.data, ...list]);
+          }
+        });
+        onCleanup(() => {
+          subscription.unsubscribe();
+          stopPolling();
+        });
       }
-      return undefined;
     });
   }
 
@@ -17,6 +17,8 @@ import { UserSuggestionsComponent } from '../user-suggestions/user-suggestions';
 export class PlansFeedComponent implements OnInit {
   plans = signal<Plan[]>([]);
   publications = signal<any[]>([]);
+  // Publications d'autres utilisateurs annoncées par le flux temps réel depuis le dernier chargement
+  newPublications = signal(0);
   loading = signal(false);
   error = signal<string | null>(null);
 
@@ -57,6 +59,18 @@ export class PlansFeedComponent implements OnInit {
   ) {
     this.currentUserId = this.authService.currentUserId;
     this.currentUsername = this.authService.currentUsername;
+    // Événements 'feed' (SSE): compte les nouvelles publications sans recharger la liste
+    effect((onCleanup) => {
+      const userId = this.currentUserId();
+      if (userId) {
+        const subscription = this.socialService.streamNotifications(userId).subscribe(event => {
+          if (event.type === 'feed' && event.data?.authorId !== userId) {
+            this.newPublications.update(count => count + 1);
+          }
+        });
+        onCleanup(() => subscription.unsubscribe());
+      }
+    });
   }
 
   ngOnInit(): void {
@@ -98,6 +112,7 @@ export class PlansFeedComponent implements OnInit {
   loadPlans(): void {
     this.loading.set(true);
     this.error.set(null);
+    this.newPublications.set(0);
 
     // Charger les publications
     this.plansService.getPublications(this.currentUserId()).subscribe({
@@ -265,6 +280,12 @@ export class PlansFeedComponent implements OnInit {
     });
   }
 
+  showNewPublications(): void {
+    this.searchCity.set('');
+    this.isSearching.set(false);
+    this.loadPlans();
+  }
+
   resetSearch(): void {
     this.searchCity.set('');
     this.isSearching.set(false);
@@ -56,7 +56,7 @@ export class UserSuggestionsComponent implements OnInit {
     this.loading.set(true);
     this.error.set(null);
 
-    this.socialService.getAllUsers(this.currentUserId()).subscribe({
+    this.socialService.getUserSuggestions(this.currentUserId()).subscribe({
       next: (users) => {
         this.users.set(users || []);
         
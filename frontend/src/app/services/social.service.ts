@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, share } from 'rxjs';
 
 export interface Plan {
   id: string;
@@ -64,12 +64,19 @@ export interface Notification {
   planTitle?: string;
   description?: string;
   message: string;
+  count?: number;  // Événements regroupés dans cette notification
+  actors?: { userId: string; username: string }[];
   isRead?: boolean;
   is_read?: boolean;
   createdAt?: string;
   created_at?: string;
 }
 
+export interface NotificationStreamEvent {
+  type: 'open' | 'error' | 'unread' | 'notification' | 'feed';
+  data?: any;
+}
+
 export interface UserProfile {
   userId: string;
   username: string;
@@ -88,6 +95,8 @@ export interface UserProfile {
 })
 export class SocialService {
   private apiUrl = 'http://127.0.0.1:8000/api';
+  // Un seul flux SSE par utilisateur, partagé par les composants abonnés
+  private streams = new Map<string, Observable<NotificationStreamEvent>>();
 
   constructor(private http: HttpClient) {}
 
@@ -145,6 +154,33 @@ export class SocialService {
     return this.http.get<Notification[]>(`${this.apiUrl}/notifications/${userId}/`);
   }
 
+  // Flux temps réel (SSE): événements 'open' (connexion/reconnexion), 'error' (flux coupé ou
+  // indisponible), 'unread', 'notification' et 'feed' (nouvelle publication)
+  // La connexion est partagée: ouverte au premier abonné, fermée après le dernier
+  streamNotifications(userId: string): Observable<NotificationStreamEvent> {
+    let stream = this.streams.get(userId);
+    if (!stream) {
+      stream = this.openStream(userId).pipe(share());
+      this.streams.set(userId, stream);
+    }
+    return stream;
+  }
+
+  private openStream(userId: string): Observable<NotificationStreamEvent> {
+    return new Observable<NotificationStreamEvent>(subscriber => {
+      const source = new EventSource(`${this.apiUrl}/notifications/${userId}/stream/`);
+      source.onopen = () => subscriber.next({ type: 'open' });
+      source.onerror = () => subscriber.next({ type: 'error' });
+      for (const type of ['unread', 'notification', 'feed'] as const) {
+        source.addEventListener(type, (event: MessageEvent) => {
+          subscriber.next({ type, data: JSON.parse(event.data) });
+        });
+      }
+      // EventSource se reconnecte seul (sauf réponse 204: serveur sans SSE); on ne ferme qu'au désabonnement
+      return () => source.close();
+    });
+  }
+
   // Profile
   getUserProfile(userId: string): Observable<UserProfile> {
     return this.http.get<UserProfile>(`${this.apiUrl}/profile/${userId}/`);
@@ -206,6 +242,11 @@ export class SocialService {
     return this.http.get<any[]>(url);
   }
 
+  // Suggestions d'utilisateurs à suivre (classées par abonnements en commun)
+  getUserSuggestions(currentUserId: string, limit: number = 20): Observable<any[]> {
+    return this.http.get<any[]>(`${this.apiUrl}/users/suggestions/?current_user_id=${currentUserId}&limit=${limit}`);
+  }
+
   // Share Plan (make private plan public)
   sharePlan(planId: string, userId: string): Observable<any> {
     return this.http.post(`${this.apiUrl}/plans/${planId}/share/`, {